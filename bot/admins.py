@@ -0,0 +1,106 @@
+# admins.py
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Union
+
+from aiogram.filters import BaseFilter
+from aiogram.types import Message, CallbackQuery
+
+from config import ADMINS_TTL, logger
+from database import admins_collection
+
+# Роли администраторов по возрастанию прав: старшая роль может всё, что младшие
+ROLES = {"viewer": 1, "editor": 2, "owner": 3}
+
+
+class AdminCache:
+    """
+    Кэш коллекции admins в памяти процесса: {user_id: роль}.
+
+    Проверка прав на каждом апдейте — поиск в словаре, без обращения к БД.
+    Изменения через команды бота (set_role / remove) сбрасывают кэш сразу,
+    а правки с других реплик или напрямую в БД подхватываются не позже чем через ttl секунд.
+    """
+
+    def __init__(self, ttl: float = ADMINS_TTL):
+        self.ttl = ttl
+        self._roles = None
+        self._loaded_at = 0.0
+        # Как в config_cache: Lock создаётся при первой загрузке, в работающем event loop
+        self._lock = None
+
+    def _is_fresh(self) -> bool:
+        return self._roles is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def get_all(self) -> dict:
+        if self._is_fresh():
+            return self._roles
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._is_fresh():
+                return self._roles
+
+            roles = {}
+            async for doc in admins_collection.find({}, {"role": 1}):
+                if doc.get("role") in ROLES:
+                    roles[doc["_id"]] = doc["role"]
+                else:
+                    logger.warning(f"У администратора {doc['_id']} неизвестная роль {doc.get('role')!r}, пропускаем.")
+
+            self._roles = roles
+            self._loaded_at = time.monotonic()
+            return roles
+
+    async def role_of(self, user_id: int):
+        roles = await self.get_all()
+        return roles.get(user_id)
+
+    async def has_role(self, user_id: int, role: str) -> bool:
+        current = await self.role_of(user_id)
+        return current is not None and ROLES[current] >= ROLES[role]
+
+    async def set_role(self, user_id: int, role: str, added_by: int = None):
+        """
+        Добавляет администратора или меняет его роль и сбрасывает кэш.
+        """
+        if role not in ROLES:
+            raise ValueError(f"Неизвестная роль: {role}")
+        await admins_collection.update_one(
+            {"_id": user_id},
+            {"$set": {"role": role}, "$setOnInsert": {"added_at": datetime.utcnow(), "added_by": added_by}},
+            upsert=True
+        )
+        self.invalidate()
+
+    async def remove(self, user_id: int) -> bool:
+        result = await admins_collection.delete_one({"_id": user_id})
+        self.invalidate()
+        return result.deleted_count > 0
+
+    def invalidate(self):
+        self._roles = None
+        self._loaded_at = 0.0
+
+
+# Общий экземпляр для фильтра RoleFilter и команд управления администраторами
+admin_cache = AdminCache()
+
+
+class RoleFilter(BaseFilter):
+    """
+    Обработчик срабатывает, только если у автора апдейта роль не ниже role.
+    Апдейты без прав обрабатывает routers/access_denied.py.
+    """
+
+    def __init__(self, role: str = "viewer"):
+        if role not in ROLES:
+            raise ValueError(f"Неизвестная роль: {role}")
+        self.role = role
+
+    async def __call__(self, event: Union[Message, CallbackQuery]) -> bool:
+        user = event.from_user
+        return user is not None and await admin_cache.has_role(user.id, self.role)
@@ -0,0 +1,86 @@
+# bench_bulk_insert.py
+#
+# Добавление большого списка ключевых слов (как вставка в /add_keywords):
+# find_one + insert_one на каждую строку (как было) против database.insert_unique.
+# Нужен локальный mongod. Запуск из bot/:
+#   python benchmarks/bench_bulk_insert.py [--uri mongodb://localhost:27017] [--lines 500 5000]
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import insert_unique  # noqa: E402
+
+DB_NAME = "bench_news_db"
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def insert_one_by_one(target_collection, lines: list):
+    existing = set()
+    for line in lines:
+        if await target_collection.find_one({"keyword": line}):
+            existing.add(line)
+        else:
+            await target_collection.insert_one({"keyword": line})
+    return existing
+
+
+async def insert_bulk(target_collection, lines: list):
+    unique_lines = list(dict.fromkeys(lines))
+    return await insert_unique(target_collection, "keyword", [{"keyword": line} for line in unique_lines])
+
+
+async def measure(name: str, func, target_collection, counter: CommandCounter, lines: list):
+    await target_collection.delete_many({})
+    # Четверть строк уже есть в коллекции
+    await target_collection.insert_many([{"keyword": line} for line in lines[::4]])
+
+    counter.count = 0
+    started = time.perf_counter()
+    existing = await func(target_collection, lines)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<14} {len(lines):>6} строк  {elapsed * 1000:>9.1f} мс  запросов {counter.count:>6}  уже было {len(existing)}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--lines", type=int, nargs="+", default=[500, 5000])
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(args.uri, serverSelectionTimeoutMS=3000, event_listeners=[counter])
+    target_collection = client[DB_NAME]["keywords"]
+    await target_collection.create_index([("keyword", ASCENDING)], unique=True)
+    try:
+        for count in args.lines:
+            lines = [f"ключевое слово {i}" for i in range(count)]
+            await measure("по одной", insert_one_by_one, target_collection, counter, lines)
+            await measure("insert_unique", insert_bulk, target_collection, counter, lines)
+    finally:
+        await client.drop_database(DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+# bench_command_middleware.py
+#
+# Накладные расходы CommandMiddleware на апдейт (без самого обработчика) против прежнего
+# ResetFSMOnCommandMiddleware, который на каждую команду делал state.clear().
+# Состояния — в MongoStorage с прогретым кэшем; вместо fsm_states — счётчик запросов,
+# так что видно, сколько раз middleware пошёл бы в Mongo.
+# Запуск из bot/: python benchmarks/bench_command_middleware.py [--updates 100000]
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.filters import CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import Message
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fsm_storage  # noqa: E402
+from middlewares.commands import CommandMiddleware  # noqa: E402
+
+
+class ResetFSMOnCommandMiddleware(BaseMiddleware):
+    """
+    Прежний вариант (middlewares/reset_fsm_state.py до CommandMiddleware).
+    """
+
+    async def __call__(self, handler, event, data):
+        if isinstance(event, Message):
+            text = event.text or ""
+            if text.startswith('/'):
+                state = data['state']
+                await state.clear()
+        return await handler(event, data)
+
+
+class CountingCollection:
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+
+    async def find_one(self, *args, **kwargs):
+        self.reads += 1
+        return None
+
+    async def bulk_write(self, requests, **kwargs):
+        self.writes += len(requests)
+
+
+def make_message(text: str) -> Message:
+    return Message.model_validate({
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "bench"},
+        "text": text
+    })
+
+
+async def handler(event, data):
+    return None
+
+
+async def measure(middleware, event, data, updates: int) -> float:
+    started = time.perf_counter()
+    for _ in range(updates):
+        await handler(event, data)
+    baseline = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(updates):
+        await middleware(handler, event, data)
+    return (time.perf_counter() - started - baseline) / updates
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=100000)
+    args = parser.parse_args()
+
+    collection = CountingCollection()
+    fsm_storage.fsm_collection = collection
+    # flush_interval = 0: каждая запись сразу уходит в «Mongo», как без отложенной записи
+    storage = fsm_storage.MongoStorage(flush_interval=0)
+    state = FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    await state.get_state()
+
+    cases = (
+        ("обычное сообщение", make_message("привет"), {"state": state}),
+        ("команда", make_message("/stats"), {"state": state, "command": CommandObject(prefix="/", command="stats")}),
+    )
+    for middleware in (ResetFSMOnCommandMiddleware(), CommandMiddleware()):
+        for name, event, data in cases:
+            collection.reads = collection.writes = 0
+            overhead = await measure(middleware, event, data, args.updates)
+            print(
+                f"{type(middleware).__name__:<28} {name:<18} {overhead * 1e6:>6.2f} мкс/апдейт  "
+                f"чтений Mongo {collection.reads}, записей {collection.writes}"
+            )
+    await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
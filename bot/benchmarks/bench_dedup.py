@@ -0,0 +1,66 @@
+# bench_dedup.py
+#
+# Поиск почти-дубля в SimHashIndex (dedup.py) при 1M сохранённых отпечатков:
+# запросы, отличающиеся от сохранённых на 0..max_distance бит, и случайные (промахи).
+# Запуск из bot/: python benchmarks/bench_dedup.py [--fingerprints 1000000] [--queries 5000]
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import SimHashIndex  # noqa: E402
+from simhash import FINGERPRINT_BITS, simhash  # noqa: E402
+
+ARTICLE = (
+    "Губернатор Липецкой области провёл совещание по вопросам подготовки к посевной кампании "
+    "в районах региона. Аграрии получат субсидии на технику и семена. "
+) * 20
+
+
+def lookup_time(index: SimHashIndex, queries: list) -> tuple:
+    started = time.perf_counter()
+    hits = sum(1 for fingerprint in queries if index.find(fingerprint) is not None)
+    return (time.perf_counter() - started) / len(queries), hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fingerprints", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    rnd = random.Random(18)
+    index = SimHashIndex()
+    now = datetime.utcnow()
+    fingerprints = [rnd.getrandbits(FINGERPRINT_BITS) for _ in range(args.fingerprints)]
+
+    started = time.perf_counter()
+    for key, fingerprint in enumerate(fingerprints):
+        index.add(key, fingerprint, now)
+    print(f"Индекс: {len(index)} отпечатков за {time.perf_counter() - started:.1f} с")
+
+    near = []
+    for _ in range(args.queries):
+        fingerprint = rnd.choice(fingerprints)
+        for bit in rnd.sample(range(FINGERPRINT_BITS), rnd.randint(0, index.max_distance)):
+            fingerprint ^= 1 << bit
+        near.append(fingerprint)
+    elapsed, hits = lookup_time(index, near)
+    print(f"почти-дубли: {elapsed * 1e6:>6.1f} мкс на поиск, найдено {hits} из {len(near)}")
+
+    elapsed, hits = lookup_time(index, [rnd.getrandbits(FINGERPRINT_BITS) for _ in range(args.queries)])
+    print(f"случайные:   {elapsed * 1e6:>6.1f} мкс на поиск, найдено {hits}")
+
+    started = time.perf_counter()
+    for _ in range(100):
+        simhash(ARTICLE)
+    print(f"simhash статьи ({len(ARTICLE)} символов): {(time.perf_counter() - started) * 10:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench_html_extract.py
+#
+# clean_news_html: потоковый html.parser (backend="stream") против BeautifulSoup (backend="bs4").
+# Время и пик памяти на статью, объём извлечённого текста.
+# Запуск из bot/: python benchmarks/bench_html_extract.py [страница.html ...] [--runs 500]
+#
+# Без аргументов берётся benchmarks/data/synthetic_article.html — синтетическая страница,
+# собранная вручную по образцу разметки новостного сайта (таблица, script/style, вложенные span,
+# блоки «Поделиться»). Это не настоящая статья, и цифры на ней верны только для неё.
+# Для сравнения на реальных статьях передайте сохранённые страницы или поле text из articles.
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from misc import clean_news_html  # noqa: E402
+
+BACKENDS = ("bs4", "stream")
+
+
+def measure(html_text: str, backend: str, runs: int):
+    started = time.perf_counter()
+    for _ in range(runs):
+        clean_news_html(html_text, backend)
+    elapsed = (time.perf_counter() - started) / runs
+
+    tracemalloc.start()
+    text = clean_news_html(html_text, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pages", nargs="*", default=[os.path.join(BENCH_DIR, "data", "synthetic_article.html")])
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    for page in args.pages:
+        with open(page, encoding="utf-8") as f:
+            html_text = f.read()
+        print(f"{os.path.basename(page)}: {len(html_text)} символов HTML")
+
+        results = {backend: measure(html_text, backend, args.runs) for backend in BACKENDS}
+        for backend, (elapsed, peak, text) in results.items():
+            print(
+                f"  {backend:<7} {elapsed * 1e6:>9.1f} мкс  пик памяти {peak / 1024:>7.1f} КБ  "
+                f"текст {len(text):>6} символов"
+            )
+        bs4_time = results["bs4"][0]
+        stream_time = results["stream"][0]
+        print(f"  stream быстрее в {bs4_time / stream_time:.1f} раза")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_keyword_matcher.py
+#
+# KeywordMatcher (Aho–Corasick) на 10k+ ключевых слов: построение автомата, поиск по статье,
+# добавление и удаление слова через бота. Для сравнения — поиск каждого слова по тексту отдельно.
+# Запуск из bot/: python benchmarks/bench_keyword_matcher.py [--keywords 10000 50000]
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher, fold  # noqa: E402
+
+ALPHABET = "абвгдеёжзиклмнопрстуфхцчшщыэюя"
+
+
+def random_word(rnd: random.Random, low: int, high: int) -> str:
+    return "".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(low, high)))
+
+
+def naive_match(patterns: list, text: str) -> int:
+    # По регулярке на слово: столько проходов по тексту, сколько ключевых слов
+    folded = fold(text)
+    return sum(1 for pattern in patterns if pattern.search(folded))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--articles", type=int, default=50)
+    args = parser.parse_args()
+
+    rnd = random.Random(16)
+    articles = [" ".join(random_word(rnd, 2, 9) for _ in range(800)) for _ in range(args.articles)]
+    print(f"Статья: ~{len(articles[0])} символов")
+
+    for count in args.keywords:
+        words = list({random_word(rnd, 4, 10) for _ in range(count)})
+        matcher = KeywordMatcher()
+
+        started = time.perf_counter()
+        matcher.add_keywords(words)
+        matcher.match("")
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for article in articles:
+            matcher.match(article)
+        per_article = (time.perf_counter() - started) / len(articles)
+
+        started = time.perf_counter()
+        matcher.add_keywords(["новоеслово"])
+        matcher.match("")
+        add = time.perf_counter() - started
+
+        started = time.perf_counter()
+        matcher.remove_keyword(words[0])
+        matcher.match("")
+        remove = time.perf_counter() - started
+
+        patterns = [re.compile(rf"(?<!\w){re.escape(fold(word))}(?!\w)") for word in words]
+        started = time.perf_counter()
+        for article in articles[:5]:
+            naive_match(patterns, article)
+        naive = (time.perf_counter() - started) / 5
+
+        print(
+            f"{len(words):>6} слов: построение {build * 1000:>7.1f} мс, статья {per_article * 1000:>6.2f} мс "
+            f"(по слову отдельно {naive * 1000:>7.1f} мс), добавление {add * 1000:>6.1f} мс, "
+            f"удаление {remove * 1000:>6.2f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
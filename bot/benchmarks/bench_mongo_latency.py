@@ -0,0 +1,101 @@
+# bench_mongo_latency.py
+#
+# Задержка обработчиков при медленном Mongo: синхронный pymongo в event loop (как было)
+# против motor. Нужен локальный mongod; «медленный» запрос — find с $where: sleep(delay).
+# Запуск из bot/: python benchmarks/bench_mongo_latency.py [--uri mongodb://localhost:27017] [--delay-ms 50]
+#
+# Пока фоновая задача (как публикатор) гоняет медленные запросы, «обработчик» раз в 10 мс
+# делает быстрый find_one; печатается задержка обработчика (p50/p99/max).
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+DB_NAME = "bench_news_db"
+TICK = 0.01
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def handler_latencies(fast_query, duration: float) -> list:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        planned = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        await fast_query()
+        # Сколько ждал апдейт сверх плана: блокировка loop + сам запрос
+        latencies.append(time.perf_counter() - planned)
+    return latencies
+
+
+async def run_case(name: str, slow_query, fast_query, duration: float):
+    stop = asyncio.Event()
+
+    async def publisher():
+        while not stop.is_set():
+            await slow_query()
+            # Между запросами публикатор отдаёт управление, как и в scheduled()
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(publisher())
+    await asyncio.sleep(0)
+    latencies = await handler_latencies(fast_query, duration)
+    stop.set()
+    await task
+
+    ms = [value * 1000 for value in latencies]
+    print(
+        f"{name:<8} апдейтов {len(ms):>5}  p50 {statistics.median(ms):>7.1f} мс  "
+        f"p99 {percentile(ms, 0.99):>7.1f} мс  max {max(ms):>7.1f} мс"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--delay-ms", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    slow_filter = {"$where": f"sleep({args.delay_ms}) || true"}
+
+    sync_client = MongoClient(args.uri, serverSelectionTimeoutMS=3000)
+    sync_collection = sync_client[DB_NAME]["articles"]
+    sync_collection.replace_one({"_id": 1}, {"_id": 1, "published": False}, upsert=True)
+
+    async def sync_slow():
+        # Так публикатор ходил в Mongo до motor: вызов блокирует весь event loop
+        sync_collection.find_one(slow_filter)
+
+    async def sync_fast():
+        sync_collection.find_one({"_id": 1})
+
+    motor_client = AsyncIOMotorClient(args.uri, serverSelectionTimeoutMS=3000)
+    motor_collection = motor_client[DB_NAME]["articles"]
+
+    async def motor_slow():
+        await motor_collection.find_one(slow_filter)
+
+    async def motor_fast():
+        await motor_collection.find_one({"_id": 1})
+
+    print(f"Медленный запрос: {args.delay_ms} мс, обработчик каждые {TICK * 1000:.0f} мс")
+    try:
+        await run_case("pymongo", sync_slow, sync_fast, args.duration)
+        await run_case("motor", motor_slow, motor_fast, args.duration)
+    finally:
+        sync_client.drop_database(DB_NAME)
+        sync_client.close()
+        motor_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
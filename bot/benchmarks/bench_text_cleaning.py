@@ -0,0 +1,67 @@
+# bench_text_cleaning.py
+#
+# Пропускная способность очистки текста новости: старая цепочка функций против TextCleaningPipeline.
+# Запуск из bot/: python benchmarks/bench_text_cleaning.py [--articles 5000]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from misc import (  # noqa: E402
+    clean_text_pipeline,
+    compress_newlines,
+    join_single_word_lines,
+    remove_custom_fragments,
+    remove_duplicate_dots,
+    remove_publication_date_lines
+)
+
+PARAGRAPH = (
+    "В Липецке открыли новый мост через реку Воронеж. Движение по нему запустят в понедельник, "
+    "сообщили в администрации города. .\n"
+    "Подрядчик завершил работы на два месяца раньше срока..\n"
+    "\n"
+)
+
+ARTICLE = (
+    "12 января 2024 года\n\n"
+    + PARAGRAPH * 12
+    + "Фото: пресс-служба администрации\n\n"
+    "Смотрите нас на\nДзен\nи\nTelegram\n\nПоделиться\nВКонтакте!\n"
+)
+
+
+def old_chain(text: str) -> str:
+    text = remove_publication_date_lines(text)
+    text = remove_custom_fragments(text)
+    text = compress_newlines(text)
+    text = remove_duplicate_dots(text)
+    return join_single_word_lines(text)
+
+
+def measure(name: str, func, articles: int) -> float:
+    started = time.perf_counter()
+    for _ in range(articles):
+        func(ARTICLE)
+    rate = articles / (time.perf_counter() - started)
+    print(f"{name:<22} {rate:>10.0f} статей/с")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=5000)
+    args = parser.parse_args()
+
+    assert clean_text_pipeline(ARTICLE) == old_chain(ARTICLE)
+    print(f"Статья: {len(ARTICLE)} символов, {ARTICLE.count(chr(10))} строк")
+    old = measure("старая цепочка", old_chain, args.articles)
+    new = measure("TextCleaningPipeline", clean_text_pipeline, args.articles)
+    print(f"Ускорение: {new / old:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
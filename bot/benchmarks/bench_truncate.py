@@ -0,0 +1,53 @@
+# bench_truncate.py
+#
+# Время flexible_truncate_text_by_delimiters и render_news на текстах около 100 КБ.
+# Запуск из bot/: python benchmarks/bench_truncate.py [--runs 2000]
+
+import argparse
+import html
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TELEGRAM_MESSAGE_LIMIT  # noqa: E402
+from misc import flexible_truncate_text_by_delimiters, render_news  # noqa: E402
+
+SIZE = 100_000
+PHRASE = "Новость дня 😀 про экономику и погоду, "
+
+TEXTS = {
+    "предложения": (PHRASE.replace(", ", ". ") * 3000)[:SIZE],
+    "без разделителей": ("слово " * 20000)[:SIZE],
+    "без пробелов": "x" * SIZE,
+}
+
+
+def measure(func, runs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - started) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, text in TEXTS.items():
+        elapsed = measure(
+            lambda: flexible_truncate_text_by_delimiters(text, TELEGRAM_MESSAGE_LIMIT, hard_limit=TELEGRAM_MESSAGE_LIMIT),
+            args.runs
+        )
+        print(f"обрезка, {name:<17} {elapsed:>9.1f} мкс")
+
+    # render_news целиком: очистка HTML и текста, обрезка, ссылка и экранирование
+    news = {"text": "<div>" + html.escape(TEXTS["предложения"]) + "</div>", "url": "https://example.com/news/1"}
+    elapsed = measure(lambda: render_news(news, TELEGRAM_MESSAGE_LIMIT), max(1, args.runs // 100))
+    print(f"{'render_news':<26} {elapsed:>9.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# bench_webhook.py
+#
+# Локальный стенд вебхука: BoundedRequestHandler на 127.0.0.1 и клиент, который шлёт
+# синтетические апдейты так, как это делает Telegram (с X-Telegram-Bot-Api-Secret-Token).
+# Обработчик сообщений только ждёт --handler-ms, в Telegram и Mongo ничего не уходит.
+# Запуск из bot/: python benchmarks/bench_webhook.py [--updates 3000] [--clients 50] [--max-concurrency 20]
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher, Router
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook import BoundedRequestHandler  # noqa: E402
+
+SECRET = "bench-secret"
+PATH = "/webhook"
+
+
+def make_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id % 100, "type": "private"},
+            "from": {"id": update_id % 100, "is_bot": False, "first_name": "bench"},
+            "text": "привет"
+        }
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--clients", type=int, default=50, help="одновременных POST (max_connections у Telegram)")
+    parser.add_argument("--max-concurrency", type=int, default=20)
+    parser.add_argument("--handler-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+    # Строка лога на каждый апдейт заметно тормозит сам замер
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    processed = 0
+    router = Router()
+
+    @router.message()
+    async def on_message(message):
+        nonlocal processed
+        await asyncio.sleep(args.handler_ms / 1000)
+        processed += 1
+
+    bot = Bot("123456:bench")
+    dp = Dispatcher()
+    dp.include_router(router)
+    handler = BoundedRequestHandler(dp, bot, max_concurrency=args.max_concurrency, secret_token=SECRET)
+
+    app = web.Application()
+    app.router.add_post(PATH, handler.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    url = f"http://127.0.0.1:{args.port}{PATH}"
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=make_update(0)) as response:
+                print(f"Без секрета: HTTP {response.status}")
+
+            clients = asyncio.Semaphore(args.clients)
+            latencies = []
+
+            async def post(update_id):
+                async with clients:
+                    started = time.perf_counter()
+                    async with session.post(
+                            url,
+                            json=make_update(update_id),
+                            headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}
+                    ) as response:
+                        assert response.status == 200, response.status
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(post(i) for i in range(1, args.updates + 1)))
+            accepted = time.perf_counter() - started
+            await handler.drain()
+            elapsed = time.perf_counter() - started
+
+            async with session.post(url, json=make_update(0), headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as response:
+                print(f"После drain: HTTP {response.status}")
+
+        latencies.sort()
+        print(
+            f"Апдейтов {args.updates}, обработано {processed}: {args.updates / elapsed:.0f} апдейтов/с, "
+            f"приём {accepted:.2f} с, ответ Telegram p50 {latencies[len(latencies) // 2] * 1000:.1f} мс, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} мс"
+        )
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,12 +3,20 @@
 import asyncio
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
-from middlewares.reset_fsm_state import ResetFSMOnCommandMiddleware
-from config import BOT_TOKEN, logger, ALL_CHANNELS
-from database import mongo_client  # чтобы потом закрыть при завершении
-from scheduled_job import scheduled
+from middlewares.commands import CommandMiddleware
+from config import BOT_TOKEN, METRICS_ENABLED, RUN_MODE, logger
+from database import mongo_client, init_database  # чтобы потом закрыть при завершении
+from indexes import ensure_indexes
+from fsm_storage import MongoStorage
+from keyword_matcher import keyword_matcher
+from supervisor import supervisor
+from render import render_worker
+from cleaning_service import cleaning_service
+from sender import sender
+from stats import stats_recorder
+from metrics_server import start_metrics_server
+from webhook import run_webhook
 from routers import main_router
 
 # Чтобы в scheduled_job использовать bot, сделаем его глобальным
@@ -16,17 +24,50 @@ bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
 
 
 async def main():
-    dp = Dispatcher(storage=MemoryStorage())
+    await init_database()
+    await ensure_indexes()
+    await keyword_matcher.load()
+
+    metrics_runner = await start_metrics_server() if METRICS_ENABLED else None
+
+    # Состояния диалогов в Mongo: переживают перезапуск и общие для всех реплик.
+    # Диспетчер закрывает хранилище (сбрасывает несохранённое) при остановке.
+    if RUN_MODE == "webhook":
+        # Следующий апдейт чата может прийти в другую реплику: пишем сразу и читаем из Mongo
+        storage = MongoStorage(cache_ttl=0, flush_interval=0)
+    else:
+        storage = MongoStorage()
+    dp = Dispatcher(storage=storage)
     dp.include_router(main_router)
-    dp.message.middleware(ResetFSMOnCommandMiddleware())
+    dp.message.middleware(CommandMiddleware())
+
+    # Очередь исходящих сообщений (лимиты Telegram, повторы при flood control)
+    sender.start()
+
+    # Пул процессов для обработки текста новостей
+    cleaning_service.start()
 
     # Запускаем фоновой таск
-    asyncio.create_task(scheduled(bot, ALL_CHANNELS))
+    asyncio.create_task(render_worker())
+    asyncio.create_task(stats_recorder.run())
+    # Супервизор запускает по планировщику на каждый активный канал из коллекции channels
+    asyncio.create_task(supervisor.run(bot))
 
     # Запускаем бота
     try:
-        await dp.start_polling(bot)
+        if RUN_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            # Если раньше работали через вебхук, Telegram не отдаст апдейты в getUpdates
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     finally:
+        await supervisor.close()
+        await stats_recorder.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await sender.close()
+        cleaning_service.close()
         await bot.session.close()
         mongo_client.close()
 
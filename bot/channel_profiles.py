@@ -0,0 +1,138 @@
+# channel_profiles.py
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from config import CHANNEL_PROFILES_TTL, QUIET_HOURS_UTC_OFFSET
+from database import channels_collection
+from keyword_matcher import KeywordMatcher
+
+# Настройки публикации, которые канал может переопределить (иначе берутся из bot_config)
+PROFILE_SETTINGS = ("news_per_hour", "publish_interval", "max_news_length")
+
+
+class ChannelProfile:
+    """
+    Профиль канала из коллекции channels:
+      {
+        "_id": "-100...",             # chat_id канала
+        "title": "...",
+        "enabled": True,
+        "news_per_hour": 5,           # необязательные переопределения bot_config
+        "publish_interval": 3600,
+        "max_news_length": 4096,
+        "keywords": ["липецк*", ...],  # пусто — канал получает все новости; правила как в keywords
+        "quiet_hours": {"start": 23, "end": 7}  # часы по QUIET_HOURS_UTC_OFFSET, None — без тишины
+      }
+    """
+
+    def __init__(self, doc: dict):
+        self.chat_id = str(doc["_id"])
+        self.title = doc.get("title") or self.chat_id
+        self.enabled = doc.get("enabled", True)
+        self.keywords = list(doc.get("keywords") or [])
+        self.quiet_hours = doc.get("quiet_hours")
+        self._doc = doc
+        self._matcher = None
+
+    def setting(self, key: str, config: dict, default=None):
+        """
+        Значение настройки канала, а если она не задана — общее из bot_config.
+        """
+        value = self._doc.get(key)
+        if value is None:
+            value = config.get(key, default)
+        return value
+
+    def in_quiet_hours(self, now: datetime = None) -> bool:
+        if not self.quiet_hours:
+            return False
+        now = now or datetime.utcnow()
+        hour = (now + timedelta(hours=QUIET_HOURS_UTC_OFFSET)).hour
+        start, end = self.quiet_hours["start"], self.quiet_hours["end"]
+        if start <= end:
+            return start <= hour < end
+        # Интервал через полночь, например 23–7
+        return hour >= start or hour < end
+
+    def accepts(self, news: dict) -> bool:
+        """
+        Проходит ли новость фильтр ключевых слов канала. Слова ищутся тем же KeywordMatcher,
+        что и общие ключевые слова: целиком, «*» в конце — любое окончание, без регистра и «ё/е».
+        """
+        if not self.keywords:
+            return True
+        if self._matcher is None:
+            # Свой небольшой автомат на канал; профиль пересоздаётся при перезагрузке кэша
+            self._matcher = KeywordMatcher()
+            self._matcher.add_keywords(self.keywords)
+        found_keywords, _ = self._matcher.match_news(news)
+        return bool(found_keywords)
+
+
+class ChannelProfiles:
+    """
+    Кэш профилей каналов в памяти процесса (как config_cache.BotConfigCache).
+    Изменения через команды бота сбрасывают кэш сразу, правки напрямую в БД
+    подхватываются не позже чем через ttl секунд.
+    """
+
+    def __init__(self, ttl: float = CHANNEL_PROFILES_TTL):
+        self.ttl = ttl
+        self._profiles = None
+        self._loaded_at = 0.0
+        # Lock — при первой загрузке, в работающем loop (см. config_cache.BotConfigCache)
+        self._lock = None
+
+    def _is_fresh(self) -> bool:
+        return self._profiles is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def get_all(self) -> dict:
+        """
+        {chat_id: ChannelProfile} для всех каналов, включая отключённые.
+        """
+        if self._is_fresh():
+            return self._profiles
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._is_fresh():
+                return self._profiles
+
+            profiles = {}
+            async for doc in channels_collection.find():
+                profile = ChannelProfile(doc)
+                profiles[profile.chat_id] = profile
+
+            self._profiles = profiles
+            self._loaded_at = time.monotonic()
+            return profiles
+
+    async def get(self, chat_id: str):
+        profiles = await self.get_all()
+        return profiles.get(str(chat_id))
+
+    async def active_ids(self) -> list:
+        profiles = await self.get_all()
+        return [chat_id for chat_id, profile in profiles.items() if profile.enabled]
+
+    async def set(self, chat_id: str, **values):
+        """
+        Создаёт или обновляет профиль канала и сбрасывает кэш.
+        """
+        await channels_collection.update_one(
+            {"_id": str(chat_id)},
+            {"$set": values, "$setOnInsert": {"created_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self.invalidate()
+
+    def invalidate(self):
+        self._profiles = None
+        self._loaded_at = 0.0
+
+
+# Общий экземпляр для супервизора, планировщиков и команд
+channel_profiles = ChannelProfiles()
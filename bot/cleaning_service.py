@@ -0,0 +1,163 @@
+# cleaning_service.py
+
+import asyncio
+import multiprocessing
+from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import CLEANING_WORKERS, CLEANING_TIMEOUT, CLEANING_BATCH_SIZE, logger
+from misc import clean_news_text, render_news, clean_news_html
+from simhash import simhash
+from metrics import registry
+
+# Поля новости, которые нужны для обработки текста (остальное в процесс не передаём)
+NEWS_FIELDS = ("text", "url")
+
+
+def _payload(news: dict) -> dict:
+    return {field: news[field] for field in NEWS_FIELDS if field in news}
+
+
+# Функции ниже выполняются в дочерних процессах, поэтому они на уровне модуля.
+# Каждая обрабатывает пачку новостей за один вызов и возвращает пару: [(успех, результат или текст ошибки)]
+# и метрики этапов, накопленные в дочернем процессе (см. metrics.Registry.child_samples).
+
+def _clean_batch(news_list: list) -> Tuple[List[tuple], dict]:
+    results = []
+    for news in news_list:
+        try:
+            results.append((True, clean_news_text(news)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results, registry.child_samples()
+
+
+def _render_batch(news_list: list, max_news_length: int) -> Tuple[List[tuple], dict]:
+    results = []
+    for news in news_list:
+        try:
+            results.append((True, render_news(news, max_news_length)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results, registry.child_samples()
+
+
+def _fingerprint_batch(news_list: list) -> Tuple[List[tuple], dict]:
+    results = []
+    for news in news_list:
+        try:
+            results.append((True, simhash(clean_news_html(news.get("text", "")))))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results, registry.child_samples()
+
+
+class CleaningService:
+    """
+    Обработка текста новостей (BeautifulSoup/html.parser, регулярки, обрезка) в пуле процессов.
+
+    Это CPU-нагрузка: в event loop большая статья замораживала бы команды бота.
+    Новости отправляются в пул пачками по batch_size, пачки обрабатываются параллельно
+    на workers ядрах. На каждую пачку — timeout секунд (asyncio.TimeoutError).
+    При workers=0 пул не создаётся и обработка идёт прямо в event loop.
+    """
+
+    def __init__(
+            self,
+            workers: int = CLEANING_WORKERS,
+            timeout: float = CLEANING_TIMEOUT,
+            batch_size: int = CLEANING_BATCH_SIZE
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self._executor = None
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            # spawn, а не fork: в процессе бота уже работают потоки (motor, aiohttp),
+            # и форк с захваченными ими блокировками может повесить дочерний процесс
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self.workers <= 0:
+            results, _ = func(*args)
+            return results
+
+        self.start()
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        try:
+            # Зависший процесс таймаут не убивает, но вызывающий код перестаёт его ждать
+            results, samples = await asyncio.wait_for(
+                loop.run_in_executor(executor, func, *args),
+                timeout=self.timeout
+            )
+        except BrokenProcessPool:
+            # Дочерний процесс упал (например, из-за нехватки памяти) — пересоздаём пул.
+            # Старый пул закрываем, иначе остаются его служебный поток и процессы.
+            # Сломанный пул видят сразу несколько пачек: закрывает его только первая
+            if self._executor is executor:
+                logger.error("Пул обработки текста сломан, пересоздаём.")
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        registry.merge_samples(samples)
+        return results
+
+    def _batches(self, news_list: list) -> list:
+        payloads = [_payload(news) for news in news_list]
+        return [payloads[i:i + self.batch_size] for i in range(0, len(payloads), self.batch_size)]
+
+    async def clean_many(self, news_list: list) -> list:
+        """
+        Очищенный текст для каждой новости: [(успех, текст или описание ошибки)].
+        """
+        batches = await asyncio.gather(*(
+            self._run(_clean_batch, batch) for batch in self._batches(news_list)
+        ))
+        return [result for batch in batches for result in batch]
+
+    async def render_many(self, news_list: list, max_news_length: int) -> list:
+        """
+        Готовый HTML сообщения для каждой новости: [(успех, HTML или описание ошибки)].
+        """
+        batches = await asyncio.gather(*(
+            self._run(_render_batch, batch, max_news_length) for batch in self._batches(news_list)
+        ))
+        return [result for batch in batches for result in batch]
+
+    async def fingerprint_many(self, news_list: list) -> list:
+        """
+        SimHash очищенного текста каждой новости: [(успех, отпечаток или описание ошибки)].
+        """
+        batches = await asyncio.gather(*(
+            self._run(_fingerprint_batch, batch) for batch in self._batches(news_list)
+        ))
+        return [result for batch in batches for result in batch]
+
+    async def clean(self, news: dict) -> str:
+        ok, value = (await self.clean_many([news]))[0]
+        if not ok:
+            raise ValueError(value)
+        return value
+
+    async def render(self, news: dict, max_news_length: int) -> str:
+        ok, value = (await self.render_many([news], max_news_length))[0]
+        if not ok:
+            raise ValueError(value)
+        return value
+
+
+# Общий экземпляр для планировщика и команд
+cleaning_service = CleaningService()
@@ -5,6 +5,41 @@ CHANNEL_ID = "-1002370678576"
 
 ALL_CHANNELS = ["-1002370678576", "-1002454852648"]
 
+# Профили каналов (channel_profiles.py): при первом запуске ALL_CHANNELS переносится в коллекцию channels,
+# дальше каналы добавляются и отключаются командами бота без перезапуска
+CHANNEL_PROFILES_TTL = 30    # через сколько секунд профили перечитываются из БД
+SUPERVISOR_INTERVAL = 30     # как часто супервизор сверяет запущенные планировщики с профилями
+QUIET_HOURS_UTC_OFFSET = 3   # часовой пояс, в котором заданы «тихие часы» каналов (МСК)
+# Когда новость уходит из очереди: "all" — её получили (или пропустили по фильтру) все активные каналы,
+# "any" — хотя бы один канал, "per_channel" — каждый канал пробует её один раз (итог в deliveries)
+PUBLISH_MARK_POLICY = "all"
+# Сколько раз пробуем доставить новость в канал, прежде чем отказаться от неё для этого канала
+PUBLISH_MAX_ATTEMPTS = 3
+# Обработка текста новостей в пуле процессов (cleaning_service.py)
+CLEANING_WORKERS = 2         # 0 — обрабатывать прямо в event loop, без пула
+CLEANING_TIMEOUT = 30        # секунд на одну пачку
+CLEANING_BATCH_SIZE = 10     # новостей в одной пачке
+# Заранее подготовленные сообщения (render.py): сколько новостей за проход и пауза между проходами
+RENDER_BATCH_SIZE = 50
+RENDER_INTERVAL = 30
+# На сколько секунд публикатор «арендует» новость (защита от дублей при нескольких репликах)
+PUBLISH_LEASE_SECONDS = 300
+# Сколько новостей публикатор подгружает за раз и при каком остатке подгружает ещё
+PREFETCH_SIZE = 20
+PREFETCH_LOW_WATER = 5
+# Расписание публикаций (publish_plan.py): слоты, опоздавшие больше чем на SCHEDULE_MISSED_GRACE секунд,
+# пропускаются; спим не дольше SCHEDULE_CHECK_INTERVAL, чтобы вовремя заметить смену настроек
+SCHEDULE_MISSED_GRACE = 60
+SCHEDULE_CHECK_INTERVAL = 30
+
+# Лимиты Telegram для очереди исходящих сообщений (sender.py)
+SEND_GLOBAL_RATE = 30        # сообщений в секунду на весь бот
+SEND_PRIVATE_CHAT_RATE = 1   # сообщений в секунду в один личный чат
+SEND_GROUP_CHAT_RATE = 20    # сообщений в минуту в одну группу/канал
+SEND_WORKERS = 4
+SEND_MAX_RETRIES = 5
+SEND_BACKOFF_BASE = 1        # секунды, удваивается с каждой попыткой
+
 MONGODB_HOST = "194.87.186.63"
 MONGODB_USER = "Admin"
 MONGODB_PASS = "PasswordForMongo63"
@@ -14,7 +49,11 @@ MONGODB_AUTH_DB = "admin"
 DATABASE_NAME = "news_db"
 COLLECTION_NAME = "articles"
 
-# Допустимые пользователи
+# Создавать недостающие индексы при старте (False — только проверить и сообщить в лог)
+CREATE_INDEXES_ON_STARTUP = True
+
+# Администраторы хранятся в коллекции admins (admins.py). Этот список — первые владельцы (роль owner):
+# init_database добавляет их, только если коллекция admins пуста
 ALLOWED_USERS = [416546809, 282247284, 5257246969, 667847105, 81209035]
 
 # Логирование
@@ -29,6 +68,61 @@ DEFAULT_CONFIG = {
     "max_news_length": 4096
 }
 
+# Предел Telegram для текста сообщения: символы после разбора HTML, в единицах UTF-16
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Как бот получает апдейты: "polling" (long polling) или "webhook" (webhook.py)
+RUN_MODE = "polling"
+WEBHOOK_URL = "https://example.com"   # публичный адрес, на который Telegram шлёт апдейты (без пути)
+WEBHOOK_PATH = "/webhook"
+WEBHOOK_SECRET = ""                   # пусто — случайный секрет при каждом запуске
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = 8080
+WEBHOOK_MAX_CONCURRENCY = 20          # апдейтов в обработке одновременно
+WEBHOOK_DRAIN_TIMEOUT = 30            # сколько секунд ждать обработки принятых апдейтов при остановке
+
+# HTTP-эндпоинт /metrics (metrics_server.py); METRICS_ENABLED = False — не запускать
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9100
+
+# FSM-хранилище в Mongo (fsm_storage.py): сколько состояний держать в памяти и сколько секунд
+# доверять кэшу, как часто сбрасывать записи (0 — писать сразу) и через сколько часов удалять
+# брошенные диалоги. Кэш и отложенная запись — только для polling: там бот работает в одном
+# экземпляре. В режиме webhook апдейты чата могут попасть в разные реплики, поэтому bot.py
+# создаёт хранилище без кэша и с записью сразу (см. MongoStorage)
+FSM_CACHE_SIZE = 1000
+FSM_CACHE_TTL = 5
+FSM_FLUSH_INTERVAL = 0.5
+FSM_STATE_TTL_HOURS = 24
+
+# Сколько секунд кэш администраторов не перечитывается из БД (изменения с других реплик)
+ADMINS_TTL = 30
+
+# Как часто счётчики публикаций сбрасываются в коллекцию statistics (stats.py)
+STATS_FLUSH_INTERVAL = 10
+
+# Сколько секунд хранится подсчёт документов для пагинации /manage_*
+PAGINATION_COUNT_TTL = 30
+
+# Через сколько секунд кэш bot_config перечитывается из БД (на случай правок в обход бота)
+BOT_CONFIG_TTL = 60
+
+# Поиск ключевых слов и исключений (keyword_matcher.py): полная перезагрузка из БД раз в KEYWORD_MATCHER_TTL
+# секунд; автомат пересобирается, когда удалённых слов больше KEYWORD_REBUILD_RATIO от общего числа
+KEYWORD_MATCHER_TTL = 300
+KEYWORD_REBUILD_RATIO = 0.25
+
+# Отсев перепечаток (dedup.py): новость не публикуется, если за последние DEDUP_WINDOW_HOURS часов
+# в очереди была новость, чей SimHash отличается не больше чем в DEDUP_MAX_DISTANCE битах из 64
+DEDUP_WINDOW_HOURS = 72
+DEDUP_MAX_DISTANCE = 3
+# Как часто (секунды) подгружать отпечатки, сохранённые другими репликами
+DEDUP_SYNC_INTERVAL = 10
+
+# Чем извлекать текст из HTML новости: "stream" (html.parser, без дерева) или "bs4" (BeautifulSoup)
+HTML_CLEAN_BACKEND = "stream"
+
 CUSTOM_TITLE_SOURCES = {
     # Ключ — это точное значение поля news["title"]
     "Управление сельского хозяйства Липецкой области": "FIRST_SENTENCE",
@@ -0,0 +1,72 @@
+# config_cache.py
+
+import asyncio
+import time
+
+from config import DEFAULT_CONFIG, BOT_CONFIG_TTL, logger
+from database import config_collection
+
+
+class BotConfigCache:
+    """
+    Кэш документа bot_config в памяти процесса.
+
+    Публикатор читает max_news_length / news_per_hour / publish_interval отсюда,
+    а не из Mongo на каждую новость. Кэш сбрасывается, когда значения меняются
+    через команды бота (set), а правки «в обход» бота (напрямую в БД) подхватываются
+    не позже чем через ttl секунд.
+    """
+
+    def __init__(self, ttl: float = BOT_CONFIG_TTL):
+        self.ttl = ttl
+        self._config = None
+        self._loaded_at = 0.0
+        # Экземпляр создаётся при импорте, ещё до asyncio.run(); на Python 3.9 Lock
+        # привязывается к текущему loop при создании, поэтому создаём его в get()
+        self._lock = None
+
+    def _is_fresh(self) -> bool:
+        return self._config is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def get(self) -> dict:
+        if self._is_fresh():
+            return self._config
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Пока ждали блокировку, конфиг мог загрузить другой корутин
+            if self._is_fresh():
+                return self._config
+
+            config = await config_collection.find_one({"_id": "bot_config"})
+            if config is None:
+                logger.warning("bot_config не найден в БД, используем настройки по умолчанию.")
+                config = dict(DEFAULT_CONFIG)
+
+            self._config = config
+            self._loaded_at = time.monotonic()
+            return config
+
+    async def get_value(self, key: str, default=None):
+        config = await self.get()
+        return config.get(key, default)
+
+    async def set(self, **values):
+        """
+        Записывает новые значения в bot_config и сбрасывает кэш.
+        """
+        await config_collection.update_one(
+            {"_id": "bot_config"},
+            {"$set": values},
+            upsert=True
+        )
+        self.invalidate()
+
+    def invalidate(self):
+        self._config = None
+        self._loaded_at = 0.0
+
+
+# Общий экземпляр для публикатора и обработчиков команд
+bot_config = BotConfigCache()
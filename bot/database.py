@@ -1,6 +1,10 @@
 # database.py
 
-import pymongo
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, monitoring
+from pymongo.errors import BulkWriteError
 from config import (
     MONGODB_HOST,
     MONGODB_USER,
@@ -8,18 +12,42 @@ from config import (
     MONGODB_DBNAME,
     MONGODB_AUTH_DB,
     DEFAULT_CONFIG,
+    ALL_CHANNELS,
+    ALLOWED_USERS,
     DATABASE_NAME,
     COLLECTION_NAME,
     logger
 )
+from metrics import MONGO_COMMAND_SECONDS, MONGO_COMMAND_FAILURES
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Время каждой команды Mongo (find, update, aggregate, ...) в метрики.
+    Вызывается из потоков pymongo, поэтому только обновляет счётчики.
+    """
+
+    def started(self, event):
+        pass
 
-# Инициализация клиента
-mongo_client = pymongo.MongoClient(
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+
+
+# Инициализация клиента.
+# Motor — асинхронный драйвер поверх pymongo: запросы не блокируют event loop aiogram,
+# поэтому медленный ответ Mongo не останавливает polling, публикатор и команды админов.
+mongo_client = AsyncIOMotorClient(
     MONGODB_HOST,
     username=MONGODB_USER,
     password=MONGODB_PASS,
     authSource=MONGODB_AUTH_DB,
-    authMechanism='SCRAM-SHA-256'
+    authMechanism='SCRAM-SHA-256',
+    event_listeners=[CommandMetrics()]
 )
 
 # Получаем ссылку на базу данных
@@ -32,10 +60,77 @@ keywords_collection = db["keywords"]
 bans_collection = db["bans"]
 config_collection = db["config"]
 stats_collection = db["statistics"]
+channels_collection = db["channels"]
+fingerprints_collection = db["fingerprints"]
+fsm_collection = db["fsm_states"]
+admins_collection = db["admins"]
+
+
+async def init_database():
+    """
+    Вызывается один раз при старте бота (из bot.py), до запуска polling и фоновых задач.
+    """
+    # Убеждаемся, что конфиг бота есть в БД
+    await config_collection.update_one(
+        {"_id": "bot_config"},
+        {"$setOnInsert": DEFAULT_CONFIG},
+        upsert=True
+    )
+    # Каналы из config.ALL_CHANNELS становятся профилями (если их ещё нет)
+    for chat_id in ALL_CHANNELS:
+        await channels_collection.update_one(
+            {"_id": str(chat_id)},
+            {"$setOnInsert": {"enabled": True, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+    # Первые администраторы — из config.ALLOWED_USERS; дальше список ведётся командами /add_admin, /remove_admin
+    if await admins_collection.count_documents({}, limit=1) == 0:
+        # upsert, а не insert: реплики могут стартовать одновременно
+        for user_id in ALLOWED_USERS:
+            await admins_collection.update_one(
+                {"_id": user_id},
+                {"$setOnInsert": {"role": "owner", "added_at": datetime.utcnow(), "added_by": None}},
+                upsert=True
+            )
+        logger.info(f"Коллекция admins заполнена из ALLOWED_USERS: {len(ALLOWED_USERS)}")
+    logger.info("База данных инициализирована.")
+
+
+async def insert_unique(target_collection, field: str, docs: list) -> set:
+    """
+    Массово добавляет документы, уникальные по полю field (keywords, bans, sources):
+    один запрос $in, чтобы узнать, что уже есть, и один bulk_write upsert'ов для остального.
+    docs не должны повторяться по field. Возвращает множество значений field,
+    которые уже были в коллекции (их не добавляли), включая добавленные параллельно.
+    """
+    values = [doc[field] for doc in docs]
+    existing = set()
+    async for doc in target_collection.find({field: {"$in": values}}, {field: 1}):
+        existing.add(doc[field])
+
+    new_docs = [doc for doc in docs if doc[field] not in existing]
+    if not new_docs:
+        return existing
+
+    requests = [
+        UpdateOne({field: doc[field]}, {"$setOnInsert": doc}, upsert=True)
+        for doc in new_docs
+    ]
+    try:
+        result = await target_collection.bulk_write(requests, ordered=False)
+        upserted = set(result.upserted_ids)
+    except BulkWriteError as e:
+        # Дубль по уникальному индексу — значение добавили параллельно, это не ошибка
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        upserted = {item["index"] for item in e.details.get("upserted", [])}
+
+    # Добавлены только документы, созданные upsert'ом. Если значение успели добавить
+    # после запроса $in, upsert находит чужой документ (или ловит 11000) —
+    # такое значение тоже «уже было»
+    for index, doc in enumerate(new_docs):
+        if index not in upserted:
+            existing.add(doc[field])
+
+    return existing
 
-# Убеждаемся, что конфиг бота есть в БД
-config_collection.update_one(
-    {"_id": "bot_config"},
-    {"$setOnInsert": DEFAULT_CONFIG},
-    upsert=True
-)
@@ -0,0 +1,231 @@
+# dedup.py
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from config import DEDUP_WINDOW_HOURS, DEDUP_MAX_DISTANCE, DEDUP_SYNC_INTERVAL, RENDER_BATCH_SIZE, logger
+from database import collection, fingerprints_collection
+from cleaning_service import cleaning_service
+from simhash import FINGERPRINT_BITS, hamming_distance, to_signed, to_unsigned
+
+# При подгрузке берём и немного более старые отпечатки: часы реплик расходятся,
+# а запись с меньшим at могла появиться в коллекции позже уже прочитанных
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+class SimHashIndex:
+    """
+    Поиск похожих отпечатков (расстояние Хэмминга <= max_distance) без перебора всех.
+
+    Отпечаток режется на max_distance + 1 полос (LSH). Если два отпечатка отличаются
+    не больше чем в max_distance битах, хотя бы одна полоса у них совпадает целиком
+    (принцип Дирихле), поэтому достаточно сравнить отпечатки из max_distance + 1 корзин.
+    При 64 битах и max_distance=3 полоса — 16 бит, и на миллион отпечатков в корзине
+    в среднем около 15 кандидатов.
+    """
+
+    def __init__(self, max_distance: int = DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width, extra = divmod(FINGERPRINT_BITS, bands)
+        self._bands = []  # (сдвиг, маска) каждой полосы
+        shift = 0
+        for i in range(bands):
+            band_width = width + (1 if i < extra else 0)
+            self._bands.append((shift, (1 << band_width) - 1))
+            shift += band_width
+        self._tables = [{} for _ in range(bands)]
+        self._fingerprints = {}
+        self._added = deque()  # (время добавления, ключ) в порядке добавления
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def _band_keys(self, fingerprint: int):
+        return [(fingerprint >> shift) & mask for shift, mask in self._bands]
+
+    def add(self, key, fingerprint: int, added_at: datetime):
+        if key in self._fingerprints:
+            return
+        self._fingerprints[key] = fingerprint
+        for table, band_key in zip(self._tables, self._band_keys(fingerprint)):
+            table.setdefault(band_key, []).append(key)
+        self._added.append((added_at, key))
+
+    def remove(self, key):
+        fingerprint = self._fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        for table, band_key in zip(self._tables, self._band_keys(fingerprint)):
+            bucket = table[band_key]
+            bucket.remove(key)
+            if not bucket:
+                del table[band_key]
+
+    def expire(self, before: datetime):
+        """
+        Забывает отпечатки, добавленные раньше before (окно DEDUP_WINDOW_HOURS).
+        """
+        while self._added and self._added[0][0] < before:
+            _, key = self._added.popleft()
+            self.remove(key)
+
+    def find(self, fingerprint: int, exclude=None):
+        """
+        (ключ, расстояние) ближайшего похожего отпечатка или None.
+        """
+        best = None
+        seen = set()
+        for table, band_key in zip(self._tables, self._band_keys(fingerprint)):
+            for key in table.get(band_key, ()):
+                if key == exclude or key in seen:
+                    continue
+                seen.add(key)
+                distance = hamming_distance(fingerprint, self._fingerprints[key])
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (key, distance)
+        return best
+
+
+class Deduplicator:
+    """
+    Отсев перепечаток: одна и та же новость из нескольких источников публикуется один раз.
+
+    Для каждой новости из очереди считается SimHash очищенного текста (в пуле процессов,
+    см. cleaning_service). Если за последние window_hours в очередь уже поступала похожая новость,
+    эта помечается suppressed и снимается с публикации. Сравниваем с новостями, поступившими
+    в очередь, а не только с опубликованными: так из двух копий, ждущих публикации, уходит одна,
+    а окно отсчитывается от проверки первой копии, а не от её публикации.
+
+    Индекс отпечатков живёт в памяти (SimHashIndex) и сохраняется в коллекцию fingerprints
+    (TTL-индекс по полю at удаляет старые записи). Отпечатки других реплик подгружаются
+    не реже чем раз в sync_interval секунд и перед каждой пачкой в process(). Две реплики,
+    проверяющие копии одной новости одновременно (между подгрузками), всё же могут пропустить обе.
+    """
+
+    def __init__(
+            self,
+            window_hours: float = DEDUP_WINDOW_HOURS,
+            max_distance: int = DEDUP_MAX_DISTANCE,
+            sync_interval: float = DEDUP_SYNC_INTERVAL
+    ):
+        self.window = timedelta(hours=window_hours)
+        self.index = SimHashIndex(max_distance)
+        self.sync_interval = sync_interval
+        # at последнего прочитанного из коллекции отпечатка и когда читали (time.monotonic)
+        self._last_at = None
+        self._synced = None
+        # Lock создаётся в sync, уже внутри работающего event loop
+        self._lock = None
+
+    async def ensure_loaded(self):
+        await self.sync(force=False)
+
+    async def sync(self, force: bool = True):
+        """
+        Подгружает отпечатки, сохранённые с прошлой подгрузки (в том числе другими репликами).
+        Первая подгрузка читает всё окно. force=False — не чаще раза в sync_interval секунд.
+        """
+        if not force and self._synced is not None and time.monotonic() - self._synced < self.sync_interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force and self._synced is not None and time.monotonic() - self._synced < self.sync_interval:
+                return
+            since = datetime.utcnow() - self.window
+            if self._last_at is not None:
+                since = max(since, self._last_at - SYNC_OVERLAP)
+            before = len(self.index)
+            cursor = fingerprints_collection.find({"at": {"$gte": since}}).sort("at", 1)
+            async for doc in cursor:
+                self.index.add(doc["_id"], to_unsigned(doc["fp"]), doc["at"])
+                if self._last_at is None or doc["at"] > self._last_at:
+                    self._last_at = doc["at"]
+            if self._synced is None:
+                logger.info(f"Загружено отпечатков новостей: {len(self.index)}")
+            elif len(self.index) > before:
+                logger.debug(f"Подгружено отпечатков других реплик: {len(self.index) - before}")
+            self._synced = time.monotonic()
+
+    async def check(self, news_id, fingerprint):
+        """
+        Ищет похожую новость; если её нет — запоминает отпечаток этой.
+        Возвращает описание дубля для поля suppressed или None.
+        """
+        await self.ensure_loaded()
+        now = datetime.utcnow()
+        self.index.expire(now - self.window)
+        if fingerprint is None:
+            return None
+
+        match = self.index.find(fingerprint, exclude=news_id)
+        if match:
+            duplicate_of, distance = match
+            return {"reason": "duplicate", "duplicate_of": duplicate_of, "distance": distance, "at": now}
+
+        self.index.add(news_id, fingerprint, now)
+        await fingerprints_collection.update_one(
+            {"_id": news_id},
+            {"$set": {"fp": to_signed(fingerprint), "at": now}},
+            upsert=True
+        )
+        return None
+
+    async def process(self, news_list: list) -> list:
+        """
+        Проверяет новости (в порядке поступления) и записывает итог в документы.
+        Возвращает [suppressed или None] для каждой новости.
+        """
+        try:
+            results = await cleaning_service.fingerprint_many(news_list)
+        except asyncio.TimeoutError:
+            logger.error(f"Отпечатки {len(news_list)} новостей не посчитаны за отведённое время.")
+            results = [(False, "timeout")] * len(news_list)
+
+        # Свежие отпечатки других реплик — прямо перед проверкой пачки
+        await self.sync()
+
+        verdicts = []
+        for news, (ok, value) in zip(news_list, results):
+            if not ok:
+                # Без отпечатка новость публикуется как обычно, повторно её не проверяем
+                logger.error(f"Не удалось посчитать отпечаток новости {news['_id']}: {value}")
+                value = None
+
+            suppressed = await self.check(news["_id"], value)
+            update = {"fingerprint": to_signed(value) if value is not None else None}
+            if suppressed:
+                # Перепечатка уходит из очереди: published=True, причина — в suppressed
+                update["suppressed"] = suppressed
+                update["published"] = True
+                logger.info(
+                    f"Новость {news['_id']} похожа на {suppressed['duplicate_of']} "
+                    f"(расстояние {suppressed['distance']}), не публикуем."
+                )
+            await collection.update_one({"_id": news["_id"]}, {"$set": update})
+            news.update(update)
+            verdicts.append(suppressed)
+        return verdicts
+
+
+async def dedup_pending_news(limit: int = RENDER_BATCH_SIZE) -> int:
+    """
+    Этап перед рендером: проверяет на дубли новости из очереди, у которых ещё нет отпечатка.
+    Возвращает число проверенных новостей.
+    """
+    cursor = collection.find(
+        {"published": False, "fingerprint": {"$exists": False}},
+        {"text": 1}
+    ).sort("_id", 1).limit(limit)
+
+    news_list = await cursor.to_list(length=limit)
+    if news_list:
+        await deduplicator.process(news_list)
+    return len(news_list)
+
+
+# Общий экземпляр для фоновой задачи render_worker и публикатора
+deduplicator = Deduplicator()
@@ -0,0 +1,168 @@
+# fsm_storage.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from pymongo import DeleteOne, UpdateOne
+
+from config import FSM_CACHE_SIZE, FSM_CACHE_TTL, FSM_FLUSH_INTERVAL, logger
+from database import fsm_collection
+
+
+def storage_key_id(key: StorageKey) -> str:
+    """
+    _id документа состояния: bot:chat:user[:thread][:destiny].
+    """
+    parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+    if key.thread_id is not None:
+        parts.append(f"t{key.thread_id}")
+    if key.destiny != "default":
+        parts.append(key.destiny)
+    return ":".join(parts)
+
+
+class MongoStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram в коллекции fsm_states: незаконченные диалоги
+    (/add_sources, /add_keywords, /add_bans) переживают перезапуск и видны всем репликам бота.
+
+    Поверх Mongo — LRU-кэш на cache_size ключей: чтение состояния на каждом апдейте
+    не ходит в БД. Записи копятся в памяти и раз в flush_interval секунд уходят одним
+    bulk_write (несколько шагов диалога подряд — одна запись). Пустое состояние
+    (после state.clear()) удаляет документ, а брошенные диалоги удаляет TTL-индекс
+    по updated_at (см. indexes.py).
+
+    Запись в кэше живёт cache_ttl секунд, после этого состояние перечитывается из Mongo.
+    flush_interval = 0 — запись сразу (write-through).
+
+    Кэш и отложенная запись безопасны, только пока все апдейты чата обрабатывает один процесс
+    (polling). Если апдейты раздаются нескольким репликам (webhook за балансировщиком),
+    реплика увидела бы устаревшее состояние: чужую запись — через cache_ttl, а свою
+    несброшенную другая реплика не видит до flush. Поэтому там нужны cache_ttl = 0
+    и flush_interval = 0: каждое чтение идёт в Mongo, каждая запись — сразу (см. bot.py).
+    """
+
+    def __init__(
+        self,
+        cache_size: int = FSM_CACHE_SIZE,
+        cache_ttl: float = FSM_CACHE_TTL,
+        flush_interval: float = FSM_FLUSH_INTERVAL
+    ):
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        # _id -> (время загрузки, {"state", "data"})
+        self._cache = OrderedDict()
+        # Ещё не записанные в Mongo: _id -> {"state", "data"}; _flushing — записываемые сейчас
+        self._dirty = {}
+        self._flushing = {}
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stop = asyncio.Event()
+
+    def _remember(self, key_id: str, record: dict):
+        self._cache[key_id] = (time.monotonic(), record)
+        self._cache.move_to_end(key_id)
+        while len(self._cache) > self.cache_size:
+            # Вытесненная запись не теряется: несохранённое лежит в _dirty
+            self._cache.popitem(last=False)
+
+    async def _get_record(self, key: StorageKey) -> dict:
+        key_id = storage_key_id(key)
+        cached = self._cache.get(key_id)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            self._cache.move_to_end(key_id)
+            return cached[1]
+
+        # Своя несохранённая запись новее того, что лежит в Mongo
+        record = self._dirty.get(key_id) or self._flushing.get(key_id)
+        if record is None:
+            doc = await fsm_collection.find_one({"_id": key_id}, {"state": 1, "data": 1}) or {}
+            record = {"state": doc.get("state"), "data": doc.get("data") or {}}
+        self._remember(key_id, record)
+        return record
+
+    async def _put_record(self, key: StorageKey, record: dict):
+        key_id = storage_key_id(key)
+        self._remember(key_id, record)
+        self._dirty[key_id] = record
+        if self.flush_interval <= 0:
+            await self.flush()
+        elif self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        state = state.state if isinstance(state, State) else state
+        await self._put_record(key, {"state": state, "data": record["data"]})
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_record(key)
+        return record["state"]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get_record(key)
+        await self._put_record(key, {"state": record["state"], "data": data.copy()})
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_record(key)
+        return record["data"].copy()
+
+    async def flush(self):
+        """
+        Записывает накопленные изменения одним bulk_write.
+        """
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            self._flushing, self._dirty = self._dirty, {}
+            now = datetime.utcnow()
+            requests = []
+            for key_id, record in self._flushing.items():
+                if record["state"] is None and not record["data"]:
+                    requests.append(DeleteOne({"_id": key_id}))
+                else:
+                    requests.append(UpdateOne(
+                        {"_id": key_id},
+                        {"$set": {"state": record["state"], "data": record["data"], "updated_at": now}},
+                        upsert=True
+                    ))
+            try:
+                await fsm_collection.bulk_write(requests, ordered=False)
+            except Exception:
+                # Не теряем изменения: более новые записи (в _dirty) важнее неудавшихся
+                for key_id, record in self._flushing.items():
+                    self._dirty.setdefault(key_id, record)
+                raise
+            finally:
+                self._flushing = {}
+
+    async def _run(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Не удалось записать состояния FSM: {e}")
+
+    async def close(self) -> None:
+        """
+        Вызывается диспетчером при остановке (dp.emit_shutdown).
+        """
+        # Фоновый сброс не отменяем посреди bulk_write, а дожидаемся
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Не удалось записать состояния FSM при остановке: {e}")
@@ -0,0 +1,91 @@
+# html_text.py
+
+from html.parser import HTMLParser
+
+# Теги, из которых берём текст (как в clean_news_html)
+BLOCK_TAGS = {'div', 'p'}
+INLINE_TAGS = {'span'}
+# Поддеревья, текст из которых не нужен вовсе
+SKIP_TAGS = {'table', 'script', 'style'}
+
+
+class BlockTextExtractor(HTMLParser):
+    """
+    Потоковое извлечение текста из <div>, <p>, <span> без построения дерева.
+
+    В отличие от BeautifulSoup + find_all(...).get_text(), каждый кусок текста
+    попадает в результат ровно один раз — в тот блок, который его непосредственно
+    содержит. Поэтому span внутри div больше не дублируется:
+      - <div>/<p> начинают и заканчивают отдельный блок (строку результата);
+      - <span> внутри div/p — часть текста блока, а «сам по себе» — отдельный блок;
+      - содержимое <table> (и script/style) пропускается целиком.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._pieces = []
+        self._open = []        # открытые div/p/span, от внешнего к внутреннему
+        self._skip_depth = 0   # глубина вложенности в пропускаемые теги
+
+    def _flush(self):
+        if self._pieces:
+            self.blocks.append(' '.join(self._pieces))
+            self._pieces = []
+
+    def _starts_block(self, tag: str) -> bool:
+        if tag in BLOCK_TAGS:
+            return True
+        # span разбивает текст на блоки, только если он не внутри div/p
+        return tag in INLINE_TAGS and not any(t in BLOCK_TAGS for t in self._open)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in BLOCK_TAGS or tag in INLINE_TAGS:
+            if self._starts_block(tag):
+                self._flush()
+            self._open.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        if self._skip_depth or tag not in self._open:
+            return
+        # Закрываем всё до соответствующего открывающего тега (на случай незакрытых тегов)
+        while self._open:
+            closed = self._open.pop()
+            if closed == tag:
+                break
+        if self._starts_block(tag):
+            self._flush()
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/>, <br/> и т.п. — текста внутри нет, блоки не открываем
+        pass
+
+    def handle_data(self, data):
+        if self._skip_depth or not self._open:
+            return
+        data = data.strip()
+        if data:
+            self._pieces.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_block_text(html_text: str) -> str:
+    """
+    Текст из <div>/<p>/<span>, блоки разделены переводом строки.
+    """
+    parser = BlockTextExtractor()
+    parser.feed(html_text)
+    parser.close()
+    return "\n".join(parser.blocks)
@@ -0,0 +1,94 @@
+# indexes.py
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from config import COLLECTION_NAME, CREATE_INDEXES_ON_STARTUP, DEDUP_WINDOW_HOURS, FSM_STATE_TTL_HOURS, logger
+from database import db
+
+# Индексы, без которых горячие запросы бота превращаются в полный просмотр коллекции.
+# Ключ — имя коллекции, значение — список IndexModel.
+REQUIRED_INDEXES = {
+    COLLECTION_NAME: [
+        # Очередь публикации: только неопубликованные новости в порядке поступления (_id).
+        # Частичным не может быть индекс по одному _id, поэтому ключ составной
+        IndexModel(
+            [("published", ASCENDING), ("_id", ASCENDING)],
+            name="unpublished_by_ingest",
+            partialFilterExpression={"published": False}
+        ),
+    ],
+    "fingerprints": [
+        # Отпечатки старше окна отсева дублей Mongo удаляет сама
+        IndexModel([("at", ASCENDING)], name="at_ttl", expireAfterSeconds=int(DEDUP_WINDOW_HOURS * 3600)),
+    ],
+    "fsm_states": [
+        # Незаконченные диалоги админов (fsm_storage.py), к которым давно не возвращались
+        IndexModel([("updated_at", ASCENDING)], name="updated_at_ttl", expireAfterSeconds=int(FSM_STATE_TTL_HOURS * 3600)),
+    ],
+    "statistics": [
+        # Поминутные документы счётчиков: upsert по (timestamp, channel) и выборка окна для /stats
+        IndexModel([("timestamp", ASCENDING), ("channel", ASCENDING)], name="timestamp_channel"),
+    ],
+    "sources": [
+        IndexModel([("url", ASCENDING)], name="url_unique", unique=True),
+    ],
+    "keywords": [
+        IndexModel([("keyword", ASCENDING)], name="keyword_unique", unique=True),
+    ],
+    "bans": [
+        IndexModel([("keyword", ASCENDING)], name="keyword_unique", unique=True),
+    ],
+}
+
+
+def _index_matches(existing: dict, model: IndexModel) -> bool:
+    """
+    Сравниваем по ключам и по тем опциям, которые важны для запросов.
+    """
+    wanted = model.document
+    if list(existing.get("key", [])) != list(wanted["key"].items()):
+        return False
+    if bool(existing.get("unique")) != bool(wanted.get("unique")):
+        return False
+    if existing.get("partialFilterExpression") != wanted.get("partialFilterExpression"):
+        return False
+    return True
+
+
+async def find_missing_indexes() -> dict:
+    """
+    Возвращает {коллекция: [имена отсутствующих индексов]}.
+    """
+    missing = {}
+    for collection_name, models in REQUIRED_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for model in models:
+            if not any(_index_matches(info, model) for info in existing.values()):
+                missing.setdefault(collection_name, []).append(model.document["name"])
+    return missing
+
+
+async def ensure_indexes():
+    """
+    Вызывается при старте бота: создаёт недостающие индексы
+    (если включено CREATE_INDEXES_ON_STARTUP) и сообщает о тех, что создать не удалось.
+    """
+    if CREATE_INDEXES_ON_STARTUP:
+        for collection_name, models in REQUIRED_INDEXES.items():
+            # По одному: неудачный индекс не мешает создать остальные индексы коллекции
+            for model in models:
+                try:
+                    await db[collection_name].create_indexes([model])
+                except OperationFailure as e:
+                    # Например, уникальный индекс не строится из-за уже существующих дублей
+                    logger.error(
+                        f"Не удалось создать индекс {model.document['name']} для коллекции {collection_name}: {e}"
+                    )
+
+    missing = await find_missing_indexes()
+    for collection_name, names in missing.items():
+        logger.warning(f"В коллекции {collection_name} нет индексов: {', '.join(names)}")
+    if not missing:
+        logger.info("Все необходимые индексы на месте.")
+    return missing
@@ -0,0 +1,332 @@
+# keyword_matcher.py
+
+import asyncio
+import hashlib
+import html
+import re
+import time
+from collections import deque
+
+from config import KEYWORD_MATCHER_TTL, KEYWORD_REBUILD_RATIO, logger
+from database import keywords_collection, bans_collection
+
+KEYWORD = "keyword"
+BAN = "ban"
+
+# Теги и HTML-сущности убираем до поиска, чтобы не находить слова в атрибутах и ссылках
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+# «ё» → «е», «İ» → «i»: у «İ» нижний регистр из двух символов, а fold не должен менять длину
+_FOLD_TABLE = str.maketrans({"ё": "е", "Ё": "е", "\u0130": "i"})
+
+
+def fold(text: str) -> str:
+    """
+    Приведение к одному регистру для поиска: lower() и «ё» → «е».
+    Длина строки не меняется (в отличие от casefold: «ß» → «ss»), поэтому позиции
+    вхождений в свёрнутом тексте совпадают с позициями в исходном.
+    """
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо–Корасик: все шаблоны ищутся за один проход по тексту.
+
+    Шаблоны можно добавлять в уже построенный автомат: новые ветки дописываются в бор,
+    а перед следующим поиском пересчитываются только затронутые ссылки — у новых вершин
+    (по глубине, как в обычном BFS) и у старых вершин, чей самый длинный суффикс в боре
+    стал новой вершиной. Такие вершины ищутся по обратным ссылкам неудачи от родителя новой
+    вершины, и обход обрывается там, где суффикс длиннее уже есть. Короткие новые ветки
+    (у корня) затрагивают большую часть бора, поэтому первое построение и добавление
+    большого числа вершин разом делаются полным BFS.
+    Удаление шаблонов автомат не поддерживает (см. KeywordMatcher).
+    """
+
+    def __init__(self):
+        self._goto = [{}]     # переходы по символу
+        self._fail = [0]      # ссылка неудачи
+        self._out = [[]]      # id шаблонов, которые заканчиваются в этой вершине
+        self._out_link = [0]  # ближайшая по ссылкам неудачи вершина, где заканчивается шаблон
+        self._depth = [0]
+        self._fail_children = [set()]  # обратные ссылки неудачи
+        self._built = False
+        self._new_nodes = []      # (вершина, родитель, символ) с последнего построения
+        self._new_terminals = []  # вершины, где впервые заканчивается шаблон
+
+    def add(self, pattern_id: int, word: str):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._out_link.append(0)
+                self._depth.append(self._depth[node] + 1)
+                self._fail_children.append(set())
+                self._goto[node][ch] = nxt
+                self._new_nodes.append((nxt, node, ch))
+            node = nxt
+        if not self._out[node]:
+            self._new_terminals.append(node)
+        self._out[node].append(pattern_id)
+
+    def _build(self):
+        goto, fail, out, out_link = self._goto, self._fail, self._out, self._out_link
+        children = self._fail_children = [set() for _ in goto]
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            out_link[child] = 0
+            children[0].add(child)
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[child] = target
+                children[target].add(child)
+                out_link[child] = target if out[target] else out_link[target]
+                queue.append(child)
+
+        self._built = True
+        self._new_nodes = []
+        self._new_terminals = []
+
+    def _update(self):
+        if not self._new_nodes and not self._new_terminals:
+            return
+        if not self._built or 2 * len(self._new_nodes) > len(self._goto):
+            self._build()
+            return
+
+        goto, fail, depth, children = self._goto, self._fail, self._depth, self._fail_children
+        new = {node for node, _, _ in self._new_nodes}
+        changed = set(self._new_terminals)
+
+        for node, parent, ch in sorted(self._new_nodes, key=lambda item: depth[item[0]]):
+            if parent == 0:
+                target = 0
+            else:
+                f = fail[parent]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+            fail[node] = target
+            children[target].add(node)
+            changed.add(node)
+
+            # Старые вершины, оканчивающиеся на строку node: их родитель оканчивается
+            # на строку parent, то есть лежит в поддереве parent по ссылкам неудачи
+            stack = [q for q in children[parent] if q != node]
+            while stack:
+                q = stack.pop()
+                v = goto[q].get(ch)
+                if v is None or v in new:
+                    # У новой v ссылка посчитается в свою очередь, а ниже могут быть старые вершины
+                    stack.extend(children[q])
+                    continue
+                if depth[fail[v]] < depth[node]:
+                    children[fail[v]].discard(v)
+                    fail[v] = node
+                    children[node].add(v)
+                    changed.add(v)
+                # Ниже в поддереве q у вершин по ch суффикс не короче v — их не трогаем
+
+        self._refresh_out_links(changed)
+        self._new_nodes = []
+        self._new_terminals = []
+
+    def _refresh_out_links(self, roots):
+        """
+        Пересчитывает out_link у вершин с новой ссылкой неудачи или новым шаблоном
+        и у их потомков по ссылкам неудачи, пока значение меняется.
+        """
+        fail, out, out_link, depth, children = self._fail, self._out, self._out_link, self._depth, self._fail_children
+        for root in sorted(roots, key=depth.__getitem__):
+            target = fail[root]
+            out_link[root] = target if out[target] else out_link[target]
+            stack = list(children[root])
+            while stack:
+                node = stack.pop()
+                target = fail[node]
+                link = target if out[target] else out_link[target]
+                if link != out_link[node] or node in roots:
+                    out_link[node] = link
+                    stack.extend(children[node])
+
+    def iter_matches(self, text: str):
+        """
+        (индекс последнего символа, id шаблона) для каждого вхождения.
+        """
+        self._update()
+
+        goto, fail, out, out_link = self._goto, self._fail, self._out, self._out_link
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            match = node if out[node] else out_link[node]
+            while match:
+                for pattern_id in out[match]:
+                    yield i, pattern_id
+                match = out_link[match]
+
+    def __len__(self):
+        return len(self._goto)
+
+
+class KeywordMatcher:
+    """
+    Поиск ключевых слов (коллекция keywords) и исключений (bans) в новости одним проходом.
+
+    Слово находится только целиком: символы слева и справа от вхождения не должны быть
+    буквами/цифрами. Звёздочка в конце («липецк*») разрешает любое окончание — удобно
+    для падежей. Регистр и «ё/е» не различаются.
+
+    Добавление через бота дописывает шаблоны в текущий автомат (ссылки неудачи
+    пересчитываются только у затронутых вершин, см. AhoCorasick). Удалённые шаблоны
+    просто перестают учитываться, а когда их набирается больше KEYWORD_REBUILD_RATIO
+    от общего числа, автомат собирается заново. Правки напрямую в БД подхватываются
+    полной перезагрузкой раз в KEYWORD_MATCHER_TTL секунд.
+    """
+
+    def __init__(self, ttl: float = KEYWORD_MATCHER_TTL, rebuild_ratio: float = KEYWORD_REBUILD_RATIO):
+        self.ttl = ttl
+        self.rebuild_ratio = rebuild_ratio
+        self.version = None
+        self._automaton = AhoCorasick()
+        self._patterns = []   # id -> (вид, исходное слово, длина, только начало слова) или None, если удалён
+        self._active = {}     # (вид, исходное слово) -> id
+        self._removed = 0
+        self._loaded_at = None
+        # Создаётся в ensure_loaded: общий экземпляр импортируется до запуска event loop
+        self._lock = None
+
+    # ---------- Изменение набора шаблонов ----------
+
+    def _add(self, kind: str, word: str):
+        word = word.strip()
+        if not word or (kind, word) in self._active:
+            return
+        prefix = word.endswith("*")
+        folded = fold(word.rstrip("*").strip())
+        if not folded:
+            return
+
+        pattern_id = len(self._patterns)
+        self._patterns.append((kind, word, len(folded), prefix))
+        self._active[(kind, word)] = pattern_id
+        self._automaton.add(pattern_id, folded)
+
+    def _remove(self, kind: str, word: str):
+        pattern_id = self._active.pop((kind, word.strip()), None)
+        if pattern_id is None:
+            return
+        self._patterns[pattern_id] = None
+        self._removed += 1
+        if self._removed > self.rebuild_ratio * len(self._patterns):
+            self._rebuild(list(self._active))
+
+    def _rebuild(self, entries):
+        self._automaton = AhoCorasick()
+        self._patterns = []
+        self._active = {}
+        self._removed = 0
+        for kind, word in entries:
+            self._add(kind, word)
+
+    def _update_version(self):
+        digest = hashlib.sha1()
+        for kind, word in sorted(self._active):
+            digest.update(f"{kind}\0{word}\0".encode("utf-8"))
+        self.version = digest.hexdigest()
+
+    def add_keywords(self, words):
+        for word in words:
+            self._add(KEYWORD, word)
+        self._update_version()
+
+    def remove_keyword(self, word: str):
+        self._remove(KEYWORD, word)
+        self._update_version()
+
+    def add_bans(self, words):
+        for word in words:
+            self._add(BAN, word)
+        self._update_version()
+
+    def remove_ban(self, word: str):
+        self._remove(BAN, word)
+        self._update_version()
+
+    # ---------- Загрузка из БД ----------
+
+    async def load(self):
+        entries = []
+        async for doc in keywords_collection.find({}, {"keyword": 1}):
+            entries.append((KEYWORD, doc["keyword"]))
+        async for doc in bans_collection.find({}, {"keyword": 1}):
+            entries.append((BAN, doc["keyword"]))
+
+        self._rebuild(entries)
+        self._update_version()
+        self._loaded_at = time.monotonic()
+        logger.info(f"Загружено ключевых слов и исключений для поиска: {len(self._active)}")
+
+    async def ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                await self.load()
+
+    # ---------- Поиск ----------
+
+    def match(self, text: str):
+        """
+        Возвращает (ключевые слова, исключения), найденные в тексте,
+        в порядке первого вхождения и без повторов.
+        """
+        text = fold(text)
+        last = len(text) - 1
+        keywords, bans = {}, {}
+        for end, pattern_id in self._automaton.iter_matches(text):
+            pattern = self._patterns[pattern_id]
+            if pattern is None:
+                continue
+            kind, word, length, prefix = pattern
+            start = end - length + 1
+            # Граница слова проверяется, только если шаблон сам начинается/заканчивается буквой
+            if start > 0 and is_word_char(text[start]) and is_word_char(text[start - 1]):
+                continue
+            if not prefix and end < last and is_word_char(text[end]) and is_word_char(text[end + 1]):
+                continue
+            (keywords if kind == KEYWORD else bans).setdefault(word, None)
+        return list(keywords), list(bans)
+
+    def match_news(self, news: dict):
+        """
+        Поиск по заголовку и тексту новости (без HTML-разметки).
+        """
+        text = html.unescape(TAG_RE.sub(" ", news.get("text") or ""))
+        return self.match(f"{news.get('title') or ''}\n{text}")
+
+
+# Общий экземпляр для рендера, публикатора и обработчиков команд
+keyword_matcher = KeywordMatcher()
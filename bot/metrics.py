@@ -0,0 +1,244 @@
+# metrics.py
+
+import bisect
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+
+# Границы корзин гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        # Наблюдения приходят и из потоков pymongo (CommandListener), поэтому под блокировкой
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Значение считывается в момент запроса /metrics функцией collect() -> {значения меток: число}
+    (например, глубина очереди отправки).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect, labels: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+
+    def render(self) -> list:
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # значения меток -> [счётчики по корзинам (последняя — +Inf), сумма, количество]
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def drain(self) -> dict:
+        """
+        Забирает накопленные наблюдения и обнуляет гистограмму (см. child_samples).
+        """
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series: dict):
+        with self._lock:
+            for key, (counts, total, count) in series.items():
+                current = self._series.get(key)
+                if current is None:
+                    current = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                for i, value in enumerate(counts):
+                    current[0][i] += value
+                current[1] += total
+                current[2] += count
+
+    def render(self) -> list:
+        with self._lock:
+            series = {key: ([*counts], total, count) for key, (counts, total, count) in self._series.items()}
+
+        lines = self.header()
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, value in zip(self.buckets + (float("inf"),), counts):
+                cumulative += value
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric):
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        Все метрики в текстовом формате Prometheus.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def child_samples(self) -> dict:
+        """
+        В дочернем процессе пула (cleaning_service) гистограммы копятся в его собственной памяти.
+        Функции пула отдают их вместе с результатом, а основной процесс добавляет к своим (merge_samples).
+        В основном процессе ничего не забираем.
+        """
+        if multiprocessing.parent_process() is None:
+            return {}
+        return {
+            name: metric.drain()
+            for name, metric in self._metrics.items()
+            if isinstance(metric, Histogram)
+        }
+
+    def merge_samples(self, samples: dict):
+        for name, series in samples.items():
+            metric = self._metrics.get(name)
+            if isinstance(metric, Histogram) and series:
+                metric.merge(series)
+
+
+registry = Registry()
+
+
+# ---------- Метрики бота ----------
+
+# Этапы подготовки текста новости (misc.clean_news_text / misc.render_news)
+RENDER_STAGE_SECONDS = Histogram(
+    "harvest_render_stage_seconds",
+    "Время этапов подготовки текста новости",
+    labels=("stage",)
+)
+# Публикация одной новости в канал целиком и отдельно отправка (с ожиданием в очереди sender)
+PUBLISH_SECONDS = Histogram(
+    "harvest_publish_seconds",
+    "Время публикации новости в канал",
+    labels=("channel",)
+)
+SEND_SECONDS = Histogram(
+    "harvest_send_seconds",
+    "Время отправки сообщения в канал, включая ожидание лимитов Telegram",
+    labels=("channel",)
+)
+# Насколько позже своего слота сработал планировщик канала
+SCHEDULER_LAG_SECONDS = Histogram(
+    "harvest_scheduler_lag_seconds",
+    "Опоздание публикации относительно слота плана",
+    labels=("channel",)
+)
+# Команды Mongo (pymongo CommandListener, см. database.py)
+MONGO_COMMAND_SECONDS = Histogram(
+    "harvest_mongo_command_seconds",
+    "Время выполнения команд MongoDB",
+    labels=("command",)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "harvest_mongo_command_failures_total",
+    "Команды MongoDB, завершившиеся ошибкой",
+    labels=("command",)
+)
+# Обработчики aiogram (middlewares/metrics.py)
+HANDLER_SECONDS = Histogram(
+    "harvest_handler_seconds",
+    "Время обработки апдейта обработчиком бота",
+    labels=("router", "handler")
+)
+HANDLER_ERRORS = Counter(
+    "harvest_handler_errors_total",
+    "Обработчики бота, завершившиеся исключением",
+    labels=("router", "handler")
+)
+# Команды бота целиком: проверка прав, сброс состояния и обработчик (middlewares/commands.py)
+COMMAND_SECONDS = Histogram(
+    "harvest_command_seconds",
+    "Время обработки команды бота",
+    labels=("command",)
+)
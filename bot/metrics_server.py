@@ -0,0 +1,29 @@
+# metrics_server.py
+
+from aiohttp import web
+
+from config import METRICS_HOST, METRICS_PORT, logger
+from metrics import registry
+
+
+async def handle_metrics(request):
+    return web.Response(
+        text=registry.render(),
+        content_type="text/plain",
+        charset="utf-8",
+        headers={"X-Content-Type-Options": "nosniff"}
+    )
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> web.AppRunner:
+    """
+    HTTP-сервер /metrics в том же event loop, что и бот (формат Prometheus).
+    Возвращает runner — его нужно закрыть через runner.cleanup() при остановке.
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
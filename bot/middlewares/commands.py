@@ -0,0 +1,41 @@
+# middlewares/commands.py
+
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from metrics import COMMAND_SECONDS
+
+
+class CommandMiddleware(BaseMiddleware):
+    """
+    Общая подготовка команд (внутренний middleware диспетчера для message:
+    вызывается, когда для сообщения уже найден обработчик).
+
+    - Сообщение, начинающееся с '/', сбрасывает незаконченный диалог FSM. Если состояния нет
+      (обычный случай), ничего не пишем: get_state отвечает из кэша хранилища.
+    - Права проверяет фильтр admins.RoleFilter ещё до выбора обработчика.
+    - Время обработки команды — в метрику harvest_command_seconds.
+    Обычные сообщения (не команды) проходят без дополнительной работы.
+    """
+
+    async def __call__(self, handler, event, data):
+        if not isinstance(event, Message) or not event.text or event.text[0] != "/":
+            return await handler(event, data)
+
+        state = data.get("state")
+        if state is not None and await state.get_state() is not None:
+            await state.clear()
+
+        # CommandObject кладёт фильтр Command; без него это шаг диалога, начатый с '/'
+        command = data.get("command")
+        if command is None:
+            return await handler(event, data)
+
+        name = command.command
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            COMMAND_SECONDS.observe(time.perf_counter() - started, command=name)
@@ -0,0 +1,27 @@
+import time
+
+from aiogram import BaseMiddleware
+
+from metrics import HANDLER_SECONDS, HANDLER_ERRORS
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Время работы обработчиков роутера (внутренний middleware: вызывается,
+    только когда апдейт попал в обработчик этого роутера).
+    """
+
+    def __init__(self, router_name: str):
+        self.router_name = router_name
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        handler_name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(router=self.router_name, handler=handler_name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, router=self.router_name, handler=handler_name)
@@ -1,8 +1,11 @@
 import re
-from config import CUSTOM_TITLE_SOURCES
+from config import CUSTOM_TITLE_SOURCES, HTML_CLEAN_BACKEND, TELEGRAM_MESSAGE_LIMIT
 from bs4 import BeautifulSoup
 import html
 
+from html_text import extract_block_text
+from metrics import RENDER_STAGE_SECONDS
+
 TO_REMOVE_PATTERNS_CONDITIONAL = [
     r'^Экспорт/Импорт\s*$',
     r'^Фот\w*:\s*.*',
@@ -142,64 +145,101 @@ def get_effective_title(news: dict) -> str:
         return raw_title
 
 
+# Знаки, на которых можно закончить обрезанный текст
+TRUNCATE_DELIMITERS = '.?!;\n'
+TRUNCATE_DELIMITERS_RE = re.compile(r'[.?!;\n]')
+
+
+def utf16_len(text: str) -> int:
+    """
+    Длина текста так, как её считает Telegram: в кодовых единицах UTF-16
+    (эмодзи и другие символы вне BMP занимают две единицы).
+    """
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _utf16_units_to_chars(encoded: bytes, limit: int) -> int:
+    """
+    Сколько символов помещается в первые limit единиц текста, закодированного в UTF-16-LE.
+    """
+    encoded = encoded[:2 * limit]
+    # Не разрезаем суррогатную пару: старший байт последней единицы — D8..DB
+    if encoded and 0xD8 <= encoded[-1] <= 0xDB:
+        encoded = encoded[:-2]
+    return len(encoded.decode('utf-16-le'))
+
+
+def utf16_prefix_end(text: str, limit: int) -> int:
+    """
+    Наибольший индекс i, при котором utf16_len(text[:i]) <= limit.
+    Кодируется только text[:limit] — каждый символ занимает хотя бы одну единицу.
+    """
+    if limit <= 0:
+        return 0
+    head = text[:limit]
+    encoded = head.encode('utf-16-le')
+    if len(encoded) <= 2 * limit:
+        return len(head)
+    return _utf16_units_to_chars(encoded, limit)
+
+
 def flexible_truncate_text_by_delimiters(
         text: str,
         max_len: int,
-        flex_margin: int = 200
+        flex_margin: int = 200,
+        hard_limit: int = None
 ) -> str:
     """
-    Обрезает text, стараясь завершить на знаках пунктуации (.?!;\n), и разрешает
-    чуть выйти за границу max_len (до flex_margin символов). Если во всех этих
-    пределах не найден знак, принудительно идём дальше до ближайшего разделителя.
+    Обрезает text до max_len (в единицах UTF-16, как считает Telegram), стараясь
+    закончить на знаке пунктуации (.?!;\n):
+      1) первый разделитель сразу после max_len — можно выйти за границу на flex_margin,
+         но не дальше hard_limit;
+      2) иначе последний разделитель до max_len;
+      3) иначе последний пробел до max_len и «…» (в тексте без пробелов — ровно по границе).
+    Просматривается только окно около границы, результат всегда не длиннее
+    max(max_len, hard_limit) и никогда не None.
     """
-
-    # Наш набор разделителей: точка, вопросительный, восклицательный, точка с запятой, \n
-    pattern = re.compile(r'[.?!;\n]')
-
     text = text.strip()
-    if len(text) <= max_len:
-        # 1) Если весь текст короче лимита, возвращаем без изменений
+    if max_len <= 0:
+        return ''
+
+    flex_limit = max_len + flex_margin
+    if hard_limit is not None:
+        flex_limit = max(max_len, min(flex_limit, hard_limit))
+
+    # Дальше flex_limit символов текст не нужен (каждый символ — хотя бы одна единица UTF-16)
+    window = text[:flex_limit]
+    encoded = window.encode('utf-16-le')
+    if len(encoded) == 2 * len(window):
+        # Символов вне BMP нет: единицы UTF-16 совпадают с символами
+        cut, flex_end = min(max_len, len(window)), len(window)
+    else:
+        cut, flex_end = _utf16_units_to_chars(encoded, max_len), _utf16_units_to_chars(encoded, flex_limit)
+
+    if cut >= len(text):
+        # Весь текст укладывается в лимит
         return text
 
-    # 2) Первичная обрезка по max_len
-    truncated_initial = text[:max_len]
-
-    max_flex_end = min(max_len + flex_margin, len(text))
-    extended_part = text[max_len:max_flex_end]
-    matches_extended = list(pattern.finditer(extended_part))
-    if matches_extended:
-        first_match = matches_extended[0]
-        start_pos = max_len + first_match.start()
-        char_found = text[start_pos]
-        if char_found == '\n':
-            return text[:start_pos].rstrip()
-        else:
-            return text[: (start_pos + 1)].rstrip()
-
-    # 3) Ищем последний разделитель в пределах max_len
-    matches_initial = list(pattern.finditer(truncated_initial))
-    if matches_initial:
-        last_match = matches_initial[-1]
-        last_char = truncated_initial[last_match.start()]
-        if last_char == '\n':
-            # Не включаем перенос строки
-            return truncated_initial[: last_match.start()].rstrip()
-        else:
-            # Если это . ? ! ;
-            return truncated_initial[: last_match.end()].rstrip()
-
-    # 5) Если в гибком коридоре тоже не нашли разделитель,
-    rest_part = text[max_flex_end:]
-    matches_rest = list(pattern.finditer(rest_part))
-    if matches_rest:
-        # Берём первое вхождение за пределами гибкого коридора
-        forced_match = matches_rest[0]
-        forced_start_pos = max_flex_end + forced_match.start()
-        char_found = text[forced_start_pos]
-        if char_found == '\n':
-            return text[:forced_start_pos].rstrip()
-        else:
-            return text[: (forced_start_pos + 1)].rstrip()
+    # 1) Вперёд: первый разделитель в гибком коридоре
+    match = TRUNCATE_DELIMITERS_RE.search(text, cut, flex_end)
+    if match:
+        # Перенос строки в результат не включаем, знак препинания — включаем
+        end = match.start() if match.group() == '\n' else match.end()
+        return text[:end].rstrip()
+
+    # 2) Назад: последний разделитель в пределах max_len
+    pos = max(text.rfind(char, 0, cut) for char in TRUNCATE_DELIMITERS)
+    if pos > 0:
+        truncated = text[:pos if text[pos] == '\n' else pos + 1].rstrip()
+        if truncated:
+            return truncated
+
+    # 3) Разделителей нет: режем по слову и оставляем место под «…»
+    cut = utf16_prefix_end(text, max_len - 1)
+    space = text.rfind(' ', 0, cut + 1)
+    if space > 0:
+        cut = space
+    return text[:cut].rstrip() + '…'
 
 
 def remove_first_sentence_if_in_title(text: str, title: str) -> str:
@@ -354,7 +394,124 @@ def remove_duplicate_dots(text: str) -> str:
     """
     return re.sub(r'\.\s*\.', '.', text)
 
-def clean_news_html(html_text: str) -> str:
+def _compile_alternation(patterns: list):
+    """
+    Склеивает список паттернов в одну регулярку вида (?:p1)|(?:p2)|...
+    Флаг (?i) в начале паттернов убираем и задаём IGNORECASE для всей регулярки —
+    remove_custom_fragments и так матчит с re.IGNORECASE.
+    """
+    parts = []
+    for pattern in patterns:
+        if pattern.startswith('(?i)'):
+            pattern = pattern[len('(?i)'):]
+        parts.append(f'(?:{pattern})')
+    return re.compile('|'.join(parts), re.IGNORECASE)
+
+
+class TextCleaningPipeline:
+    """
+    То же, что цепочка
+        remove_publication_date_lines -> remove_custom_fragments -> compress_newlines
+        -> remove_duplicate_dots -> join_single_word_lines,
+    но текст разбивается на строки один раз, а все паттерны скомпилированы заранее
+    (по одной регулярке-альтернации на «безусловные» и «условные» фрагменты).
+
+    Построчные шаги (даты, фрагменты, пустые строки) выполняются за один проход
+    цепочкой генераторов. Схлопывание точек остаётся одной заменой по всему тексту:
+    оно может затрагивать соседние строки.
+    """
+
+    def __init__(
+            self,
+            unconditional_patterns: list = None,
+            conditional_patterns: list = None
+    ):
+        self.date_re = DATE_REGEX
+        self.unconditional_re = _compile_alternation(
+            TO_REMOVE_PATTERNS_UNCONDITIONAL if unconditional_patterns is None else unconditional_patterns
+        )
+        self.conditional_re = _compile_alternation(
+            TO_REMOVE_PATTERNS_CONDITIONAL if conditional_patterns is None else conditional_patterns
+        )
+        self.duplicate_dots_re = re.compile(r'\.\s*\.')
+
+    def __call__(self, text: str) -> str:
+        return self.clean(text)
+
+    def clean(self, text: str) -> str:
+        lines = text.splitlines()
+        stream = self._without_dates(lines)
+        stream = self._without_trailing_empty(stream)
+        stream = self._without_fragments(stream)
+
+        # compress_newlines: выкидываем пустые строки и обрезаем текст по краям
+        text = '\n'.join(line for line in stream if line.strip()).strip()
+        text = self.duplicate_dots_re.sub('.', text)
+        return join_single_word_lines(text)
+
+    def _without_dates(self, lines: list):
+        """
+        Шаг remove_publication_date_lines.
+        """
+        last = len(lines) - 1
+        for i, line in enumerate(lines):
+            line_stripped = line.strip()
+            if line_stripped and self.date_re.match(line_stripped):
+                if (
+                        i == 0
+                        or i == last
+                        or not lines[i - 1].strip()
+                        or not lines[i + 1].strip()
+                ):
+                    continue
+            yield line
+
+    @staticmethod
+    def _without_trailing_empty(lines):
+        """
+        В исходной цепочке между шагами текст склеивается через '\n' и снова режется
+        splitlines(), который теряет одну пустую строку в самом конце. Повторяем это,
+        иначе «условные» фрагменты перед ней удалялись бы иначе.
+        """
+        previous = None
+        for line in lines:
+            if previous is not None:
+                yield previous
+            previous = line
+        if previous:
+            yield previous
+
+    def _without_fragments(self, lines):
+        """
+        Шаг remove_custom_fragments (соседи нужны для «условных» паттернов,
+        поэтому держим одну строку в запасе).
+        """
+        iterator = iter(lines)
+        previous = None
+        current = next(iterator, None)
+        while current is not None:
+            following = next(iterator, None)
+            line_stripped = current.strip()
+
+            if self.unconditional_re.match(line_stripped):
+                pass
+            elif self.conditional_re.match(line_stripped) and (
+                    (previous is not None and not previous.strip())
+                    or (following is not None and not following.strip())
+            ):
+                pass
+            else:
+                yield current
+
+            previous = current
+            current = following
+
+
+# Общий экземпляр: паттерны компилируются один раз при импорте
+clean_text_pipeline = TextCleaningPipeline()
+
+
+def clean_news_html(html_text: str, backend: str = None) -> str:
     """
     Извлекает текст только из тегов <div>, <p>, <span>, при этом:
       1) Удаляем все <table> (вместе с содержимым) — не берём текст из таблиц вообще.
@@ -362,8 +519,31 @@ def clean_news_html(html_text: str) -> str:
       3) Склеиваем блоки (div/p/span) переводами строк.
       4) Раскодируем HTML-сущности (&lt; -> <, &gt; -> >, &nbsp; -> пробел и т.п.).
       5) Если нужно, убираем символы < и > (если они остались).
+
+    backend — "stream" (потоковый html.parser, по умолчанию) или "bs4" (прежний вариант
+    через BeautifulSoup); если не указан, берётся HTML_CLEAN_BACKEND из config.
     """
+    backend = backend or HTML_CLEAN_BACKEND
+
+    if backend == "bs4":
+        cleaned_text = _extract_text_bs4(html_text)
+    else:
+        cleaned_text = extract_block_text(html_text)
+
+    # 3. Раскодируем HTML-сущности (&lt; -> <, &nbsp; -> пробел и т.д.)
+    cleaned_text = html.unescape(cleaned_text)
+
+    # 4. Если нужно, убираем физически символы <, >
+    cleaned_text = re.sub(r'[<>]', '', cleaned_text)
 
+    return cleaned_text
+
+
+def _extract_text_bs4(html_text: str) -> str:
+    """
+    Вариант через полное дерево BeautifulSoup. Текст вложенных блоков попадает
+    в результат несколько раз (span внутри div — и в div, и в span).
+    """
     soup = BeautifulSoup(html_text, 'html.parser')
 
     # 1. Удаляем все таблицы (table, вместе со всем содержимым)
@@ -380,12 +560,59 @@ def clean_news_html(html_text: str) -> str:
             extracted_texts.append(text_chunk)
 
     # Склеиваем каждый блок новой строкой
-    cleaned_text = "\n".join(extracted_texts)
+    return "\n".join(extracted_texts)
 
-    # 3. Раскодируем HTML-сущности (&lt; -> <, &nbsp; -> пробел и т.д.)
-    cleaned_text = html.unescape(cleaned_text)
 
-    # 4. Если нужно, убираем физически символы <, >
-    cleaned_text = re.sub(r'[<>]', '', cleaned_text)
+def clean_news_text(news: dict) -> str:
+    """
+    Текст новости без HTML, служебных строк и лишних пустых строк (до обрезки).
+    """
+    raw_text = news.get("text", "Нет содержания")
 
-    return cleaned_text
+    with RENDER_STAGE_SECONDS.time(stage="html_clean"):
+        fixed_text = clean_news_html(raw_text)
+
+    text_content = fixed_text if fixed_text != '' else raw_text
+
+    # --- 1) Удаляем из текста первое предложение, если оно уже в заголовке ---
+    # title = get_effective_title(news)
+    # text_content = remove_first_sentence_if_in_title(text_content, title)
+
+    # --- 2) Удаляем "дату публикации", служебные фрагменты, пустые строки и т.д. ---
+    # (один проход вместо цепочки remove_publication_date_lines -> ... -> join_single_word_lines)
+    with RENDER_STAGE_SECONDS.time(stage="regex_passes"):
+        return clean_text_pipeline(text_content)
+
+
+def render_news(news: dict, max_news_length: int) -> str:
+    """
+    Готовит итоговый HTML сообщения для канала: чистый текст (clean_news_text),
+    обрезка по max_news_length и ссылка на источник в первом предложении.
+    Текст экранируется, поэтому результат — всегда корректный HTML для parse_mode='HTML',
+    а его видимая длина (после разбора тегов Telegram) не больше TELEGRAM_MESSAGE_LIMIT.
+    Чистая функция — без обращений к БД и Telegram, поэтому её можно выполнять
+    в отдельном процессе (см. cleaning_service.py).
+    """
+    text_content = clean_news_text(news)
+
+    url = news.get("url")  # Ссылка на источник
+    # Ссылка сама длины не добавляет (тег — не текст), но между первым предложением
+    # и остатком может появиться пробел
+    hard_limit = TELEGRAM_MESSAGE_LIMIT - (1 if url else 0)
+
+    with RENDER_STAGE_SECONDS.time(stage="truncate"):
+        text_content = flexible_truncate_text_by_delimiters(
+            text_content,
+            min(max_news_length, hard_limit),
+            hard_limit=hard_limit
+        )
+    with RENDER_STAGE_SECONDS.time(stage="link"):
+        if url:
+            first_sentence, remainder = extract_and_remove_first_sentence(text_content)
+            linked_first = f'<a href="{html.escape(url)}">{html.escape(first_sentence, quote=False)}</a>'
+            # Собираем обратно
+            text_content = linked_first + ' ' + html.escape(remainder.strip(), quote=False)
+        else:
+            text_content = html.escape(text_content, quote=False)
+
+    return text_content
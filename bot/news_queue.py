@@ -0,0 +1,168 @@
+# news_queue.py
+
+import asyncio
+import os
+import socket
+from collections import deque
+from datetime import datetime, timedelta
+
+from config import PUBLISH_LEASE_SECONDS, PREFETCH_SIZE, PREFETCH_LOW_WATER, logger
+from database import collection
+
+# Идентификатор этого процесса публикатора (пишется в leases.<канал>.by)
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Поля новости, которые нужны публикатору (остальное из БД не тянем)
+PUBLISH_FIELDS = {
+    "title": 1,
+    "text": 1,
+    "url": 1,
+    "image": 1,
+    "deliveries": 1,
+    "leases": 1,
+    "rendered": 1,
+    "found_keywords": 1,
+    "banned_by": 1,
+    "matched": 1,
+    "fingerprint": 1,
+}
+
+
+def _lease_free_filter(channel: str, now: datetime) -> dict:
+    """
+    Новость свободна для канала, если её никто не публикует в этот канал
+    или аренда уже истекла (публикатор упал посреди отправки).
+    """
+    field = f"leases.{channel}.until"
+    return {"$or": [{field: None}, {field: {"$lt": now}}]}
+
+
+def _pending_filter(channel: str) -> dict:
+    """
+    Новость ещё в очереди и канал с ней не закончил (не доставил, не пропустил по фильтру
+    и не исчерпал попытки).
+    """
+    return {"published": False, f"deliveries.{channel}.done": {"$ne": True}}
+
+
+def _attempts(news: dict, channel: str):
+    return news.get("deliveries", {}).get(channel, {}).get("attempts")
+
+
+class NewsPrefetcher:
+    """
+    Буфер ближайших новостей для планировщика одного канала.
+
+    Вместо find_one на каждый слот берём сразу до PREFETCH_SIZE новостей, которые этот канал
+    ещё не обработал, одним запросом в порядке поступления (_id) и только с нужными публикатору полями.
+    Когда в буфере остаётся PREFETCH_LOW_WATER новостей, подгружаем следующие.
+    Перед публикацией новость всё равно атомарно «арендуется» для канала (claim_news): если её за это
+    время забрал другой публикатор, опубликовали или удалили — просто выкидываем её из буфера.
+    """
+
+    def __init__(self, channel: str, size: int = PREFETCH_SIZE, low_water: int = PREFETCH_LOW_WATER):
+        self.channel = str(channel)
+        self.size = size
+        self.low_water = low_water
+        self._buffer = deque()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    async def _refill(self):
+        buffered_ids = [news["_id"] for news in self._buffer]
+        query = {**_pending_filter(self.channel), **_lease_free_filter(self.channel, datetime.utcnow())}
+        if buffered_ids:
+            query["_id"] = {"$nin": buffered_ids}
+
+        cursor = collection.find(query, PUBLISH_FIELDS).sort("_id", 1).limit(self.size - len(self._buffer))
+        async for news in cursor:
+            self._buffer.append(news)
+
+    async def next_news(self):
+        """
+        Следующая новость, уже арендованная этим процессом для канала, или None, если публиковать нечего.
+        """
+        if len(self._buffer) <= self.low_water:
+            await self._refill()
+
+        while self._buffer:
+            news = self._buffer.popleft()
+            if await claim_news(news, self.channel):
+                return news
+            logger.info(f"Новость {news['_id']} уже забрана или удалена, пропускаем.")
+            if not self._buffer:
+                await self._refill()
+
+        return None
+
+    def clear(self):
+        self._buffer.clear()
+
+
+async def claim_news(news, channel: str) -> bool:
+    """
+    Атомарно арендует новость для публикации в канал этим процессом.
+
+    Условие на deliveries.<канал>.attempts отсекает устаревшую копию из буфера: каждая попытка
+    публикации увеличивает счётчик, и тогда новость нужно перечитать.
+    update_one с фильтром гарантирует, что одну и ту же новость не получат в один канал два публикатора
+    (несколько реплик бота или перезапуск посреди отправки), поэтому дублей в каналах нет.
+    Аренда у каждого канала своя: каналы публикуют одну и ту же новость независимо друг от друга.
+    """
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=PUBLISH_LEASE_SECONDS)
+    result = await collection.update_one(
+        {
+            "_id": news["_id"],
+            **_pending_filter(channel),
+            f"deliveries.{channel}.attempts": _attempts(news, channel),
+            **_lease_free_filter(channel, now)
+        },
+        {"$set": {f"leases.{channel}": {"by": INSTANCE_ID, "until": lease_until}}}
+    )
+    if result.modified_count != 1:
+        return False
+
+    previous = news.get("leases", {}).get(channel)
+    if previous:
+        # Аренда истекла: прошлый публикатор упал или завис посреди отправки.
+        logger.warning(
+            f"Новость {news['_id']} для канала {channel} забрана после истёкшей аренды {previous.get('by')}."
+        )
+
+    news.setdefault("leases", {})[channel] = {"by": INSTANCE_ID, "until": lease_until}
+    return True
+
+
+async def extend_lease(news, channel: str) -> bool:
+    """
+    Продлевает аренду, пока новость ещё у нас. False — аренду перехватили.
+    """
+    result = await collection.update_one(
+        {"_id": news["_id"], f"leases.{channel}.by": INSTANCE_ID},
+        {"$set": {f"leases.{channel}.until": datetime.utcnow() + timedelta(seconds=PUBLISH_LEASE_SECONDS)}}
+    )
+    return result.modified_count == 1
+
+
+async def keep_lease(news, channel: str):
+    """
+    Фоновая задача на время публикации: отправка через очередь может ждать лимитов
+    Telegram дольше, чем длится аренда.
+    """
+    while True:
+        await asyncio.sleep(PUBLISH_LEASE_SECONDS / 3)
+        if not await extend_lease(news, channel):
+            logger.warning(f"Аренда новости {news['_id']} для канала {channel} перехвачена другим публикатором.")
+            return
+
+
+async def release_news(news, channel: str):
+    """
+    Снимает аренду, не меняя статус публикации (новость вернётся в очередь канала).
+    """
+    await collection.update_one(
+        {"_id": news["_id"], f"leases.{channel}.by": INSTANCE_ID},
+        {"$unset": {f"leases.{channel}": ""}}
+    )
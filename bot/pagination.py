@@ -0,0 +1,48 @@
+# pagination.py
+
+import math
+import time
+
+from config import PAGINATION_COUNT_TTL
+
+# Кэш count_documents: имя коллекции -> (количество, время подсчёта)
+_count_cache = {}
+
+
+async def count_cached(target_collection) -> int:
+    """
+    Количество документов в коллекции для расчёта числа страниц.
+    Считаем не чаще раза в PAGINATION_COUNT_TTL секунд; после добавления/удаления
+    обработчики сбрасывают кэш через invalidate_count.
+    """
+    cached = _count_cache.get(target_collection.name)
+    now = time.monotonic()
+    if cached and now - cached[1] < PAGINATION_COUNT_TTL:
+        return cached[0]
+
+    total = await target_collection.count_documents({})
+    _count_cache[target_collection.name] = (total, now)
+    return total
+
+
+def invalidate_count(target_collection):
+    _count_cache.pop(target_collection.name, None)
+
+
+async def fetch_page(target_collection, page: int, per_page: int):
+    """
+    Загружает из БД только документы нужной страницы (skip/limit по _id).
+
+    Возвращает (документы, номер страницы, всего страниц); номер страницы
+    приводится к диапазону 1..всего страниц.
+    """
+    total = await count_cached(target_collection)
+    total_pages = max(1, math.ceil(total / per_page))
+    if page < 1:
+        page = 1
+    if page > total_pages:
+        page = total_pages
+
+    cursor = target_collection.find().sort("_id", 1).skip((page - 1) * per_page).limit(per_page)
+    items = await cursor.to_list(length=per_page)
+    return items, page, total_pages
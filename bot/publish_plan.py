@@ -0,0 +1,136 @@
+# publish_plan.py
+
+import math
+import time
+from datetime import datetime, timedelta
+
+from config import SCHEDULE_MISSED_GRACE, logger
+from database import config_collection
+
+
+class PublishPlan:
+    """
+    План публикаций на цикл: news_per_interval слотов через равные промежутки
+    внутри publish_interval секунд.
+
+    Время слотов абсолютное (от начала цикла), поэтому задержки отправки и запросов
+    к Mongo не копятся и не сдвигают расписание. Начало цикла хранится дважды:
+      - по UTC — чтобы сохранить план в БД и продолжить с того же слота после перезапуска;
+      - по time.monotonic() — чтобы ожидание внутри процесса не зависело от перевода часов.
+    """
+
+    def __init__(self, plan_id: str, news_per_interval: int, publish_interval: int,
+                 cycle_start: datetime, slot: int = 0, published_count: int = 0):
+        self.plan_id = plan_id
+        self.news_per_interval = news_per_interval
+        self.publish_interval = publish_interval
+        self.cycle_start = cycle_start
+        self.slot = slot
+        self.published_count = published_count
+        # Привязываем начало цикла к монотонным часам
+        self._cycle_start_mono = time.monotonic() - (datetime.utcnow() - cycle_start).total_seconds()
+
+    @property
+    def slot_interval(self) -> float:
+        return self.publish_interval / self.news_per_interval
+
+    def matches(self, news_per_interval: int, publish_interval: int) -> bool:
+        return (self.news_per_interval, self.publish_interval) == (news_per_interval, publish_interval)
+
+    def slot_time(self) -> datetime:
+        """
+        Время текущего слота по UTC (для логов и БД).
+        """
+        return self.cycle_start + timedelta(seconds=self.slot * self.slot_interval)
+
+    def seconds_until_slot(self) -> float:
+        """
+        Сколько ждать до текущего слота (отрицательное значение — слот уже наступил).
+        """
+        deadline = self._cycle_start_mono + self.slot * self.slot_interval
+        return deadline - time.monotonic()
+
+    def advance(self):
+        """
+        Переход к следующему слоту (после публикации или пустого слота).
+        """
+        self.slot += 1
+        if self.slot >= self.news_per_interval:
+            self._next_cycle(1)
+
+    def _next_cycle(self, cycles: int):
+        self.cycle_start += timedelta(seconds=cycles * self.publish_interval)
+        self._cycle_start_mono += cycles * self.publish_interval
+        self.slot = 0
+        self.published_count = 0
+
+    def skip_missed(self):
+        """
+        Пропускает слоты, опоздание к которым больше SCHEDULE_MISSED_GRACE секунд
+        (бот был выключен): после простоя не публикуем всё пропущенное разом.
+        """
+        late = -self.seconds_until_slot()
+        if late <= SCHEDULE_MISSED_GRACE:
+            return
+
+        elapsed = time.monotonic() - self._cycle_start_mono
+        cycles = int(elapsed // self.publish_interval)
+        if cycles:
+            self._next_cycle(cycles)
+            elapsed -= cycles * self.publish_interval
+        # Первый слот, который ещё не «просрочен»
+        self.slot = max(self.slot, math.ceil((elapsed - SCHEDULE_MISSED_GRACE) / self.slot_interval))
+        if self.slot >= self.news_per_interval:
+            self._next_cycle(1)
+        logger.info(f"Пропущены слоты публикации, следующий — {self.slot_time():%Y-%m-%d %H:%M:%S} UTC.")
+
+    def replan(self, news_per_interval: int, publish_interval: int) -> "PublishPlan":
+        """
+        Новый план после смены настроек: отсчёт идёт от последнего слота старого плана,
+        так что новые настройки действуют уже со следующего слота, а не с нового цикла.
+        """
+        # Время последнего слота старого плана (текущий слот ещё не наступил)
+        start = self.slot_time() - timedelta(seconds=self.slot_interval)
+        plan = PublishPlan(self.plan_id, news_per_interval, publish_interval, start, slot=1)
+        if plan.slot >= plan.news_per_interval:
+            plan._next_cycle(1)
+        return plan
+
+    def to_document(self) -> dict:
+        return {
+            "_id": self.plan_id,
+            "news_per_hour": self.news_per_interval,
+            "publish_interval": self.publish_interval,
+            "cycle_start": self.cycle_start,
+            "slot": self.slot,
+            "published_count": self.published_count,
+            "updated_at": datetime.utcnow(),
+        }
+
+
+async def load_plan(plan_id: str, news_per_interval: int, publish_interval: int) -> PublishPlan:
+    """
+    Восстанавливает план из config_collection. Если плана нет или настройки
+    поменялись, пока бот был выключен, — начинаем новый цикл прямо сейчас.
+    """
+    doc = await config_collection.find_one({"_id": plan_id})
+    if doc and (doc.get("news_per_hour"), doc.get("publish_interval")) == (news_per_interval, publish_interval):
+        plan = PublishPlan(
+            plan_id,
+            news_per_interval,
+            publish_interval,
+            doc["cycle_start"],
+            slot=doc.get("slot", 0),
+            published_count=doc.get("published_count", 0)
+        )
+        logger.info(f"План публикаций восстановлен: слот {plan.slot + 1}/{news_per_interval}.")
+    else:
+        plan = PublishPlan(plan_id, news_per_interval, publish_interval, datetime.utcnow())
+        logger.info("Начат новый план публикаций.")
+
+    plan.skip_missed()
+    return plan
+
+
+async def save_plan(plan: PublishPlan):
+    await config_collection.replace_one({"_id": plan.plan_id}, plan.to_document(), upsert=True)
@@ -0,0 +1,131 @@
+# render.py
+
+import asyncio
+import hashlib
+
+from config import RENDER_BATCH_SIZE, RENDER_INTERVAL, logger
+from config_cache import bot_config
+from database import collection
+from cleaning_service import cleaning_service
+from keyword_matcher import keyword_matcher
+from dedup import dedup_pending_news
+
+MAX_MESSAGE_LENGTH = 4096  # fallback, если не найдёт в конфиге
+
+# Увеличиваем, когда меняется сама логика misc.render_news: старые заготовки станут неактуальными
+RENDER_VERSION = 2
+
+
+def config_version(max_news_length: int) -> str:
+    """
+    Версия настроек, от которых зависит результат misc.render_news.
+    """
+    return f"{RENDER_VERSION}:{max_news_length}"
+
+
+def render_key(news: dict, max_news_length: int) -> str:
+    """
+    Хэш исходных данных новости и версии настроек: если он совпадает с сохранённым,
+    заготовка сообщения актуальна.
+    """
+    digest = hashlib.sha1()
+    for part in (config_version(max_news_length), news.get("text", ""), news.get("url") or ""):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def get_rendered_text(news: dict, max_news_length: int = None) -> str:
+    """
+    Для публикатора: берём заготовку из документа, если она актуальна,
+    иначе (новость не успела обработаться, поменялись настройки или у канала
+    своя max_news_length) рендерим на месте.
+    """
+    if max_news_length is None:
+        max_news_length = await bot_config.get_value('max_news_length', MAX_MESSAGE_LENGTH)
+    key = render_key(news, max_news_length)
+
+    rendered = news.get("rendered") or {}
+    if rendered.get("key") == key:
+        return rendered["html"]
+
+    return await cleaning_service.render(news, max_news_length)
+
+
+async def render_pending_news(limit: int = RENDER_BATCH_SIZE) -> int:
+    """
+    Готовит заготовки для неопубликованных новостей, у которых их нет
+    или они сделаны под старые настройки, и ищет в них ключевые слова и исключения
+    (found_keywords, banned_by), если набор слов поменялся. Возвращает число обработанных новостей.
+    """
+    max_news_length = await bot_config.get_value('max_news_length', MAX_MESSAGE_LENGTH)
+    version = config_version(max_news_length)
+    await keyword_matcher.ensure_loaded()
+    matched_version = keyword_matcher.version
+
+    cursor = collection.find(
+        {
+            "published": False,
+            "$or": [
+                {"rendered.config": {"$ne": version}},
+                {"matched": {"$ne": matched_version}}
+            ]
+        },
+        {"title": 1, "text": 1, "url": 1, "rendered.config": 1}
+    ).sort("_id", 1).limit(limit)
+
+    news_list = await cursor.to_list(length=limit)
+    if not news_list:
+        return 0
+
+    # Сама обработка текста идёт в пуле процессов и не тормозит event loop
+    to_render = [news for news in news_list if news.get("rendered", {}).get("config") != version]
+    try:
+        results = await cleaning_service.render_many(to_render, max_news_length) if to_render else []
+    except asyncio.TimeoutError:
+        logger.error(f"Подготовка {len(to_render)} новостей не уложилась в таймаут.")
+        results = [(False, "timeout")] * len(to_render)
+    rendered_by_id = {news["_id"]: result for news, result in zip(to_render, results)}
+
+    for news in news_list:
+        found_keywords, banned_by = keyword_matcher.match_news(news)
+        update = {"found_keywords": found_keywords, "banned_by": banned_by, "matched": matched_version}
+
+        if news["_id"] in rendered_by_id:
+            ok, value = rendered_by_id[news["_id"]]
+            if ok:
+                update["rendered"] = {
+                    "key": render_key(news, max_news_length),
+                    "config": version,
+                    "html": value
+                }
+            else:
+                logger.error(f"Не удалось подготовить новость {news['_id']}: {value}")
+                # Без key публикатор попробует ещё раз сам, а здесь новость больше не выбираем
+                update["rendered"] = {"config": version, "error": value}
+
+        await collection.update_one({"_id": news["_id"]}, {"$set": update})
+        # Поиск идёт в event loop: между новостями отдаём управление командам и публикаторам
+        await asyncio.sleep(0)
+
+    return len(news_list)
+
+
+async def render_worker():
+    """
+    Фоновая задача: заранее готовит сообщения, чтобы публикатору оставалось только отправить.
+    """
+    while True:
+        try:
+            # Сначала отсеиваем перепечатки, чтобы не готовить для них сообщения
+            checked = await dedup_pending_news()
+            count = max(checked, await render_pending_news())
+        except Exception as e:
+            logger.error(f"Ошибка при подготовке новостей: {e}")
+            count = 0
+
+        if count:
+            logger.info(f"Подготовлено новостей к публикации: {count}")
+        # Если очередь не разобрана целиком, продолжаем сразу
+        if count < RENDER_BATCH_SIZE:
+            await asyncio.sleep(RENDER_INTERVAL)
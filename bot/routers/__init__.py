@@ -2,10 +2,15 @@
 
 from aiogram import Router
 
+from middlewares.metrics import HandlerMetricsMiddleware
+
 from .commands import commands_router
 from .manage_sources import manage_sources_router
 from .manage_keywords import manage_keywords_router
 from .manage_bans import manage_bans_router
+from .manage_channels import manage_channels_router
+from .manage_admins import manage_admins_router
+from .access_denied import access_denied_router
 
 # Если нужны еще роутеры, подключаем их также
 
@@ -14,3 +19,20 @@ main_router.include_router(commands_router)
 main_router.include_router(manage_sources_router)
 main_router.include_router(manage_keywords_router)
 main_router.include_router(manage_bans_router)
+main_router.include_router(manage_channels_router)
+main_router.include_router(manage_admins_router)
+# Отказ в доступе — строго последним, после всех обработчиков
+main_router.include_router(access_denied_router)
+
+# Время обработчиков каждого роутера — в /metrics
+for router_name, router in (
+        ("commands", commands_router),
+        ("manage_sources", manage_sources_router),
+        ("manage_keywords", manage_keywords_router),
+        ("manage_bans", manage_bans_router),
+        ("manage_channels", manage_channels_router),
+        ("manage_admins", manage_admins_router),
+        ("access_denied", access_denied_router),
+):
+    router.message.middleware(HandlerMetricsMiddleware(router_name))
+    router.callback_query.middleware(HandlerMetricsMiddleware(router_name))
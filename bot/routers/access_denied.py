@@ -0,0 +1,26 @@
+# routers/access_denied.py
+
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery
+
+from sender import sender
+
+# Подключается последним: сюда попадают команды и кнопки, для которых не сработал
+# ни один обработчик (обычно из-за RoleFilter — у пользователя нет нужной роли)
+access_denied_router = Router()
+
+
+@access_denied_router.message(F.text.startswith("/"))
+async def on_denied_command(message: Message):
+    await sender.answer(message, "Команда не найдена или у вас нет прав для её выполнения.")
+
+
+@access_denied_router.callback_query(F.data == "pass")
+async def on_pass_callback(call: CallbackQuery):
+    # Кнопки-подписи (номер страницы, название элемента) ничего не делают — просто закрываем «часики»
+    await call.answer()
+
+
+@access_denied_router.callback_query()
+async def on_denied_callback(call: CallbackQuery):
+    await call.answer("У вас нет прав.", show_alert=True)
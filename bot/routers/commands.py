@@ -4,12 +4,18 @@ import re
 from datetime import datetime, timedelta
 
 from aiogram import Router, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 
-from config import ALLOWED_USERS, logger
-from database import config_collection, stats_collection, sources_collection, keywords_collection, bans_collection
+from admins import RoleFilter
+from config import logger
+from config_cache import bot_config
+from channel_profiles import channel_profiles
+from database import sources_collection, keywords_collection, bans_collection
+from pagination import fetch_page
+from sender import sender
+from stats import stats_recorder, aggregate_stats
 from states import (
     SetNewsPerHourState,
     SetPublishIntervalState,
@@ -32,65 +38,79 @@ commands_router = Router()
 
 @commands_router.message(Command("start"))
 async def cmd_start(message: Message):
-    await message.answer("Бот запущен и будет публиковать новости в заданном режиме.")
+    await sender.answer(message, "Бот запущен и будет публиковать новости в заданном режиме.")
 
 
-@commands_router.message(Command("stats"))
-async def cmd_stats(message: Message):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав для выполнения этой команды.")
-        return
-
-    now = datetime.utcnow()
-    one_hour_ago = now - timedelta(hours=1)
-    stats = stats_collection.find({"timestamp": {"$gte": one_hour_ago}})
+STATS_WINDOW_RE = re.compile(r"^(\d+)([mhd])$")
+STATS_UNITS = {"m": ("minutes", "мин."), "h": ("hours", "ч."), "d": ("days", "дн.")}
 
-    total_sent = sum(stat['sent_count'] for stat in stats)
 
-    await message.answer(f"За последний час было отправлено {total_sent} новостей.")
+def parse_stats_window(arg: str):
+    """
+    "30m", "1h", "24h", "7d" → (timedelta, подпись) или None, если формат неверный.
+    """
+    match = STATS_WINDOW_RE.match((arg or "1h").strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        return None
+    amount, unit = int(match.group(1)), match.group(2)
+    name, label = STATS_UNITS[unit]
+    return timedelta(**{name: amount}), f"{amount} {label}"
+
+
+@commands_router.message(Command("stats"), RoleFilter("viewer"))
+async def cmd_stats(message: Message, command: CommandObject):
+    window = parse_stats_window(command.args)
+    if window is None:
+        await sender.answer(message, "Формат: /stats [окно], например /stats 1h, /stats 24h, /stats 7d.")
+        return
+    period, label = window
+
+    # Счётчики копятся в памяти — сначала дописываем их, чтобы ответ был актуальным
+    await stats_recorder.flush()
+    rows = await aggregate_stats(datetime.utcnow() - period)
+
+    total_sent = sum(row["sent_count"] for row in rows)
+    lines = [f"За последние {label} было отправлено {total_sent} новостей."]
+    if rows:
+        profiles = await channel_profiles.get_all()
+        lines.append("")
+        for row in rows:
+            profile = profiles.get(row["channel"])
+            name = profile.title if profile else (row["channel"] or "без канала")
+            lines.append(
+                f"{name}: отправлено {row['sent_count']}, ошибок {row['failed_count']}, "
+                f"пропущено {row['skipped_count']}"
+            )
+
+    await sender.answer(message, "\n".join(lines))
 
 
 # ----------- Пример установки параметров через FSM ------------
 
-@commands_router.message(Command("set_news_per_interval"))
+@commands_router.message(Command("set_news_per_interval"), RoleFilter("editor"))
 async def set_news_per_hour_command(message: Message, state: FSMContext):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав для выполнения этой команды.")
-        return
-
-    await message.answer("Пожалуйста, введите количество новостей за интервал:")
+    await sender.answer(message, "Пожалуйста, введите количество новостей за интервал:")
     await state.set_state(SetNewsPerHourState.waiting_for_number)
 
 
-@commands_router.message(Command("set_publish_interval"))
+@commands_router.message(Command("set_publish_interval"), RoleFilter("editor"))
 async def set_publish_interval_command(message: Message, state: FSMContext):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав для выполнения этой команды.")
-        return
-
-    await message.answer("Пожалуйста, введите интервал публикации в минутах:")
+    await sender.answer(message, "Пожалуйста, введите интервал публикации в минутах:")
     await state.set_state(SetPublishIntervalState.waiting_for_interval)
 
 
-@commands_router.message(Command("set_max_news_length"))
+@commands_router.message(Command("set_max_news_length"), RoleFilter("editor"))
 async def set_max_news_length_command(message: Message, state: FSMContext):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав для выполнения этой команды.")
-        return
-
-    await message.answer("Пожалуйста, введите максимальную длину текста новости (в символах):")
+    await sender.answer(message, "Пожалуйста, введите максимальную длину текста новости (в символах):")
     await state.set_state(SetMaxNewsLengthState.waiting_for_length)
 
 
 # ------------------ ОБРАБОТЧИК ИСТОЧНИКОВ ------------------
 
-@commands_router.message(Command("add_sources"))
+@commands_router.message(Command("add_sources"), RoleFilter("editor"))
 async def add_source_command(message: Message, state: FSMContext):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав для выполнения этой команды.")
-        return
-
-    await message.answer(
+    await sender.answer(
+        message,
         "Пожалуйста, отправьте список источников в формате:\n"
         "ссылка (Название)\n\n"
         "Можно несколько строк подряд."
@@ -98,143 +118,110 @@ async def add_source_command(message: Message, state: FSMContext):
     await state.set_state(AddSourceStates.waiting_for_sources)
 
 
-@commands_router.message(Command("manage_sources"))
+@commands_router.message(Command("manage_sources"), RoleFilter("viewer"))
 async def cmd_manage_sources(message: Message):
     """
     При вводе /manage_sources выдаём первое сообщение (1-я страница).
     """
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав для выполнения этой команды.")
-        return
+    page_sources, page, total_pages = await fetch_page(sources_collection, 1, PER_PAGE)
 
-    sources = list(sources_collection.find())
-    page = 1
-
-    text = build_sources_page_text(sources, page=page, per_page=PER_PAGE)
-    kb = build_sources_page_keyboard(sources, page=page, per_page=PER_PAGE)
+    text = build_sources_page_text(page_sources, page=page, total_pages=total_pages)
+    kb = build_sources_page_keyboard(page_sources, page=page, total_pages=total_pages)
 
     # Отправляем текст + клавиатуру
-    await message.answer(text, reply_markup=kb, parse_mode="Markdown", disable_web_page_preview=True)
+    await sender.answer(message, text, reply_markup=kb, parse_mode="Markdown", disable_web_page_preview=True)
 
 
 # ------------------ ОБРАБОТЧИК КЛЮЧЕВЫХ СЛОВ ------------------
 
-@commands_router.message(Command("add_keywords"))
+@commands_router.message(Command("add_keywords"), RoleFilter("editor"))
 async def add_keywords_command(message: Message, state: FSMContext):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав для выполнения этой команды.")
-        return
-
-    await message.answer(
+    await sender.answer(
+        message,
         "Пожалуйста, отправьте список ключевых слов, по одному на строку."
     )
     await state.set_state(AddKeywordsStates.waiting_for_keywords)
 
 
-@commands_router.message(Command("manage_keywords"))
+@commands_router.message(Command("manage_keywords"), RoleFilter("viewer"))
 async def manage_keywords(message: Message):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав.")
+    page_keywords, page, total_pages = await fetch_page(keywords_collection, 1, PER_PAGE)
+    if not page_keywords:
+        await sender.answer(message, "Список ключевых слов пуст.")
         return
 
-    keywords = list(keywords_collection.find())
-    if not keywords:
-        await message.answer("Список ключевых слов пуст.")
-        return
-
-    page = 1
-    text = build_keywords_page_text(keywords, page=page, per_page=PER_PAGE)
-    kb = build_keywords_page_keyboard(keywords, page=page, per_page=PER_PAGE)
+    text = build_keywords_page_text(page_keywords, page=page, total_pages=total_pages)
+    kb = build_keywords_page_keyboard(page_keywords, page=page, total_pages=total_pages)
 
-    await message.answer(text, parse_mode="HTML", reply_markup=kb)
+    await sender.answer(message, text, parse_mode="HTML", reply_markup=kb)
 
 
 # ------------------ ОБРАБОТЧИК ИСКЛЮЧЕНИЙ ------------------
 
-@commands_router.message(Command("add_banwords"))
+@commands_router.message(Command("add_banwords"), RoleFilter("editor"))
 async def add_banwords_command(message: Message, state: FSMContext):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав.")
-        return
-
-    await message.answer(
+    await sender.answer(
+        message,
         "Пожалуйста, отправьте список исключений (бан-слов), по одному на строку."
     )
     await state.set_state(AddBanStates.waiting_for_bans)
 
 
-@commands_router.message(Command("manage_bans"))
+@commands_router.message(Command("manage_bans"), RoleFilter("viewer"))
 async def manage_bans(message: Message):
-    if message.from_user.id not in ALLOWED_USERS:
-        await message.answer("У вас нет прав.")
-        return
-
-    all_bans = list(bans_collection.find())
-    if not all_bans:
-        await message.answer("Список исключений пуст.")
+    page_bans, page, total_pages = await fetch_page(bans_collection, 1, PER_PAGE)
+    if not page_bans:
+        await sender.answer(message, "Список исключений пуст.")
         return
 
-    page = 1
-    text = build_bans_page_text(all_bans, page=page, per_page=PER_PAGE)
-    kb = build_bans_page_keyboard(all_bans, page=page, per_page=PER_PAGE)
+    text = build_bans_page_text(page_bans, page=page, total_pages=total_pages)
+    kb = build_bans_page_keyboard(page_bans, page=page, total_pages=total_pages)
 
-    await message.answer(text, parse_mode="HTML", reply_markup=kb)
+    await sender.answer(message, text, parse_mode="HTML", reply_markup=kb)
 
 
 # ------------------ СОСТАЯНИЯ FSM ДЛЯ КОНФИГА БОТА ------------------
 
 
-@commands_router.message(SetNewsPerHourState.waiting_for_number)
+@commands_router.message(SetNewsPerHourState.waiting_for_number, RoleFilter("editor"))
 async def process_news_per_hour(message: Message, state: FSMContext):
     if not message.text.isdigit():
-        await message.answer("Пожалуйста, введите корректное число.")
+        await sender.answer(message, "Пожалуйста, введите корректное число.")
         return
 
     news_per_hour = int(message.text)
-    config_collection.update_one(
-        {"_id": "bot_config"},
-        {"$set": {"news_per_hour": news_per_hour}},
-        upsert=True
-    )
-    await message.answer(f"Количество новостей за интервал установлено на {news_per_hour}.")
+    await bot_config.set(news_per_hour=news_per_hour)
+    await sender.answer(message, f"Количество новостей за интервал установлено на {news_per_hour}.")
     await state.clear()
 
 
-@commands_router.message(SetMaxNewsLengthState.waiting_for_length)
+@commands_router.message(SetMaxNewsLengthState.waiting_for_length, RoleFilter("editor"))
 async def process_max_news_length(message: Message, state: FSMContext):
     if not message.text.isdigit():
-        await message.answer("Пожалуйста, введите корректное число.")
+        await sender.answer(message, "Пожалуйста, введите корректное число.")
         return
 
     max_news_length = int(message.text)
     if max_news_length <= 0 or max_news_length > 4096:
-        await message.answer("Длина новости должна быть больше 0 и ≤ 4096 символов.")
+        await sender.answer(message, "Длина новости должна быть больше 0 и ≤ 4096 символов.")
         return
 
-    config_collection.update_one(
-        {"_id": "bot_config"},
-        {"$set": {"max_news_length": max_news_length}},
-        upsert=True
-    )
-    await message.answer(f"Максимальная длина текста новости установлена на {max_news_length} символов.")
+    await bot_config.set(max_news_length=max_news_length)
+    await sender.answer(message, f"Максимальная длина текста новости установлена на {max_news_length} символов.")
     await state.clear()
 
 
-@commands_router.message(SetPublishIntervalState.waiting_for_interval)
+@commands_router.message(SetPublishIntervalState.waiting_for_interval, RoleFilter("editor"))
 async def process_publish_interval(message: Message, state: FSMContext):
     if not message.text.isdigit():
-        await message.answer("Пожалуйста, введите корректное число (интервал в минутах).")
+        await sender.answer(message, "Пожалуйста, введите корректное число (интервал в минутах).")
         return
 
     publish_interval = int(message.text)
     if publish_interval <= 0:
-        await message.answer("Интервал публикации должен быть больше нуля.")
+        await sender.answer(message, "Интервал публикации должен быть больше нуля.")
         return
 
-    config_collection.update_one(
-        {"_id": "bot_config"},
-        {"$set": {"publish_interval": publish_interval * 60}},
-        upsert=True
-    )
-    await message.answer(f"Интервал публикации установлен на {publish_interval} минут.")
+    await bot_config.set(publish_interval=publish_interval * 60)
+    await sender.answer(message, f"Интервал публикации установлен на {publish_interval} минут.")
     await state.clear()
@@ -0,0 +1,61 @@
+# routers/manage_admins.py
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from admins import ROLES, RoleFilter, admin_cache
+from sender import sender
+
+manage_admins_router = Router()
+
+ROLE_TITLES = {
+    "viewer": "просмотр",
+    "editor": "редактирование",
+    "owner": "владелец",
+}
+ADD_ADMIN_USAGE = "Формат: /add_admin <i>user_id</i> <i>роль</i>\nРоли: viewer, editor, owner."
+
+
+@manage_admins_router.message(Command("admins"), RoleFilter("owner"))
+async def cmd_admins(message: Message):
+    roles = await admin_cache.get_all()
+    lines = ["<b>Администраторы</b>", ""]
+    for user_id, role in sorted(roles.items(), key=lambda item: (-ROLES[item[1]], item[0])):
+        lines.append(f"<code>{user_id}</code> — {role} ({ROLE_TITLES[role]})")
+    await sender.answer(message, "\n".join(lines), parse_mode="HTML")
+
+
+@manage_admins_router.message(Command("add_admin"), RoleFilter("owner"))
+async def cmd_add_admin(message: Message, command: CommandObject):
+    args = (command.args or "").split()
+    if len(args) != 2 or not args[0].isdigit() or args[1] not in ROLES:
+        await sender.answer(message, ADD_ADMIN_USAGE, parse_mode="HTML")
+        return
+
+    user_id, role = int(args[0]), args[1]
+    if user_id == message.from_user.id and role != "owner":
+        await sender.answer(message, "Нельзя понизить собственную роль.")
+        return
+
+    await admin_cache.set_role(user_id, role, added_by=message.from_user.id)
+    await sender.answer(message, f"Пользователь {user_id} теперь {role} ({ROLE_TITLES[role]}).")
+
+
+@manage_admins_router.message(Command("remove_admin"), RoleFilter("owner"))
+async def cmd_remove_admin(message: Message, command: CommandObject):
+    arg = (command.args or "").strip()
+    if not arg.isdigit():
+        await sender.answer(message, "Формат: /remove_admin <i>user_id</i>", parse_mode="HTML")
+        return
+
+    user_id = int(arg)
+    if user_id == message.from_user.id:
+        # Так в коллекции всегда остаётся хотя бы один владелец
+        await sender.answer(message, "Нельзя удалить самого себя.")
+        return
+
+    if await admin_cache.remove(user_id):
+        await sender.answer(message, f"Пользователь {user_id} больше не администратор.")
+    else:
+        await sender.answer(message, "Такого администратора нет. Список: /admins")
@@ -1,5 +1,4 @@
 # routers/manage_bans.py
-import math
 
 from aiogram.filters.callback_data import CallbackData
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -9,8 +8,11 @@ from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 
-from config import ALLOWED_USERS
-from database import bans_collection
+from admins import RoleFilter
+from database import bans_collection, insert_unique
+from keyword_matcher import keyword_matcher
+from pagination import fetch_page, invalidate_count
+from sender import sender
 from states import AddBanStates
 from .callbacks import BanCallback
 
@@ -34,44 +36,24 @@ class BanActionCallback(CallbackData, prefix="ban_act"):
 
 # ---------- ФУНКЦИИ РЕНДЕРА ----------
 
-def build_bans_page_text(bans: list, page: int, per_page: int = PER_PAGE) -> str:
-    total_pages = max(1, math.ceil(len(bans) / per_page))
-    if page < 1:
-        page = 1
-    if page > total_pages:
-        page = total_pages
-
-    start_i = (page - 1) * per_page
-    end_i = start_i + per_page
-    page_slice = bans[start_i:end_i]
-
+def build_bans_page_text(page_bans: list, page: int, total_pages: int) -> str:
     lines = []
     lines.append(f"<b>Страница</b> {page}/{total_pages}\n")
 
-    if not page_slice:
+    if not page_bans:
         lines.append("На этой странице пока нет исключений (бан-слов).")
     else:
-        for i, ban in enumerate(page_slice, start=1):
+        for i, ban in enumerate(page_bans, start=1):
             ban_text = ban.get("keyword", "")
             lines.append(f"{i}. {ban_text}")
 
     return "\n".join(lines)
 
 
-def build_bans_page_keyboard(bans: list, page: int, per_page: int = PER_PAGE) -> InlineKeyboardMarkup:
+def build_bans_page_keyboard(page_bans: list, page: int, total_pages: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    total_pages = max(1, math.ceil(len(bans) / per_page))
-
-    if page < 1:
-        page = 1
-    if page > total_pages:
-        page = total_pages
 
-    start_i = (page - 1) * per_page
-    end_i = start_i + per_page
-    page_slice = bans[start_i:end_i]
-
-    for ban in page_slice:
+    for ban in page_bans:
         ban_id = str(ban["_id"])
         ban_text = ban.get("keyword", "")
 
@@ -113,37 +95,37 @@ def build_bans_page_keyboard(bans: list, page: int, per_page: int = PER_PAGE) ->
 
 # ---------- ОБРАБОТЧИК ПЕРЕКЛЮЧЕНИЯ СТРАНИЦ ----------
 
-@manage_bans_router.callback_query(BanPaginationCallback.filter())
+@manage_bans_router.callback_query(BanPaginationCallback.filter(), RoleFilter("viewer"))
 async def on_bans_pagination(call: CallbackQuery, callback_data: BanPaginationCallback):
-    user_id = call.from_user.id
-    if user_id not in ALLOWED_USERS:
-        await call.answer("У вас нет прав.", show_alert=True)
-        return
+    page_bans, page, total_pages = await fetch_page(bans_collection, callback_data.page, PER_PAGE)
 
-    page = callback_data.page
-    all_bans = list(bans_collection.find())
+    text = build_bans_page_text(page_bans, page=page, total_pages=total_pages)
+    kb = build_bans_page_keyboard(page_bans, page=page, total_pages=total_pages)
 
-    text = build_bans_page_text(all_bans, page=page, per_page=PER_PAGE)
-    kb = build_bans_page_keyboard(all_bans, page=page, per_page=PER_PAGE)
-
-    await call.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
+    await sender.edit_text(call.message, text, parse_mode="HTML", reply_markup=kb)
     await call.answer()
 
 
-@manage_bans_router.message(AddBanStates.waiting_for_bans)
+@manage_bans_router.message(AddBanStates.waiting_for_bans, RoleFilter("editor"))
 async def process_bans(message: Message, state: FSMContext):
     lines = message.text.strip().split('\n')
     added_bans = []
     failed_bans = []
 
+    lines = [line.strip() for line in lines]
+    # Каждое значение отправляем в БД один раз, даже если оно повторяется в сообщении
+    unique_lines = list(dict.fromkeys(lines))
+    existing = await insert_unique(bans_collection, 'keyword', [{'keyword': line} for line in unique_lines])
+    invalidate_count(bans_collection)
+    keyword_matcher.add_bans(line for line in unique_lines if line not in existing)
+
+    seen = set()
     for line in lines:
-        line = line.strip()
-        existing = bans_collection.find_one({'keyword': line})
-        if existing:
+        if line in existing or line in seen:
             failed_bans.append(f"{line} - уже существует")
         else:
-            bans_collection.insert_one({'keyword': line})
             added_bans.append(line)
+        seen.add(line)
 
     resp = []
     if added_bans:
@@ -153,23 +135,20 @@ async def process_bans(message: Message, state: FSMContext):
         resp.append("Не добавлены (уже существуют):")
         resp.extend(failed_bans)
 
-    await message.answer("\n".join(resp))
+    await sender.answer(message, "\n".join(resp))
     await state.clear()
 
 
 # ---------- ОБРАБОТЧИК УДАЛЕНИЯ ----------
 
-@manage_bans_router.callback_query(BanActionCallback.filter())
+@manage_bans_router.callback_query(BanActionCallback.filter(), RoleFilter("editor"))
 async def on_ban_action(call: CallbackQuery, callback_data: BanActionCallback):
-    user_id = call.from_user.id
-    if user_id not in ALLOWED_USERS:
-        await call.answer("У вас нет прав.", show_alert=True)
-        return
-
     if callback_data.action == "delete":
-        ban_doc = bans_collection.find_one({"_id": ObjectId(callback_data.ban_id)})
+        ban_doc = await bans_collection.find_one({"_id": ObjectId(callback_data.ban_id)})
         if ban_doc:
-            bans_collection.delete_one({"_id": ObjectId(callback_data.ban_id)})
+            await bans_collection.delete_one({"_id": ObjectId(callback_data.ban_id)})
+            invalidate_count(bans_collection)
+            keyword_matcher.remove_ban(ban_doc['keyword'])
             await call.answer(f"Исключение '{ban_doc['keyword']}' удалено.", show_alert=True)
         else:
             await call.answer("Исключение не найдено.", show_alert=True)
@@ -179,13 +158,9 @@ async def on_ban_action(call: CallbackQuery, callback_data: BanActionCallback):
         return
 
     # После удаления пересчитываем страницу
-    page = callback_data.page
-    all_bans = list(bans_collection.find())
-    total_pages = max(1, math.ceil(len(all_bans) / PER_PAGE))
-    if page > total_pages:
-        page = total_pages
+    page_bans, page, total_pages = await fetch_page(bans_collection, callback_data.page, PER_PAGE)
 
-    text = build_bans_page_text(all_bans, page=page, per_page=PER_PAGE)
-    kb = build_bans_page_keyboard(all_bans, page=page, per_page=PER_PAGE)
+    text = build_bans_page_text(page_bans, page=page, total_pages=total_pages)
+    kb = build_bans_page_keyboard(page_bans, page=page, total_pages=total_pages)
 
-    await call.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
+    await sender.edit_text(call.message, text, parse_mode="HTML", reply_markup=kb)
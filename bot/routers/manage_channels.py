@@ -0,0 +1,141 @@
+# routers/manage_channels.py
+
+import html
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from admins import RoleFilter
+from channel_profiles import channel_profiles
+from sender import sender
+from supervisor import supervisor
+
+manage_channels_router = Router()
+
+CHANNEL_SET_USAGE = (
+    "Формат: /channel_set <i>chat_id</i> <i>параметр</i> <i>значение</i>\n\n"
+    "Параметры:\n"
+    "news_per_hour — новостей за интервал\n"
+    "publish_interval — интервал публикации в минутах\n"
+    "max_news_length — максимальная длина текста новости\n"
+    "keywords — ключевые слова через запятую\n"
+    "quiet_hours — тихие часы, например 23-7\n\n"
+    "Значение «-» сбрасывает параметр (для числовых — к общим настройкам бота)."
+)
+
+
+def build_channels_text(profiles: dict, running: list) -> str:
+    if not profiles:
+        return "Каналов пока нет. Добавьте канал командой /add_channel."
+
+    lines = ["<b>Каналы</b>\n"]
+    for chat_id, profile in sorted(profiles.items()):
+        status = "▶️" if chat_id in running else ("⏸" if profile.enabled else "⛔️")
+        lines.append(f"{status} <b>{html.escape(profile.title)}</b> (<code>{chat_id}</code>)")
+
+        settings = []
+        for key in ("news_per_hour", "publish_interval", "max_news_length"):
+            value = profile.setting(key, {})
+            if value is not None:
+                settings.append(f"{key}={value}")
+        if profile.keywords:
+            settings.append("keywords=" + ", ".join(profile.keywords))
+        if profile.quiet_hours:
+            settings.append(f"quiet_hours={profile.quiet_hours['start']}-{profile.quiet_hours['end']}")
+        lines.append("    " + html.escape("; ".join(settings) if settings else "общие настройки"))
+
+    return "\n".join(lines)
+
+
+def parse_channel_setting(name: str, raw: str):
+    """
+    Возвращает значение для записи в профиль (None — сбросить)
+    или бросает ValueError с текстом для пользователя.
+    """
+    if raw == "-":
+        return None
+
+    if name in ("news_per_hour", "max_news_length", "publish_interval"):
+        if not raw.isdigit() or int(raw) <= 0:
+            raise ValueError("Пожалуйста, введите корректное число больше нуля.")
+        value = int(raw)
+        if name == "max_news_length" and value > 4096:
+            raise ValueError("Длина новости должна быть больше 0 и ≤ 4096 символов.")
+        if name == "publish_interval":
+            value *= 60
+        return value
+
+    if name == "keywords":
+        keywords = [kw.strip() for kw in raw.split(",") if kw.strip()]
+        return keywords or None
+
+    if name == "quiet_hours":
+        try:
+            start, end = (int(part) for part in raw.split("-"))
+        except ValueError:
+            raise ValueError("Тихие часы задаются как <i>начало-конец</i>, например 23-7.")
+        if not (0 <= start <= 23 and 0 <= end <= 23) or start == end:
+            raise ValueError("Часы должны быть от 0 до 23 и не совпадать.")
+        return {"start": start, "end": end}
+
+    raise ValueError(CHANNEL_SET_USAGE)
+
+
+@manage_channels_router.message(Command("channels"), RoleFilter("viewer"))
+async def cmd_channels(message: Message):
+    profiles = await channel_profiles.get_all()
+    await sender.answer(message, build_channels_text(profiles, supervisor.channels()), parse_mode="HTML")
+
+
+@manage_channels_router.message(Command("add_channel"), RoleFilter("editor"))
+async def cmd_add_channel(message: Message, command: CommandObject):
+    args = (command.args or "").split(maxsplit=1)
+    if not args or not args[0].lstrip("-").isdigit():
+        await sender.answer(message, "Формат: /add_channel <i>chat_id</i> [название]", parse_mode="HTML")
+        return
+
+    chat_id = args[0]
+    values = {"enabled": True}
+    if len(args) > 1:
+        values["title"] = args[1].strip()
+
+    await channel_profiles.set(chat_id, **values)
+    supervisor.request_sync()
+    await sender.answer(message, f"Канал {chat_id} добавлен, публикация начнётся по его расписанию.")
+
+
+@manage_channels_router.message(Command("remove_channel"), RoleFilter("editor"))
+async def cmd_remove_channel(message: Message, command: CommandObject):
+    chat_id = (command.args or "").strip()
+    if await channel_profiles.get(chat_id) is None:
+        await sender.answer(message, "Канал не найден. Список каналов: /channels")
+        return
+
+    # Профиль не удаляем, а отключаем: настройки и история доставок сохраняются
+    await channel_profiles.set(chat_id, enabled=False)
+    supervisor.request_sync()
+    await sender.answer(message, f"Публикация в канал {chat_id} остановлена.")
+
+
+@manage_channels_router.message(Command("channel_set"), RoleFilter("editor"))
+async def cmd_channel_set(message: Message, command: CommandObject):
+    args = (command.args or "").split(maxsplit=2)
+    if len(args) != 3:
+        await sender.answer(message, CHANNEL_SET_USAGE, parse_mode="HTML")
+        return
+
+    chat_id, name, raw = args
+    if await channel_profiles.get(chat_id) is None:
+        await sender.answer(message, "Канал не найден. Список каналов: /channels")
+        return
+
+    try:
+        value = parse_channel_setting(name, raw.strip())
+    except ValueError as e:
+        await sender.answer(message, str(e), parse_mode="HTML")
+        return
+
+    # Планировщик канала подхватит новые настройки к следующему слоту
+    await channel_profiles.set(chat_id, **{name: value})
+    await sender.answer(message, f"Настройка {name} канала {chat_id} обновлена.")
@@ -1,5 +1,4 @@
 # routers/manage_keywords.py
-import math
 
 from aiogram.filters.callback_data import CallbackData
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -9,8 +8,11 @@ from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 
-from config import ALLOWED_USERS
-from database import keywords_collection
+from admins import RoleFilter
+from database import keywords_collection, insert_unique
+from keyword_matcher import keyword_matcher
+from pagination import fetch_page, invalidate_count
+from sender import sender
 from states import AddKeywordsStates
 from .callbacks import KeywordCallback
 
@@ -34,51 +36,32 @@ class KeywordActionCallback(CallbackData, prefix="kw_act"):
 
 # ---------- ФУНКЦИИ РЕНДЕРА ТЕКСТА И КЛАВИАТУРЫ ----------
 
-def build_keywords_page_text(keywords: list, page: int, per_page: int = PER_PAGE) -> str:
+def build_keywords_page_text(page_keywords: list, page: int, total_pages: int) -> str:
     """
     Генерируем текст для верха сообщения (список ключевых слов).
+    page_keywords — документы только этой страницы (см. pagination.fetch_page).
     """
-    total_pages = max(1, math.ceil(len(keywords) / per_page))
-    if page < 1:
-        page = 1
-    if page > total_pages:
-        page = total_pages
-
-    start_i = (page - 1) * per_page
-    end_i = start_i + per_page
-    page_slice = keywords[start_i:end_i]
-
     lines = []
     lines.append(f"<b>Страница</b> {page}/{total_pages}\n")
 
-    if not page_slice:
+    if not page_keywords:
         lines.append("На этой странице пока нет ключевых слов.")
     else:
-        for i, kw in enumerate(page_slice, start=1):
+        for i, kw in enumerate(page_keywords, start=1):
             kw_text = kw.get("keyword", "")
             lines.append(f"{i}. {kw_text}")
 
     return "\n".join(lines)
 
 
-def build_keywords_page_keyboard(keywords: list, page: int, per_page: int = PER_PAGE) -> InlineKeyboardMarkup:
+def build_keywords_page_keyboard(page_keywords: list, page: int, total_pages: int) -> InlineKeyboardMarkup:
     """
     Формируем InlineKeyboardMarkup для заданной страницы.
     """
     builder = InlineKeyboardBuilder()
 
-    total_pages = max(1, math.ceil(len(keywords) / per_page))
-    if page < 1:
-        page = 1
-    if page > total_pages:
-        page = total_pages
-
-    start_i = (page - 1) * per_page
-    end_i = start_i + per_page
-    page_slice = keywords[start_i:end_i]
-
     # На каждой строке: ТЕКСТ ключевого слова и кнопка "удалить"
-    for kw in page_slice:
+    for kw in page_keywords:
         kw_id = str(kw["_id"])
         kw_text = kw.get("keyword", "")
 
@@ -126,36 +109,27 @@ def build_keywords_page_keyboard(keywords: list, page: int, per_page: int = PER_
 
 # ---------- ОБРАБОТЧИК ПАГИНАЦИИ (Назад/Вперёд) ----------
 
-@manage_keywords_router.callback_query(KeywordPaginationCallback.filter())
+@manage_keywords_router.callback_query(KeywordPaginationCallback.filter(), RoleFilter("viewer"))
 async def on_keywords_pagination(call: CallbackQuery, callback_data: KeywordPaginationCallback):
-    user_id = call.from_user.id
-    if user_id not in ALLOWED_USERS:
-        await call.answer("У вас нет прав.", show_alert=True)
-        return
+    page_keywords, page, total_pages = await fetch_page(keywords_collection, callback_data.page, PER_PAGE)
 
-    page = callback_data.page
-    all_keywords = list(keywords_collection.find())
+    text = build_keywords_page_text(page_keywords, page=page, total_pages=total_pages)
+    kb = build_keywords_page_keyboard(page_keywords, page=page, total_pages=total_pages)
 
-    text = build_keywords_page_text(all_keywords, page=page, per_page=PER_PAGE)
-    kb = build_keywords_page_keyboard(all_keywords, page=page, per_page=PER_PAGE)
-
-    await call.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
+    await sender.edit_text(call.message, text, parse_mode="HTML", reply_markup=kb)
     await call.answer()
 
 
 # ---------- ОБРАБОТЧИК ДЕЙСТВИЙ (УДАЛИТЬ) ----------
 
-@manage_keywords_router.callback_query(KeywordActionCallback.filter())
+@manage_keywords_router.callback_query(KeywordActionCallback.filter(), RoleFilter("editor"))
 async def on_keyword_action(call: CallbackQuery, callback_data: KeywordActionCallback):
-    user_id = call.from_user.id
-    if user_id not in ALLOWED_USERS:
-        await call.answer("У вас нет прав.", show_alert=True)
-        return
-
     if callback_data.action == "delete":
-        keyword_doc = keywords_collection.find_one({"_id": ObjectId(callback_data.keyword_id)})
+        keyword_doc = await keywords_collection.find_one({"_id": ObjectId(callback_data.keyword_id)})
         if keyword_doc:
-            keywords_collection.delete_one({"_id": ObjectId(callback_data.keyword_id)})
+            await keywords_collection.delete_one({"_id": ObjectId(callback_data.keyword_id)})
+            invalidate_count(keywords_collection)
+            keyword_matcher.remove_keyword(keyword_doc['keyword'])
             await call.answer(f"Ключевое слово '{keyword_doc['keyword']}' удалено.", show_alert=True)
         else:
             await call.answer("Ключевое слово не найдено.", show_alert=True)
@@ -165,31 +139,33 @@ async def on_keyword_action(call: CallbackQuery, callback_data: KeywordActionCal
         return
 
     # Обновляем текущую страницу (на случай, если удалили последний элемент)
-    page = callback_data.page
-    all_keywords = list(keywords_collection.find())
-    total_pages = max(1, math.ceil(len(all_keywords) / PER_PAGE))
-    if page > total_pages:
-        page = total_pages
+    page_keywords, page, total_pages = await fetch_page(keywords_collection, callback_data.page, PER_PAGE)
 
-    text = build_keywords_page_text(all_keywords, page=page, per_page=PER_PAGE)
-    kb = build_keywords_page_keyboard(all_keywords, page=page, per_page=PER_PAGE)
+    text = build_keywords_page_text(page_keywords, page=page, total_pages=total_pages)
+    kb = build_keywords_page_keyboard(page_keywords, page=page, total_pages=total_pages)
 
-    await call.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
+    await sender.edit_text(call.message, text, parse_mode="HTML", reply_markup=kb)
 
-@manage_keywords_router.message(AddKeywordsStates.waiting_for_keywords)
+@manage_keywords_router.message(AddKeywordsStates.waiting_for_keywords, RoleFilter("editor"))
 async def process_keywords(message: Message, state: FSMContext):
     lines = message.text.strip().split('\n')
     added_keywords = []
     failed_keywords = []
 
+    lines = [line.strip() for line in lines]
+    # Каждое значение отправляем в БД один раз, даже если оно повторяется в сообщении
+    unique_lines = list(dict.fromkeys(lines))
+    existing = await insert_unique(keywords_collection, 'keyword', [{'keyword': line} for line in unique_lines])
+    invalidate_count(keywords_collection)
+    keyword_matcher.add_keywords(line for line in unique_lines if line not in existing)
+
+    seen = set()
     for line in lines:
-        line = line.strip()
-        existing = keywords_collection.find_one({'keyword': line})
-        if existing:
+        if line in existing or line in seen:
             failed_keywords.append(f"{line} - уже существует")
         else:
-            keywords_collection.insert_one({'keyword': line})
             added_keywords.append(line)
+        seen.add(line)
 
     response = []
     if added_keywords:
@@ -199,5 +175,5 @@ async def process_keywords(message: Message, state: FSMContext):
         response.append("Не добавлены (уже существуют):")
         response.extend(failed_keywords)
 
-    await message.answer("\n".join(response))
+    await sender.answer(message, "\n".join(response))
     await state.clear()
\ No newline at end of file
@@ -1,5 +1,4 @@
 # routers/manage_sources.py
-import math
 import re
 
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -11,8 +10,11 @@ from aiogram.fsm.context import FSMContext
 
 from aiogram.filters.callback_data import CallbackData
 
-from config import ALLOWED_USERS, logger
-from database import sources_collection
+from admins import RoleFilter
+from config import logger
+from database import sources_collection, insert_unique
+from pagination import fetch_page, invalidate_count
+from sender import sender
 from states import AddSourceStates
 
 manage_sources_router = Router()
@@ -43,26 +45,16 @@ class SourceActionCallback(CallbackData, prefix="src_act"):
 # ------------------ ЛОГИКА РЕНДЕРИНГА ------------------
 
 
-def build_sources_page_text(sources: list, page: int, per_page: int = 5) -> str:
+def build_sources_page_text(page_sources: list, page: int, total_pages: int) -> str:
     """
     Собираем текст для верхней части сообщения (список источников на текущей странице).
+    page_sources — документы только этой страницы (см. pagination.fetch_page).
     """
-    total_pages = max(1, math.ceil(len(sources) / per_page))  # хотя бы 1 стр.
-    if page < 1:
-        page = 1
-    if page > total_pages:
-        page = total_pages
-
-    start_index = (page - 1) * per_page
-    end_index = start_index + per_page
-
-    page_slice = sources[start_index:end_index]
-
     lines = []
     lines.append(f"<b>Страница</b> {page}/{total_pages}\n")
 
     # Перечислим источники на текущей странице
-    for i, src in enumerate(page_slice, start=1):
+    for i, src in enumerate(page_sources, start=1):
         name = src.get("name", "Без названия")
         url = src.get("url", "—")
         is_active = src.get("active", True)
@@ -70,41 +62,24 @@ def build_sources_page_text(sources: list, page: int, per_page: int = 5) -> str:
         lines.append(f"{i}. {name} {status} ({url})")
 
     # Если совсем нет источников на странице (может быть при удалении)
-    if not page_slice:
+    if not page_sources:
         lines.append("На этой странице пока нет источников.")
 
     return "\n".join(lines)
 
 
-def build_sources_page_keyboard(sources: list, page: int, per_page: int = PER_PAGE) -> InlineKeyboardMarkup:
+def build_sources_page_keyboard(page_sources: list, page: int, total_pages: int) -> InlineKeyboardMarkup:
     """
     Формирует InlineKeyboardMarkup для заданной страницы.
 
-    :param sources: полный список источников (list)
+    :param page_sources: источники текущей страницы (list)
     :param page: номер страницы (1..)
-    :param per_page: сколько показываем за одну страницу
+    :param total_pages: сколько всего страниц
     :return: InlineKeyboardMarkup
     """
 
     builder = InlineKeyboardBuilder()
 
-    # Подсчитаем общее количество страниц
-    total_pages = math.ceil(len(sources) / per_page) if sources else 1
-
-    if total_pages < 1:
-        total_pages = 1
-
-    # Чтобы не выходить за рамки
-    if page < 1:
-        page = 1
-    if page >= total_pages:
-        page = total_pages
-
-    # Получим нужный срез
-    start_index = (page - 1) * per_page
-    end_index = start_index + per_page
-    page_sources = sources[start_index:end_index]
-
     # Формируем кнопки
     for src in page_sources:
         source_id = str(src["_id"])
@@ -182,7 +157,7 @@ def build_sources_page_keyboard(sources: list, page: int, per_page: int = PER_PA
 
 
 # ------------------ ОБРАБОТЧИК КОМАНДЫ ------------------
-@manage_sources_router.message(AddSourceStates.waiting_for_sources)
+@manage_sources_router.message(AddSourceStates.waiting_for_sources, RoleFilter("editor"))
 async def process_sources(message: Message, state: FSMContext):
     sources_text = message.text
     lines = sources_text.strip().split('\n')
@@ -191,6 +166,8 @@ async def process_sources(message: Message, state: FSMContext):
 
     pattern = re.compile(r'^(?P<link>\S+)\s*\(\s*(?P<name>.+?)\s*\)$')
 
+    # Сначала разбираем все строки, чтобы проверить и добавить источники одним запросом
+    parsed = []  # (ссылка, название) или (None, текст ошибки)
     for line in lines:
         line = line.strip()
         match = pattern.match(line)
@@ -198,18 +175,28 @@ async def process_sources(message: Message, state: FSMContext):
             link = match.group('link').strip()
             name = match.group('name').strip()
             if not re.match(r'^https?://', link):
-                failed_sources.append(f"{line} (некорректная ссылка)")
+                parsed.append((None, f"{line} (некорректная ссылка)"))
                 continue
-
-            existing_source = sources_collection.find_one({'url': link})
-            if existing_source:
-                failed_sources.append(f"{link} ({name}) - уже существует")
-                continue
-
-            sources_collection.insert_one({"url": link, "name": name, "active": True})
-            added_sources.append(f"{link} ({name})")
+            parsed.append((link, name))
+        else:
+            parsed.append((None, f"{line} (неверный формат)"))
+
+    new_sources = {}
+    for link, name in parsed:
+        if link and link not in new_sources:
+            new_sources[link] = {"url": link, "name": name, "active": True}
+    existing = await insert_unique(sources_collection, 'url', list(new_sources.values()))
+    invalidate_count(sources_collection)
+
+    seen = set()
+    for link, name in parsed:
+        if link is None:
+            failed_sources.append(name)
+        elif link in existing or link in seen:
+            failed_sources.append(f"{link} ({name}) - уже существует")
         else:
-            failed_sources.append(f"{line} (неверный формат)")
+            added_sources.append(f"{link} ({name})")
+            seen.add(link)
 
     response_messages = []
     if added_sources:
@@ -219,29 +206,24 @@ async def process_sources(message: Message, state: FSMContext):
         response_messages.append("Не удалось распознать:")
         response_messages.extend(failed_sources)
 
-    await message.answer('\n'.join(response_messages))
+    await sender.answer(message, '\n'.join(response_messages))
     await state.clear()
 
 
 # ------------------ ОБРАБОТЧИК ПЕРЕКЛЮЧЕНИЯ СТРАНИЦ ------------------
 
-@manage_sources_router.callback_query(SourcePaginationCallback.filter())
+@manage_sources_router.callback_query(SourcePaginationCallback.filter(), RoleFilter("viewer"))
 async def on_pagination_callback(call: CallbackQuery, callback_data: SourcePaginationCallback):
     """
     Нажали "Назад" или "Вперёд" для перелистывания страниц.
     """
-    user_id = call.from_user.id
-    if user_id not in ALLOWED_USERS:
-        await call.answer("У вас нет прав.", show_alert=True)
-        return
-
-    page = callback_data.page
-    sources = list(sources_collection.find())
-    text = build_sources_page_text(sources, page=page, per_page=PER_PAGE)
-    kb = build_sources_page_keyboard(sources, page=page, per_page=PER_PAGE)
+    page_sources, page, total_pages = await fetch_page(sources_collection, callback_data.page, PER_PAGE)
+    text = build_sources_page_text(page_sources, page=page, total_pages=total_pages)
+    kb = build_sources_page_keyboard(page_sources, page=page, total_pages=total_pages)
     # Обновляем именно text + reply_markup
     try:
-        await call.message.edit_text(
+        await sender.edit_text(
+            call.message,
             text=text,
             reply_markup=kb,
             parse_mode="HTML",
@@ -255,22 +237,17 @@ async def on_pagination_callback(call: CallbackQuery, callback_data: SourcePagin
 
 # ------------------ ОБРАБОТЧИК ДЕЙСТВИЙ НАД ИСТОЧНИКАМИ ------------------
 
-@manage_sources_router.callback_query(SourceActionCallback.filter())
-@manage_sources_router.callback_query(SourceActionCallback.filter())
+@manage_sources_router.callback_query(SourceActionCallback.filter(), RoleFilter("editor"))
+@manage_sources_router.callback_query(SourceActionCallback.filter(), RoleFilter("editor"))
 async def on_source_action_callback(call: CallbackQuery, callback_data: SourceActionCallback):
     """
     Нажали на «активировать», «деактивировать» или «удалить».
     """
-    user_id = call.from_user.id
-    if user_id not in ALLOWED_USERS:
-        await call.answer("У вас нет прав.", show_alert=True)
-        return
-
     action = callback_data.action
     source_id = callback_data.source_id
     page = callback_data.page
 
-    source = sources_collection.find_one({"_id": ObjectId(source_id)})
+    source = await sources_collection.find_one({"_id": ObjectId(source_id)})
     if not source:
         await call.answer("Источник не найден.", show_alert=True)
         return
@@ -279,30 +256,27 @@ async def on_source_action_callback(call: CallbackQuery, callback_data: SourceAc
     is_active = source.get("active", True)
 
     if action == "activate":
-        sources_collection.update_one({"_id": ObjectId(source_id)}, {"$set": {"active": True}})
+        await sources_collection.update_one({"_id": ObjectId(source_id)}, {"$set": {"active": True}})
         await call.answer(f"Источник {name} активирован.", show_alert=True)
     elif action == "deactivate":
-        sources_collection.update_one({"_id": ObjectId(source_id)}, {"$set": {"active": False}})
+        await sources_collection.update_one({"_id": ObjectId(source_id)}, {"$set": {"active": False}})
         await call.answer(f"Источник {name} деактивирован.", show_alert=True)
     elif action == "delete":
-        sources_collection.delete_one({"_id": ObjectId(source_id)})
+        await sources_collection.delete_one({"_id": ObjectId(source_id)})
+        invalidate_count(sources_collection)
         await call.answer(f"Источник {name} удалён.", show_alert=True)
     else:
         await call.answer("Неизвестное действие", show_alert=True)
         return
 
     # Снова формируем список/клаву для того же page
-    sources = list(sources_collection.find())
-
-    # Если после удаления вдруг текущая страница стала больше, чем доступно, уменьшаем page
-    total_pages = max(1, math.ceil(len(sources) / PER_PAGE))
-    if page > total_pages:
-        page = total_pages
-
-    text = build_sources_page_text(sources, page=page, per_page=PER_PAGE)
-    kb = build_sources_page_keyboard(sources, page=page, per_page=PER_PAGE)
+    # (fetch_page сам уменьшит page, если после удаления страниц стало меньше)
+    page_sources, page, total_pages = await fetch_page(sources_collection, page, PER_PAGE)
+    text = build_sources_page_text(page_sources, page=page, total_pages=total_pages)
+    kb = build_sources_page_keyboard(page_sources, page=page, total_pages=total_pages)
     try:
-        await call.message.edit_text(
+        await sender.edit_text(
+            call.message,
             text=text,
             reply_markup=kb,
             parse_mode="Markdown",
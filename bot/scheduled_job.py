@@ -3,186 +3,278 @@
 import asyncio
 import re
 from datetime import datetime
-from config import CHANNEL_ID, logger
-from database import collection, config_collection
 
-from misc import get_effective_title, flexible_truncate_text_by_delimiters, remove_first_sentence_if_in_title, \
-    remove_publication_date_lines, remove_custom_fragments, compress_newlines, extract_and_remove_first_sentence, \
-    join_single_word_lines, clean_news_html, remove_duplicate_dots
+from pymongo import ReturnDocument
 
-# либо передавать его в функцию scheduled как параметр
-MAX_MESSAGE_LENGTH = 4096  # fallback, если не найдёт в конфиге
+from config import (
+    PUBLISH_MARK_POLICY,
+    PUBLISH_MAX_ATTEMPTS,
+    SCHEDULE_CHECK_INTERVAL,
+    logger
+)
+from database import collection
+from config_cache import bot_config
+from channel_profiles import channel_profiles
+from keyword_matcher import keyword_matcher
+from dedup import deduplicator
+from news_queue import NewsPrefetcher, keep_lease, release_news
+from publish_plan import load_plan, save_plan
+from render import get_rendered_text, MAX_MESSAGE_LENGTH
+from sender import sender
+from stats import stats_recorder
+from metrics import PUBLISH_SECONDS, SCHEDULER_LAG_SECONDS
 
+from misc import get_effective_title
 
-async def publish_single_news(news, bot, channel_ids):
-    config = config_collection.find_one({"_id": "bot_config"})
-    max_news_length = config.get('max_news_length', MAX_MESSAGE_LENGTH)
 
-    # Убрали пока заголовки пока будет только первое предложение
+async def publish_single_news(news, bot, channel, max_news_length=None):
+    """
+    Публикует новость в один канал и записывает результат в deliveries.<канал>.
+    """
     title = get_effective_title(news)
-    raw_text = news.get("text", "Нет содержания")
+    image = news.get("image")  # URL изображения
 
-    fixed_text = clean_news_html(raw_text)
+    with PUBLISH_SECONDS.time(channel=channel):
+        # Текст обычно уже подготовлен заранее фоновой задачей render_worker
+        full_text = await get_rendered_text(news, max_news_length)
 
-    text_content = fixed_text if fixed_text != '' else raw_text
+        result = await deliver_to_channel(bot, channel, full_text, title, image)
+        await record_delivery(news, channel, result)
+    if result["ok"]:
+        logger.info(f"Новость '{title}' опубликована в канал {channel}.")
+    return result["ok"]
 
-    # --- 1) Удаляем из текста первое предложение, если оно уже в заголовке ---
-    # text_content = remove_first_sentence_if_in_title(text_content, title)
 
-    # --- 2) Удаляем "дату публикации", если она отдельной строкой в начале/конце ---
-    text_content = remove_publication_date_lines(text_content)
+async def send_news_to_channel(bot, channel, full_text, title, image):
+    if image:
+        try:
+            await sender.send_message(
+                bot,
+                channel,
+                full_text,
+                parse_mode='HTML',
+                disable_web_page_preview=True
+            )
+        except Exception as e:
+            error_message = str(e).lower()
+            # Если ошибка связана с URL изображения, публикуем без картинки
+            if "http url content" in error_message or "wrong file identifier" in error_message:
+                logger.error(f"Ошибка при отправке изображения для новости '{title}': {e}")
+                logger.info(f"Публикуем новость '{title}' без изображения.")
+                await sender.send_message(
+                    bot,
+                    channel,
+                    full_text,
+                    parse_mode='HTML',
+                    disable_web_page_preview=True
+                )
+            else:
+                raise e
+    else:
+        try:
+            await sender.send_message(
+                bot,
+                channel,
+                full_text,
+                parse_mode='HTML',
+                disable_web_page_preview=True
+            )
+        except Exception as e:
+            # render_news экранирует текст, так что "can't parse entities" — ошибка рендера,
+            # а не повод «чинить» разметку: попытка записывается как неудачная
+            logger.error(f"Ошибка при отправке новости '{title}': {e}")
+            raise e
 
-    text_content = remove_custom_fragments(text_content)
 
-    text_content = compress_newlines(text_content)
-    text_content = remove_duplicate_dots(text_content)
+async def deliver_to_channel(bot, channel, full_text, title, image):
+    """
+    Отправляет новость в один канал и возвращает результат доставки,
+    не пробрасывая исключение наружу.
+    """
+    try:
+        await send_news_to_channel(bot, channel, full_text, title, image)
+    except Exception as e:
+        logger.error(f"Ошибка при публикации новости '{title}' в канал {channel}: {e}")
+        return {"channel": str(channel), "ok": False, "error": str(e)}
 
-    text_content = join_single_word_lines(text_content)
+    return {"channel": str(channel), "ok": True, "error": None}
 
-    image = news.get("image")  # URL изображения
-    url = news.get("url")  # Ссылка на источник
 
+def is_published(deliveries: dict, channel_ids) -> bool:
+    """
+    Решает по PUBLISH_MARK_POLICY, можно ли убрать новость из общей очереди:
+      - "all" и "per_channel": все активные каналы с ней закончили (done);
+      - "any": хотя бы один канал её получил или все каналы закончили с ней без доставки
+        (пропустили по фильтру или исчерпали попытки).
+    """
+    all_done = all(deliveries.get(str(channel), {}).get("done") for channel in channel_ids)
+    if PUBLISH_MARK_POLICY == "any":
+        return all_done or any(delivery.get("ok") for delivery in deliveries.values())
+    return all_done
 
 
-    tags = " ".join(
-        f"#{word.replace(' ', '_')}"
-        for word in news.get("found_keywords", [])
-    )
-    if len(text_content) > max_news_length:
-        text_content = flexible_truncate_text_by_delimiters(text_content, max_news_length)
-    if url:
-        first_sentence, remainder = extract_and_remove_first_sentence(text_content)
-        linked_first = f'<a href="{url}">{first_sentence}</a>'
-        # Собираем обратно
-        text_content = linked_first + ' ' + remainder.strip()
+async def record_delivery(news, channel, result):
+    """
+    Сохраняет результат попытки в deliveries.<канал> и снимает аренду канала.
+
+    Канал заканчивает с новостью (done), когда она доставлена, пропущена фильтром канала,
+    исчерпаны PUBLISH_MAX_ATTEMPTS попыток или (политика "per_channel") после первой попытки.
+    Незаконченную новость канал повторит в следующем слоте.
+    Когда все активные каналы закончили, новость помечается published и уходит из очереди.
+    """
+    channel = str(channel)
+    attempts = (news.get("deliveries", {}).get(channel, {}).get("attempts") or 0) + 1
+    done = result["ok"] or bool(result.get("skipped")) or PUBLISH_MARK_POLICY == "per_channel"
+    if not done and attempts >= PUBLISH_MAX_ATTEMPTS:
+        logger.error(
+            f"Новость '{news.get('title')}' не доставлена в канал {channel} за {attempts} попыток, "
+            f"канал её пропускает."
+        )
+        done = True
+
+    delivery = {
+        "ok": result["ok"],
+        "done": done,
+        "attempts": attempts,
+        "error": result["error"],
+        "at": datetime.utcnow()
+    }
+    if result.get("skipped"):
+        delivery["skipped"] = result["skipped"]
+        stats_recorder.record(channel, "skipped")
     else:
-        # Если URL нет, ничего не делаем, текст остаётся как есть
-        pass
+        stats_recorder.record(channel, "sent" if result["ok"] else "failed")
+
+    updated = await collection.find_one_and_update(
+        {"_id": news["_id"]},
+        {"$set": {f"deliveries.{channel}": delivery}, "$unset": {f"leases.{channel}": ""}},
+        projection={"deliveries": 1, "published": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    # Каждый канал записывает свой итог атомарно и видит итоги остальных,
+    # поэтому последний закончивший канал и закрывает новость
+    if updated and not updated.get("published"):
+        if is_published(updated.get("deliveries", {}), await channel_profiles.active_ids()):
+            await collection.update_one({"_id": news["_id"]}, {"$set": {"published": True}})
+    return done
+
+
+async def close_finished_news(channel_ids):
+    """
+    После отключения канала закрывает новости, которые ждали только его:
+    все оставшиеся активные каналы с ними уже закончили (при любой политике).
+    """
+    if not channel_ids:
+        return 0
+    result = await collection.update_many(
+        {"published": False, **{f"deliveries.{channel}.done": True for channel in channel_ids}},
+        {"$set": {"published": True}}
+    )
+    return result.modified_count
 
-    full_text = text_content
-    for channel in channel_ids:
+
+async def publish_next_news(bot, profile, max_news_length, prefetcher) -> bool:
+    """
+    Публикует в канал одну новость из очереди. Перепечатки (см. dedup.py), новости с исключениями (bans)
+    и не прошедшие фильтр ключевых слов канала отмечаются пропущенными и слот не занимают.
+    Возвращает False, если ничего не опубликовано (очередь пуста или сбой до отправки).
+    """
+    channel = profile.chat_id
+    await keyword_matcher.ensure_loaded()
+    while True:
+        news = await prefetcher.next_news()
+        if not news:
+            return False
+
+        lease_task = asyncio.create_task(keep_lease(news, channel))
         try:
-            # Публикуем
-            if image:
-                try:
-                    await bot.send_message(
-                        chat_id=channel,
-                        text=full_text,
-                        parse_mode='HTML',
-                        disable_web_page_preview=True
-                    )
-                except Exception as e:
-                    error_message = str(e).lower()
-                    # Если ошибка связана с URL изображения, публикуем без картинки
-                    if "http url content" in error_message or "wrong file identifier" in error_message:
-                        logger.error(f"Ошибка при отправке изображения для новости '{title}': {e}")
-                        logger.info(f"Публикуем новость '{title}' без изображения.")
-                        await bot.send_message(
-                            chat_id=channel,
-                            text=full_text,
-                            parse_mode='HTML',
-                            disable_web_page_preview=True
-                        )
-                    elif "can't parse entities" in error_message:
-                        full_text = full_text + '</a>'
-                        await bot.send_message(
-                            chat_id=channel,
-                            text=full_text,
-                            parse_mode='HTML',
-                            disable_web_page_preview=True
-                        )
-                    else:
-                        raise e
+            if "fingerprint" not in news:
+                # Фоновая задача ещё не проверила новость на дубли — проверяем здесь
+                suppressed, = await deduplicator.process([news])
+                if suppressed:
+                    continue
+            if news.get("matched") == keyword_matcher.version:
+                banned_by = news.get("banned_by")
             else:
-                try:
-                    await bot.send_message(
-                        chat_id=channel,
-                        text=full_text,
-                        parse_mode='HTML',
-                        disable_web_page_preview=True
-                    )
-                except Exception as e:
-                    error_message = str(e).lower()
-                    logger.error(f"Ошибка при отправке новости '{title}': {e}")
-                    if "can't parse entities" in error_message:
-                        full_text = full_text + '</a>'
-                        await bot.send_message(
-                            chat_id=channel,
-                            text=full_text,
-                            parse_mode='HTML',
-                            disable_web_page_preview=True
-                        )
-
-            # Отмечаем новость как опубликованную
-            collection.update_one(
-                {"_id": news["_id"]},
-                {"$set": {"published": True}}
-            )
-
-            logger.info(f"Новость '{title}' опубликована.")
+                # Фоновая задача render_worker ещё не проверила новость под текущий набор слов
+                _, banned_by = keyword_matcher.match_news(news)
+            if banned_by:
+                await record_delivery(news, channel, {"ok": False, "error": None, "skipped": "ban"})
+                continue
+            if not profile.accepts(news):
+                await record_delivery(news, channel, {"ok": False, "error": None, "skipped": "keywords"})
+                continue
+            await publish_single_news(news, bot, channel, max_news_length)
+            return True
         except Exception as e:
-            collection.update_one(
-                {"_id": news["_id"]},
-                {"$set": {"published": True}}
-            )
-            logger.error(f"Ошибка при публикации новости '{title}': {e}")
+            # Ошибка отправки в Telegram сюда не доходит: deliver_to_channel записывает её как попытку.
+            # Здесь сбои рендера, отсева дублей или БД — попытку не считаем, аренда снимается ниже,
+            # и канал вернётся к новости в следующем слоте
+            logger.error(f"Не смогли опубликовать новость {news['_id']} в канал {channel}, повторим позже: {e}")
+            return False
+        finally:
+            lease_task.cancel()
+            # Если аренда не снята записью результата (например, упала запись в БД), снимаем её здесь
+            await release_news(news, channel)
 
 
-async def scheduled(bot, channel_ids=None):
+async def scheduled(bot, channel_id):
     """
-    Запускается в виде фоновой задачи из main.py
-    Периодически публикует новости в канал
+    Планировщик одного канала, запускается супервизором (supervisor.py) для каждого активного профиля.
+    Публикует новости в канал по слотам своего плана (см. publish_plan.PublishPlan),
+    независимо от остальных каналов: у каждого своя скорость, очередь и аренды.
     """
-    if channel_ids is None:
-        all_ids = [CHANNEL_ID]
-    else:
-        all_ids = channel_ids
+    channel_id = str(channel_id)
+    prefetcher = NewsPrefetcher(channel_id)
+    plan = None
 
     while True:
-        config = config_collection.find_one({"_id": "bot_config"})
-        news_per_interval = config.get('news_per_hour', 5)
-        publish_interval = config.get('publish_interval', 3600)
+        profile = await channel_profiles.get(channel_id)
+        if profile is None or not profile.enabled:
+            # Профиль удалён или отключён — супервизор вот-вот остановит задачу
+            await asyncio.sleep(SCHEDULE_CHECK_INTERVAL)
+            continue
+
+        config = await bot_config.get()
+        news_per_interval = profile.setting('news_per_hour', config, 5)
+        publish_interval = profile.setting('publish_interval', config, 3600)
 
         if news_per_interval <= 0 or publish_interval <= 0:
-            logger.warning("Лимит новостей или интервал публикации <= 0. Повтор через 60 сек.")
+            logger.warning(f"Канал {channel_id}: лимит новостей или интервал публикации <= 0. Повтор через 60 сек.")
             await asyncio.sleep(60)
             continue
 
-        # Сбрасываем published_count в конфиге
-        config_collection.update_one(
-            {"_id": "bot_config"},
-            {"$set": {"published_count": 0}}
-        )
-        published_count = 0
-        interval_between_news = publish_interval / news_per_interval
-        cycle_start_time = datetime.utcnow()
-
-        while published_count < news_per_interval:
-            news = collection.find_one({"published": False})
-            if news:
-                try:
-                    await publish_single_news(news, bot, all_ids)
-                    published_count += 1
-                    config_collection.update_one(
-                        {"_id": "bot_config"},
-                        {"$set": {"published_count": published_count}}
-                    )
-                except Exception as e:
-                    logger.info(f"Не смогли опубликовать новость. Причина: {e}")
-                    published_count += 1
-                    config_collection.update_one(
-                        {"_id": "bot_config"},
-                        {"$set": {"published_count": published_count}}
-                    )
-            else:
-                logger.info("Нет больше новостей для публикации.")
-                break
+        if plan is None:
+            plan = await load_plan(f"publish_plan:{channel_id}", news_per_interval, publish_interval)
+            await save_plan(plan)
+        elif not plan.matches(news_per_interval, publish_interval):
+            # Настройки поменялись — новый шаг действует уже со следующего слота
+            plan = plan.replan(news_per_interval, publish_interval)
+            await save_plan(plan)
+            logger.info(
+                f"Канал {channel_id}: настройки публикации изменены, "
+                f"следующий слот — {plan.slot_time():%H:%M:%S} UTC."
+            )
 
-            await asyncio.sleep(interval_between_news)
+        plan.skip_missed()
+        delay = plan.seconds_until_slot()
+        if delay > 0:
+            # Спим кусками, чтобы смена настроек подхватывалась не позже чем через SCHEDULE_CHECK_INTERVAL
+            await asyncio.sleep(min(delay, SCHEDULE_CHECK_INTERVAL))
+            continue
+        SCHEDULER_LAG_SECONDS.observe(-delay, channel=channel_id)
+
+        if profile.in_quiet_hours():
+            # В «тихие часы» слоты проходят впустую, чтобы утром не публиковать всё накопленное разом
+            logger.info(f"Канал {channel_id}: тихие часы, слот пропущен.")
+        else:
+            max_news_length = profile.setting('max_news_length', config, MAX_MESSAGE_LENGTH)
+            if await publish_next_news(bot, profile, max_news_length, prefetcher):
+                plan.published_count += 1
+            else:
+                logger.info(f"Канал {channel_id}: ничего не опубликовано, слот пропущен.")
 
-        # Ждём до следующего цикла
-        time_passed = (datetime.utcnow() - cycle_start_time).total_seconds()
-        time_to_wait = publish_interval - time_passed
-        if time_to_wait > 0:
-            logger.info(f"Ждем {time_to_wait} секунд до следующего цикла публикации.")
-            await asyncio.sleep(time_to_wait)
+        # Следующий слот считается от начала цикла, а не от момента отправки,
+        # поэтому время публикации и запросов к БД не сдвигает расписание
+        plan.advance()
+        await save_plan(plan)
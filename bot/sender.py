@@ -0,0 +1,307 @@
+# sender.py
+
+import asyncio
+import time
+from collections import deque
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError, TelegramServerError
+
+from config import (
+    SEND_GLOBAL_RATE,
+    SEND_PRIVATE_CHAT_RATE,
+    SEND_GROUP_CHAT_RATE,
+    SEND_WORKERS,
+    SEND_MAX_RETRIES,
+    SEND_BACKOFF_BASE,
+    logger
+)
+from metrics import Gauge, SEND_SECONDS
+
+
+class TokenBucket:
+    """
+    Классический token bucket: rate токенов в секунду, не больше capacity в запасе.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self) -> float:
+        """
+        Сколько секунд ждать до следующего токена (0 — можно отправлять сейчас).
+        """
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def try_consume(self) -> float:
+        """
+        Проверка и списание токена за один шаг: 0 — токен списан, иначе сколько секунд ждать.
+        """
+        delay = self.delay()
+        if delay <= 0:
+            self.consume()
+        return delay
+
+    def pause(self, seconds: float):
+        """
+        Telegram прислал retry_after — не отправляем в этот чат до истечения паузы.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def is_idle(self, now: float) -> bool:
+        return now >= self.paused_until and self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+class _SendJob:
+    __slots__ = ("chat_id", "call", "future", "enqueued_at", "attempt")
+
+    def __init__(self, chat_id, call, future):
+        self.chat_id = chat_id
+        self.call = call
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempt = 0
+
+
+class OutboundSender:
+    """
+    Единая очередь исходящих сообщений бота.
+
+    Все send_message / answer / edit_text из публикатора и роутеров идут через неё:
+      - соблюдаются лимиты Telegram — общий (SEND_GLOBAL_RATE сообщений/сек) и на каждый чат
+        (1 сообщение/сек в личку, SEND_GROUP_CHAT_RATE в минуту в группы и каналы);
+      - сообщения в один чат уходят строго по очереди (FIFO на каждый чат): в общей очереди
+        стоят не сообщения, а чаты, и чат обрабатывает не больше одного воркера за раз;
+      - при TelegramRetryAfter чат ставится на паузу на retry_after секунд и сообщение
+        отправляется повторно, раньше следующих сообщений в этот чат;
+      - сетевые ошибки и 5xx Telegram повторяются с экспоненциальной задержкой.
+    Вызывающий код просто ждёт результат: исключение пробрасывается, только если
+    все попытки исчерпаны или ошибка не временная (например, Bad Request).
+    """
+
+    def __init__(self, workers: int = SEND_WORKERS):
+        self.workers = workers
+        # Очередь чатов, готовых к отправке; создаётся в start(), уже внутри работающего event loop
+        self.queue = None
+        self.global_bucket = TokenBucket(SEND_GLOBAL_RATE, SEND_GLOBAL_RATE)
+        self.chat_buckets = {}
+        # Чат -> сообщения в порядке отправки. Чат есть здесь, пока у него есть сообщения:
+        # тогда он либо в queue, либо в обработке у воркера, либо ждёт лимита (call_later)
+        self._chat_jobs = {}
+        self._tasks = []
+
+        # Метрики
+        self.pending_count = 0
+        self.sent_count = 0
+        self.failed_count = 0
+        self.retry_count = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    # ---------- ЗАПУСК / ОСТАНОВКА ----------
+
+    def start(self):
+        if self._tasks:
+            return
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ---------- ПУБЛИЧНЫЕ МЕТОДЫ ----------
+
+    async def send_message(self, bot, chat_id, text, **kwargs):
+        with SEND_SECONDS.time(channel=chat_id):
+            return await self.submit(chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs))
+
+    async def answer(self, message, text, **kwargs):
+        return await self.submit(message.chat.id, lambda: message.answer(text, **kwargs))
+
+    async def edit_text(self, message, text, **kwargs):
+        return await self.submit(message.chat.id, lambda: message.edit_text(text, **kwargs))
+
+    async def submit(self, chat_id, call):
+        """
+        call — функция без аргументов, возвращающая корутину запроса к Telegram.
+        Её можно вызвать несколько раз (при повторных попытках).
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        key = str(chat_id)
+        jobs = self._chat_jobs.get(key)
+        if jobs is None:
+            jobs = self._chat_jobs[key] = deque()
+            self.queue.put_nowait(key)
+        jobs.append(_SendJob(chat_id, call, future))
+        self.pending_count += 1
+        return await future
+
+    def metrics(self) -> dict:
+        return {
+            # Все ещё не отправленные сообщения, включая отложенные до освобождения лимита чата
+            "queue_depth": self.pending_count,
+            "sent": self.sent_count,
+            "failed": self.failed_count,
+            "retries": self.retry_count,
+            "last_wait": self.last_wait,
+            "max_wait": self.max_wait,
+            "avg_wait": self.total_wait / self.sent_count if self.sent_count else 0.0,
+        }
+
+    # ---------- ВНУТРЕННЕЕ ----------
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        bucket = self.chat_buckets.get(key)
+        if bucket is None:
+            if len(self.chat_buckets) > 1000:
+                self._prune_buckets()
+            if key.startswith('-'):
+                # Группы и каналы: SEND_GROUP_CHAT_RATE сообщений в минуту
+                bucket = TokenBucket(SEND_GROUP_CHAT_RATE / 60, 3)
+            else:
+                bucket = TokenBucket(SEND_PRIVATE_CHAT_RATE, 1)
+            self.chat_buckets[key] = bucket
+        return bucket
+
+    def _prune_buckets(self):
+        now = time.monotonic()
+        for key in [key for key, bucket in self.chat_buckets.items() if bucket.is_idle(now)]:
+            del self.chat_buckets[key]
+
+    def _requeue_later(self, key, delay):
+        asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, key)
+
+    def _finish(self, key):
+        """
+        Первое сообщение чата обработано: следующее (если есть) снова ставим в очередь.
+        """
+        jobs = self._chat_jobs[key]
+        jobs.popleft()
+        self.pending_count -= 1
+        if jobs:
+            self.queue.put_nowait(key)
+        else:
+            del self._chat_jobs[key]
+
+    async def _worker(self):
+        while True:
+            key = await self.queue.get()
+            job = self._chat_jobs[key][0]
+            try:
+                if await self._process(key, job):
+                    self._finish(key)
+            except Exception as e:
+                logger.error(f"Ошибка в очереди отправки: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+                self._finish(key)
+            finally:
+                self.queue.task_done()
+
+    async def _process(self, key, job) -> bool:
+        """
+        Отправляет первое сообщение чата. False — сообщение отложено (лимит чата или повтор)
+        и остаётся первым: чат вернётся в очередь через call_later.
+        """
+        if job.future.done():
+            # Вызвавший код уже не ждёт результат (например, отменён)
+            return True
+
+        chat_bucket = self._chat_bucket(job.chat_id)
+        delay = chat_bucket.delay()
+        if delay > 0:
+            # Чат пока «занят» — вернём его в очередь позже, не блокируя воркер
+            self._requeue_later(key, delay)
+            return False
+
+        delay = self.global_bucket.delay()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.global_bucket.delay()
+
+        # Пока ждали общий лимит, чат могли поставить на паузу (retry_after).
+        # Токен чата проверяется и списывается вместе с общим, без await между ними
+        delay = chat_bucket.try_consume()
+        if delay > 0:
+            self._requeue_later(key, delay)
+            return False
+        self.global_bucket.consume()
+
+        try:
+            result = await job.call()
+        except TelegramRetryAfter as e:
+            job.attempt += 1
+            self.retry_count += 1
+            logger.warning(f"Flood control для чата {job.chat_id}: ждём {e.retry_after} сек.")
+            chat_bucket.pause(e.retry_after)
+            if job.attempt > SEND_MAX_RETRIES:
+                self._fail(job, e)
+                return True
+            self._requeue_later(key, e.retry_after)
+            return False
+        except (TelegramNetworkError, TelegramServerError) as e:
+            job.attempt += 1
+            self.retry_count += 1
+            if job.attempt > SEND_MAX_RETRIES:
+                self._fail(job, e)
+                return True
+            backoff = SEND_BACKOFF_BASE * 2 ** (job.attempt - 1)
+            logger.warning(f"Ошибка сети при отправке в чат {job.chat_id}: {e}. Повтор через {backoff} сек.")
+            self._requeue_later(key, backoff)
+            return False
+        except Exception as e:
+            self._fail(job, e)
+            return True
+
+        wait = time.monotonic() - job.enqueued_at
+        self.sent_count += 1
+        self.last_wait = wait
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if not job.future.done():
+            job.future.set_result(result)
+        return True
+
+    def _fail(self, job, error):
+        self.failed_count += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+
+# Общий экземпляр для всего бота
+sender = OutboundSender()
+
+# Состояние очереди в /metrics (значения берутся из sender.metrics() в момент запроса)
+for _name, _documentation in (
+        ("queue_depth", "Сообщений в очереди отправки"),
+        ("sent", "Отправлено сообщений"),
+        ("failed", "Сообщений, которые не удалось отправить"),
+        ("retries", "Повторных попыток отправки"),
+        ("max_wait", "Наибольшее ожидание сообщения в очереди, сек"),
+        ("avg_wait", "Среднее ожидание сообщения в очереди, сек"),
+):
+    Gauge(f"harvest_sender_{_name}", _documentation, lambda key=_name: sender.metrics()[key])
@@ -0,0 +1,72 @@
+# simhash.py
+
+import hashlib
+import re
+
+# Слова текста (после приведения к одному регистру)
+WORD_RE = re.compile(r"\w+")
+
+FINGERPRINT_BITS = 64
+# Сколько подряд идущих слов образуют один признак (шингл)
+SHINGLE_SIZE = 3
+
+_SIGN_BIT = 1 << (FINGERPRINT_BITS - 1)
+_MASK = (1 << FINGERPRINT_BITS) - 1
+
+
+def _shingle_hash(shingle: str) -> int:
+    # Стабильный между процессами хэш (встроенный hash() для строк рандомизирован)
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def normalize_text(text: str) -> list:
+    """
+    Слова текста без регистра и различия «ё/е»: перепечатки одной новости
+    часто отличаются только оформлением.
+    """
+    return WORD_RE.findall(text.casefold().replace("ё", "е"))
+
+
+def simhash(text: str):
+    """
+    64-битный SimHash по шинглам из SHINGLE_SIZE слов. У почти одинаковых текстов
+    отпечатки отличаются в нескольких битах (см. hamming_distance).
+    None — в тексте нет ни одного слова, сравнивать нечего.
+    """
+    words = normalize_text(text)
+    if not words:
+        return None
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = _shingle_hash(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def to_signed(fingerprint: int) -> int:
+    """
+    В BSON нет беззнакового 64-битного целого: храним отпечаток как int64.
+    """
+    return fingerprint - (1 << FINGERPRINT_BITS) if fingerprint & _SIGN_BIT else fingerprint
+
+
+def to_unsigned(value: int) -> int:
+    return value & _MASK
@@ -0,0 +1,102 @@
+# stats.py
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from config import STATS_FLUSH_INTERVAL, logger
+from database import stats_collection
+
+# События публикатора и поле-счётчик для каждого из них в документе statistics
+COUNTERS = {
+    "sent": "sent_count",
+    "failed": "failed_count",
+    "skipped": "skipped_count",
+}
+
+
+def minute_bucket(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+
+class StatsRecorder:
+    """
+    Счётчики публикаций в памяти процесса, по каналу и минуте.
+
+    Публикатор только увеличивает счётчик (без обращения к БД), а раз в flush_interval
+    секунд все накопленные значения одним bulk_write уходят в statistics как $inc-upsert
+    в документ {channel, timestamp: начало минуты}. Так на канал приходится не больше
+    одного документа в минуту, сколько бы новостей ни вышло.
+    """
+
+    def __init__(self, flush_interval: float = STATS_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+    def record(self, channel: str, event: str, count: int = 1):
+        self._counters[(str(channel), minute_bucket(datetime.utcnow()))][COUNTERS[event]] += count
+
+    async def flush(self):
+        if not self._counters:
+            return
+
+        counters, self._counters = self._counters, defaultdict(lambda: defaultdict(int))
+        requests = [
+            UpdateOne(
+                {"channel": channel, "timestamp": timestamp},
+                {"$inc": dict(values)},
+                upsert=True
+            )
+            for (channel, timestamp), values in counters.items()
+        ]
+        try:
+            await stats_collection.bulk_write(requests, ordered=False)
+        except Exception:
+            # Не теряем счётчики: вернём их обратно, запишем при следующем сбросе
+            for key, values in counters.items():
+                for field, count in values.items():
+                    self._counters[key][field] += count
+            raise
+
+    async def run(self):
+        """
+        Фоновая задача из bot.py.
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Не удалось записать статистику: {e}")
+
+    async def close(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Не удалось записать статистику при остановке: {e}")
+
+
+async def aggregate_stats(since: datetime) -> list:
+    """
+    Сумма счётчиков по каналам с момента since (на стороне Mongo, $group).
+    Возвращает [{"channel", "sent_count", "failed_count", "skipped_count"}], больше отправленных — выше.
+    """
+    pipeline = [
+        {"$match": {"timestamp": {"$gte": minute_bucket(since)}}},
+        {"$group": {
+            "_id": "$channel",
+            **{field: {"$sum": f"${field}"} for field in COUNTERS.values()}
+        }},
+        {"$sort": {"sent_count": -1}},
+    ]
+    rows = []
+    async for row in stats_collection.aggregate(pipeline):
+        row["channel"] = row.pop("_id")
+        rows.append(row)
+    return rows
+
+
+# Общий экземпляр для публикатора и команды /stats
+stats_recorder = StatsRecorder()
@@ -0,0 +1,88 @@
+# supervisor.py
+
+import asyncio
+
+from config import SUPERVISOR_INTERVAL, logger
+from channel_profiles import channel_profiles
+from scheduled_job import scheduled, close_finished_news
+
+
+class SchedulerSupervisor:
+    """
+    Держит по одному планировщику (scheduled_job.scheduled) на каждый активный канал.
+
+    Раз в interval секунд (или сразу после request_sync из команд бота) сверяет запущенные
+    задачи с профилями в коллекции channels: запускает планировщики для новых каналов,
+    останавливает для отключённых и перезапускает упавшие. Каналы не ждут друг друга,
+    поэтому большая очередь или флуд-контроль в одном канале не задерживает остальные.
+    """
+
+    def __init__(self, interval: float = SUPERVISOR_INTERVAL):
+        self.interval = interval
+        self._tasks = {}
+        self._wakeup = None
+        self._active = None
+
+    def channels(self) -> list:
+        return sorted(self._tasks)
+
+    async def sync(self, bot):
+        channel_profiles.invalidate()
+        active = set(await channel_profiles.active_ids())
+
+        for chat_id, task in list(self._tasks.items()):
+            if chat_id not in active:
+                task.cancel()
+                del self._tasks[chat_id]
+                logger.info(f"Планировщик канала {chat_id} остановлен.")
+            elif task.done():
+                error = None if task.cancelled() else task.exception()
+                logger.error(f"Планировщик канала {chat_id} завершился ({error}), перезапускаем.")
+                del self._tasks[chat_id]
+
+        for chat_id in active - set(self._tasks):
+            self._tasks[chat_id] = asyncio.create_task(scheduled(bot, chat_id))
+            logger.info(f"Планировщик канала {chat_id} запущен.")
+
+        # Новости, которые ждали только отключённые каналы, больше никто не закроет.
+        # Проверяем при старте (канал могли отключить, пока бот был выключен) и после отключения.
+        if self._active is None or self._active - active:
+            closed = await close_finished_news(sorted(active))
+            if closed:
+                logger.info(f"Закрыто новостей, опубликованных во все активные каналы: {closed}")
+        self._active = active
+
+    def request_sync(self):
+        """
+        Вызывается после изменения профилей командами бота, чтобы не ждать interval секунд.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self, bot):
+        """
+        Фоновая задача из bot.py.
+        """
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await self.sync(bot)
+            except Exception as e:
+                logger.error(f"Ошибка супервизора планировщиков: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+# Общий экземпляр для bot.py и команд управления каналами
+supervisor = SchedulerSupervisor()
@@ -0,0 +1,7 @@
+# conftest.py
+
+import os
+import sys
+
+# Модули бота импортируются плоско (from config import ...), как при запуске bot.py из bot/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
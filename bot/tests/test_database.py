@@ -0,0 +1,130 @@
+# test_database.py
+#
+# insert_unique: что считается добавленным, если значение появилось в коллекции
+# после запроса $in (другая реплика или админ добавили его параллельно).
+
+import asyncio
+import os
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from database import insert_unique
+
+MONGODB_TEST_URI = os.environ.get("MONGODB_TEST_URI")
+
+
+class Cursor:
+    def __init__(self, docs):
+        self._docs = list(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+
+class BulkResult:
+    def __init__(self, upserted_ids):
+        self.upserted_ids = upserted_ids
+
+
+class RacingCollection:
+    """
+    До запроса $in в коллекции есть before, а к моменту bulk_write — ещё и raced.
+    Как в Mongo, upsert уже существующего значения просто находит документ.
+    """
+
+    def __init__(self, before=(), raced=(), duplicate_errors=()):
+        self.values = set(before)
+        self.raced = set(raced)
+        self.duplicate_errors = set(duplicate_errors)
+
+    def find(self, query, projection=None):
+        return Cursor({"keyword": value} for value in query["keyword"]["$in"] if value in self.values)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.values |= self.raced
+        upserted, errors = {}, []
+        for index, request in enumerate(requests):
+            value = request._filter["keyword"]
+            if value in self.duplicate_errors:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+            elif value not in self.values:
+                self.values.add(value)
+                upserted[index] = f"id-{index}"
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors,
+                "upserted": [{"index": index, "_id": _id} for index, _id in upserted.items()],
+                "nUpserted": len(upserted)
+            })
+        return BulkResult(upserted)
+
+
+def _docs(*values):
+    return [{"keyword": value} for value in values]
+
+
+def test_existing_values_are_reported():
+    collection = RacingCollection(before={"липецк"})
+    existing = asyncio.run(insert_unique(collection, "keyword", _docs("липецк", "елец")))
+    assert existing == {"липецк"}
+    assert collection.values == {"липецк", "елец"}
+
+
+def test_value_added_after_precheck_is_not_reported_as_added():
+    collection = RacingCollection(raced={"елец"})
+    existing = asyncio.run(insert_unique(collection, "keyword", _docs("липецк", "елец", "данков")))
+    assert existing == {"елец"}
+
+
+def test_duplicate_key_errors_are_reported_as_existing():
+    collection = RacingCollection(raced={"елец"}, duplicate_errors={"данков"})
+    existing = asyncio.run(insert_unique(collection, "keyword", _docs("липецк", "елец", "данков")))
+    assert existing == {"елец", "данков"}
+
+
+def test_other_write_errors_are_raised():
+    class FailingCollection(RacingCollection):
+        async def bulk_write(self, requests, ordered=True):
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 121, "errmsg": "validation"}]})
+
+    with pytest.raises(BulkWriteError):
+        asyncio.run(insert_unique(FailingCollection(), "keyword", _docs("липецк")))
+
+
+@pytest.mark.skipif(not MONGODB_TEST_URI, reason="MONGODB_TEST_URI не задан")
+def test_live_value_added_after_precheck():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import ASCENDING
+
+    class HiddenPrecheck:
+        # Запрос $in «не видит» уже добавленное значение — как если бы его вставили сразу после
+        def __init__(self, collection):
+            self.collection = collection
+
+        def find(self, query, projection=None):
+            return Cursor([])
+
+        async def bulk_write(self, requests, ordered=True):
+            return await self.collection.bulk_write(requests, ordered=ordered)
+
+    async def run():
+        client = AsyncIOMotorClient(MONGODB_TEST_URI, serverSelectionTimeoutMS=5000)
+        db_name = f"test_database_{os.getpid()}"
+        collection = client[db_name]["keywords"]
+        try:
+            await collection.create_index([("keyword", ASCENDING)], unique=True)
+            await collection.insert_one({"keyword": "елец"})
+            existing = await insert_unique(HiddenPrecheck(collection), "keyword", _docs("липецк", "елец"))
+            count = await collection.count_documents({})
+            return existing, count
+        finally:
+            await client.drop_database(db_name)
+            client.close()
+
+    assert asyncio.run(run()) == ({"елец"}, 2)
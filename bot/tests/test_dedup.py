@@ -0,0 +1,135 @@
+# test_dedup.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import dedup
+from dedup import Deduplicator, SimHashIndex
+
+FINGERPRINT = 0x0123456789ABCDEF
+
+
+class Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, field, direction):
+        self._docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._docs:
+            raise StopAsyncIteration
+        return self._docs.pop(0)
+
+
+class FakeFingerprints:
+    """
+    Коллекция fingerprints в памяти, общая для нескольких «реплик».
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self.finds = 0
+
+    def find(self, query):
+        self.finds += 1
+        since = query["at"]["$gte"]
+        return Cursor([dict(doc, _id=_id) for _id, doc in self.docs.items() if doc["at"] >= since])
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs[query["_id"]] = dict(update["$set"])
+
+
+class FakeArticles:
+    async def update_one(self, query, update):
+        pass
+
+
+@pytest.fixture
+def fingerprints(monkeypatch):
+    fake = FakeFingerprints()
+    monkeypatch.setattr(dedup, "fingerprints_collection", fake)
+    monkeypatch.setattr(dedup, "collection", FakeArticles())
+
+    async def fingerprint_many(news_list):
+        return [(True, news["fp"]) for news in news_list]
+
+    monkeypatch.setattr(dedup.cleaning_service, "fingerprint_many", fingerprint_many)
+    return fake
+
+
+def test_index_finds_near_duplicates():
+    index = SimHashIndex(max_distance=3)
+    now = datetime.utcnow()
+    index.add("a", FINGERPRINT, now)
+    assert index.find(FINGERPRINT ^ 0b111) == ("a", 3)
+    assert index.find(FINGERPRINT ^ 0b1111) is None
+    assert index.find(FINGERPRINT, exclude="a") is None
+
+    index.expire(now + timedelta(seconds=1))
+    assert len(index) == 0 and index.find(FINGERPRINT) is None
+
+
+def test_replica_sees_fingerprints_saved_after_startup(fingerprints):
+    async def run():
+        replica_a = Deduplicator(sync_interval=3600)
+        replica_b = Deduplicator(sync_interval=3600)
+        # Обе реплики уже загрузили окно при старте
+        await replica_a.ensure_loaded()
+        await replica_b.ensure_loaded()
+
+        first = await replica_a.process([{"_id": 1, "fp": FINGERPRINT}])
+        # Копия той же новости приходит во вторую реплику
+        second = await replica_b.process([{"_id": 2, "fp": FINGERPRINT ^ 0b11}])
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [None]
+    assert second[0]["duplicate_of"] == 1 and second[0]["distance"] == 2
+
+
+def test_periodic_sync_is_throttled(fingerprints):
+    async def run():
+        replica = Deduplicator(sync_interval=3600)
+        await replica.ensure_loaded()
+        await replica.ensure_loaded()
+        finds = fingerprints.finds
+        await replica.sync()
+        return finds
+
+    assert asyncio.run(run()) == 1
+    assert fingerprints.finds == 2
+
+
+def test_sync_reads_only_new_fingerprints(fingerprints):
+    now = datetime.utcnow()
+    fingerprints.docs[1] = {"fp": 1, "at": now - timedelta(hours=1)}
+    fingerprints.docs[2] = {"fp": 2, "at": now - timedelta(hours=100)}
+
+    async def run():
+        replica = Deduplicator(window_hours=72)
+        await replica.sync()
+        loaded = set(replica.index._fingerprints)
+        fingerprints.docs[3] = {"fp": 3, "at": now}
+        queries = []
+        original_find = fingerprints.find
+
+        def find(query):
+            queries.append(query["at"]["$gte"])
+            return original_find(query)
+
+        fingerprints.find = find
+        await replica.sync()
+        return loaded, set(replica.index._fingerprints), queries[0]
+
+    loaded, after, since = asyncio.run(run())
+    assert loaded == {1}
+    assert after == {1, 3}
+    # Повторно читается только хвост с запасом SYNC_OVERLAP, а не всё окно
+    assert since == now - timedelta(hours=1) - dedup.SYNC_OVERLAP
@@ -0,0 +1,141 @@
+# test_fsm_storage.py
+
+import asyncio
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from pymongo import DeleteOne
+
+import fsm_storage
+from fsm_storage import MongoStorage, storage_key_id
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+class FakeFSMCollection:
+    """
+    fsm_states в памяти: find_one по _id и bulk_write из UpdateOne($set, upsert)/DeleteOne.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+        self.bulk_writes = 0
+        self.fail_next = False
+
+    async def find_one(self, query, projection=None):
+        self.reads += 1
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("Mongo недоступен")
+        self.bulk_writes += 1
+        for request in requests:
+            key_id = request._filter["_id"]
+            if isinstance(request, DeleteOne):
+                self.docs.pop(key_id, None)
+            else:
+                self.docs[key_id] = dict(request._doc["$set"])
+
+
+@pytest.fixture
+def fsm_states(monkeypatch):
+    fake = FakeFSMCollection()
+    monkeypatch.setattr(fsm_storage, "fsm_collection", fake)
+    return fake
+
+
+def test_state_survives_restart(fsm_states):
+    async def run():
+        storage = MongoStorage(flush_interval=0.05)
+        state = FSMContext(storage=storage, key=KEY)
+        await state.set_state("AddSourceStates:waiting_for_source")
+        await state.update_data(sources=["https://example.com/rss"])
+        # close() сбрасывает несохранённое, как при остановке диспетчера
+        await storage.close()
+
+        restarted = FSMContext(storage=MongoStorage(), key=KEY)
+        return await restarted.get_state(), await restarted.get_data()
+
+    assert asyncio.run(run()) == ("AddSourceStates:waiting_for_source", {"sources": ["https://example.com/rss"]})
+
+
+def test_writes_are_batched(fsm_states):
+    async def run():
+        storage = MongoStorage(flush_interval=0.05)
+        for user_id in range(20):
+            state = FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=user_id, user_id=user_id))
+            await state.set_state("AddKeywordsStates:waiting_for_keywords")
+            await state.update_data(step=1)
+            await state.update_data(step=2)
+        assert fsm_states.bulk_writes == 0
+        await asyncio.sleep(0.15)
+        writes = fsm_states.bulk_writes
+        await storage.close()
+        return writes
+
+    # 60 шагов диалогов — одна запись
+    assert asyncio.run(run()) == 1
+    assert len(fsm_states.docs) == 20
+    assert fsm_states.docs["1:5:5"]["data"] == {"step": 2}
+
+
+def test_cache_ttl_picks_up_other_replica(fsm_states):
+    async def run():
+        replica_a = FSMContext(storage=MongoStorage(flush_interval=0), key=KEY)
+        replica_b = FSMContext(storage=MongoStorage(cache_ttl=0.05, flush_interval=0), key=KEY)
+
+        assert await replica_b.get_state() is None
+        await replica_a.set_state("AddBanStates:waiting_for_bans")
+        # Пока запись в кэше свежая, реплика B отвечает из него
+        stale = await replica_b.get_state()
+        await asyncio.sleep(0.06)
+        return stale, await replica_b.get_state()
+
+    assert asyncio.run(run()) == (None, "AddBanStates:waiting_for_bans")
+
+
+def test_shared_mode_sees_other_replica_immediately(fsm_states):
+    async def run():
+        # Так bot.py создаёт хранилище в режиме webhook
+        replica_a = FSMContext(storage=MongoStorage(cache_ttl=0, flush_interval=0), key=KEY)
+        replica_b = FSMContext(storage=MongoStorage(cache_ttl=0, flush_interval=0), key=KEY)
+
+        assert await replica_b.get_state() is None
+        await replica_a.set_state("AddSourceStates:waiting_for_source")
+        assert await replica_b.get_state() == "AddSourceStates:waiting_for_source"
+        await replica_b.clear()
+        return await replica_a.get_state()
+
+    assert asyncio.run(run()) is None
+    assert storage_key_id(KEY) not in fsm_states.docs
+
+
+def test_failed_flush_is_retried(fsm_states):
+    async def run():
+        storage = MongoStorage(flush_interval=60)
+        state = FSMContext(storage=storage, key=KEY)
+        await state.set_state("AddSourceStates:waiting_for_source")
+        fsm_states.fail_next = True
+        with pytest.raises(RuntimeError):
+            await storage.flush()
+        # Несохранённое не потерялось и видно самой реплике
+        assert await state.get_state() == "AddSourceStates:waiting_for_source"
+        await storage.close()
+
+    asyncio.run(run())
+    assert fsm_states.docs[storage_key_id(KEY)]["state"] == "AddSourceStates:waiting_for_source"
+
+
+def test_cached_reads_do_not_hit_mongo(fsm_states):
+    async def run():
+        state = FSMContext(storage=MongoStorage(), key=KEY)
+        for _ in range(10):
+            await state.get_state()
+
+    asyncio.run(run())
+    assert fsm_states.reads == 1
@@ -0,0 +1,81 @@
+# test_keyword_matcher.py
+
+import random
+import re
+
+from keyword_matcher import AhoCorasick, KeywordMatcher, fold, is_word_char
+
+
+def test_fold_keeps_length():
+    for text in ("Ёлка", "Straße", "İstanbul", "ΣΊΣΥΦΟΣ", "ﬁнал"):
+        assert len(fold(text)) == len(text)
+    assert fold("ЁЛКА Ёж") == "елка еж"
+
+
+def test_word_boundaries_after_length_changing_characters():
+    matcher = KeywordMatcher()
+    matcher.add_keywords(["липецк*", "елец"])
+    matcher.add_bans(["реклама"])
+    # До вхождения — символы, которые casefold/lower превращают в два
+    assert matcher.match("Straße İİ Липецкая область, ЕЛЕЦ") == (["липецк*", "елец"], [])
+    assert matcher.match("ßелец и пролипецк") == ([], [])
+    assert matcher.match("İРЕКЛАМА реклама.") == ([], ["реклама"])
+
+
+def _naive(matcher, text):
+    # Каждое слово отдельной регуляркой — эталон для автомата
+    folded = fold(text)
+    found = set()
+    for (kind, word) in matcher._active:
+        prefix = word.endswith("*")
+        pattern = re.escape(fold(word.rstrip("*").strip()))
+        for match in re.finditer(f"(?={pattern})", folded):
+            start, end = match.start(), match.start() + len(fold(word.rstrip("*").strip())) - 1
+            if start > 0 and is_word_char(folded[start]) and is_word_char(folded[start - 1]):
+                continue
+            if not prefix and end < len(folded) - 1 and is_word_char(folded[end]) and is_word_char(folded[end + 1]):
+                continue
+            found.add((kind, word))
+            break
+    return found
+
+
+def test_incremental_adds_match_naive_search():
+    rnd = random.Random(16)
+    alphabet = "абвгде"
+
+    def word():
+        return "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 5)))
+
+    matcher = KeywordMatcher()
+    matcher.add_keywords([word() for _ in range(50)])
+    for step in range(200):
+        # По одному слову, как /add_keywords: автомат дописывается, а не строится заново
+        if step % 3 == 0:
+            matcher.add_bans([word()])
+        else:
+            matcher.add_keywords([word() + rnd.choice(["", "*"])])
+        if step % 25 == 0:
+            matcher.remove_keyword(next(iter(matcher._active))[1])
+        text = " ".join(word() for _ in range(30)).upper()
+        keywords, bans = matcher.match(text)
+        found = {("keyword", w) for w in keywords} | {("ban", w) for w in bans}
+        assert found == _naive(matcher, text), text
+
+
+def test_incremental_links_equal_full_build():
+    rnd = random.Random(5)
+    for _ in range(300):
+        alphabet = rnd.choice(["ab", "abc", "абвг"])
+        automaton = AhoCorasick()
+        pattern_id = 0
+        for batch in range(rnd.randint(2, 10)):
+            for _ in range(rnd.randint(5, 15) if batch == 0 else rnd.randint(1, 2)):
+                automaton.add(pattern_id, "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 7))))
+                pattern_id += 1
+            list(automaton.iter_matches(alphabet))
+
+        fail, out_link = list(automaton._fail), list(automaton._out_link)
+        automaton._build()
+        assert automaton._fail == fail
+        assert automaton._out_link == out_link
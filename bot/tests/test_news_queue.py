@@ -0,0 +1,261 @@
+# test_news_queue.py
+#
+# Аренда новостей (claim_news). Юнит-тесты идут против FakeCollection в памяти: она проверяет
+# логику вокруг update_one, но не семантику фильтров Mongo. Ту проверяют тесты live_*
+# против настоящего mongod (MONGODB_TEST_URI, например mongodb://localhost:27017);
+# без переменной окружения они пропускаются.
+
+import asyncio
+import copy
+import multiprocessing
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import news_queue
+
+MONGODB_TEST_URI = os.environ.get("MONGODB_TEST_URI")
+
+MISSING = object()
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return MISSING
+        doc = doc[part]
+    return doc
+
+
+def _matches(doc, query) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$lt" and (value is MISSING or value is None or not value < operand):
+                    return False
+        elif condition is None:
+            if value is not MISSING and value is not None:
+                return False
+        elif value is MISSING or value != condition:
+            return False
+    return True
+
+
+def _set(doc, path, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc, path):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part, {})
+    doc.pop(last, None)
+
+
+class UpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """
+    Коллекция articles в памяти. Как и в Mongo, update_one проверяет фильтр и меняет документ
+    атомарно, а между запросами разных корутин управление переключается.
+    """
+
+    def __init__(self, *docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(0)
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                for path, value in update.get("$set", {}).items():
+                    _set(doc, path, copy.deepcopy(value))
+                for path in update.get("$unset", {}):
+                    _unset(doc, path)
+                return UpdateResult(1)
+        return UpdateResult(0)
+
+
+@pytest.fixture
+def articles(monkeypatch):
+    fake = FakeCollection({"_id": 1, "title": "Новость", "published": False, "deliveries": {}})
+    monkeypatch.setattr(news_queue, "collection", fake)
+    return fake
+
+
+def _publisher_copy(fake, _id=1):
+    # Каждый публикатор работает со своей копией документа из своего буфера
+    return copy.deepcopy(fake.docs[_id])
+
+
+def test_concurrent_claimers_get_one_winner(articles):
+    async def run():
+        copies = [_publisher_copy(articles) for _ in range(5)]
+        return await asyncio.gather(*(news_queue.claim_news(news, "-100") for news in copies))
+
+    results = asyncio.run(run())
+    assert results.count(True) == 1
+    assert articles.docs[1]["leases"]["-100"]["by"] == news_queue.INSTANCE_ID
+
+
+def test_expired_lease_is_reclaimed(articles):
+    async def run():
+        first = _publisher_copy(articles)
+        assert await news_queue.claim_news(first, "-100")
+        # Пока аренда действует, вторая копия новость не получит
+        assert not await news_queue.claim_news(_publisher_copy(articles), "-100")
+
+        # Публикатор упал посреди отправки, аренда истекла
+        articles.docs[1]["leases"]["-100"] = {"by": "other:1", "until": datetime.utcnow() - timedelta(seconds=1)}
+        second = _publisher_copy(articles)
+        return await news_queue.claim_news(second, "-100"), second
+
+    claimed, news = asyncio.run(run())
+    assert claimed
+    assert news["leases"]["-100"]["until"] > datetime.utcnow()
+    assert articles.docs[1]["leases"]["-100"]["by"] == news_queue.INSTANCE_ID
+
+
+def test_channels_have_independent_leases(articles):
+    async def run():
+        return await asyncio.gather(
+            news_queue.claim_news(_publisher_copy(articles), "-100"),
+            news_queue.claim_news(_publisher_copy(articles), "-200")
+        )
+
+    assert asyncio.run(run()) == [True, True]
+
+
+def test_stale_copy_and_released_lease(articles):
+    async def run():
+        stale = _publisher_copy(articles)
+        # Другой публикатор успел сделать попытку — копия из буфера устарела
+        articles.docs[1]["deliveries"]["-100"] = {"attempts": 1, "done": False}
+        assert not await news_queue.claim_news(stale, "-100")
+
+        fresh = _publisher_copy(articles)
+        assert await news_queue.claim_news(fresh, "-100")
+        await news_queue.release_news(fresh, "-100")
+        return await news_queue.claim_news(_publisher_copy(articles), "-100")
+
+    assert asyncio.run(run())
+
+
+# --- Против настоящего mongod ---
+
+live = pytest.mark.skipif(not MONGODB_TEST_URI, reason="MONGODB_TEST_URI не задан")
+
+LIVE_DB = f"test_news_queue_{os.getpid()}"
+LIVE_NEWS = {"_id": 1, "title": "Новость", "published": False, "deliveries": {}}
+
+
+def _live_collection():
+    # Клиент создаётся внутри запущенного loop: motor привязывается к нему
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(MONGODB_TEST_URI, serverSelectionTimeoutMS=5000)
+    return client, client[LIVE_DB]["articles"]
+
+
+def _claim_in_process(barrier, results):
+    """
+    Отдельный процесс публикатора (свой INSTANCE_ID): читает новость и по сигналу арендует её.
+    """
+    async def run():
+        client, collection = _live_collection()
+        news_queue.collection = collection
+        try:
+            news = await collection.find_one({"_id": 1})
+            barrier.wait()
+            return await news_queue.claim_news(news, "-100")
+        finally:
+            client.close()
+
+    try:
+        results.put(asyncio.run(run()))
+    except Exception as e:
+        # Иначе тест ждал бы результата до таймаута
+        results.put(repr(e))
+        barrier.abort()
+
+
+@pytest.fixture
+def live_articles():
+    async def reset(drop=False):
+        client, collection = _live_collection()
+        try:
+            if drop:
+                await client.drop_database(LIVE_DB)
+            else:
+                await collection.delete_many({})
+                await collection.insert_one(copy.deepcopy(LIVE_NEWS))
+        finally:
+            client.close()
+
+    asyncio.run(reset())
+    yield
+    asyncio.run(reset(drop=True))
+
+
+@live
+def test_live_concurrent_publishers_get_one_winner(live_articles):
+    publishers = 5
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(publishers)
+    results = context.Queue()
+    processes = [context.Process(target=_claim_in_process, args=(barrier, results)) for _ in range(publishers)]
+    for process in processes:
+        process.start()
+    claimed = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+
+    assert all(isinstance(result, bool) for result in claimed), claimed
+    assert claimed.count(True) == 1
+
+
+@live
+def test_live_expired_lease_is_reclaimed(live_articles, monkeypatch):
+    async def run():
+        client, collection = _live_collection()
+        monkeypatch.setattr(news_queue, "collection", collection)
+        try:
+            first = await collection.find_one({"_id": 1})
+            assert await news_queue.claim_news(first, "-100")
+            # Действующая аренда: копия, прочитанная до неё, новость не получит
+            assert not await news_queue.claim_news(copy.deepcopy(LIVE_NEWS), "-100")
+            # Другой канал арендуется независимо
+            assert await news_queue.claim_news(copy.deepcopy(LIVE_NEWS), "-200")
+
+            # Публикатор упал посреди отправки, аренда истекла
+            expired = {"by": "other:1", "until": datetime.utcnow() - timedelta(seconds=1)}
+            await collection.update_one({"_id": 1}, {"$set": {"leases.-100": expired}})
+            stale = await collection.find_one({"_id": 1})
+            assert await news_queue.claim_news(stale, "-100")
+
+            # Попытка записана — копия со старым счётчиком попыток устарела
+            await news_queue.release_news(stale, "-100")
+            await collection.update_one({"_id": 1}, {"$set": {"deliveries.-100": {"attempts": 1, "done": False}}})
+            assert not await news_queue.claim_news(stale, "-100")
+
+            doc = await collection.find_one({"_id": 1})
+            assert await news_queue.claim_news(doc, "-100")
+            return await collection.find_one({"_id": 1})
+        finally:
+            client.close()
+
+    doc = asyncio.run(run())
+    assert doc["leases"]["-100"]["by"] == news_queue.INSTANCE_ID
+    assert doc["leases"]["-100"]["until"] > datetime.utcnow()
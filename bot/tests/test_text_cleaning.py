@@ -0,0 +1,83 @@
+# test_text_cleaning.py
+
+import random
+
+import pytest
+
+from misc import (
+    TextCleaningPipeline,
+    clean_text_pipeline,
+    compress_newlines,
+    join_single_word_lines,
+    remove_custom_fragments,
+    remove_duplicate_dots,
+    remove_publication_date_lines
+)
+
+
+def old_chain(text: str) -> str:
+    """
+    Цепочка, которую заменил TextCleaningPipeline (порядок как был в publish_single_news).
+    """
+    text = remove_publication_date_lines(text)
+    text = remove_custom_fragments(text)
+    text = compress_newlines(text)
+    text = remove_duplicate_dots(text)
+    return join_single_word_lines(text)
+
+
+ARTICLE = """12 января 2024 года
+
+В Липецке открыли новый мост через реку Воронеж. .
+Движение по нему запустят
+уже
+в понедельник..
+
+Фото: пресс-служба администрации
+
+Подробности
+в нашем
+Telegram
+
+Смотрите нас на
+Дзен
+и
+ВКонтакте!
+Поделиться
+"""
+
+GOLDEN = [
+    ARTICLE,
+    ARTICLE.replace("\n", "\r\n"),
+    "",
+    "\n\n\n",
+    "Найти:\nТекст новости. . .\n01.02.2023\nКонец",
+    "Экспорт/Импорт\n\nФото: Иван\nТекст\n\n",
+    "Одно\nслово\nв\nстроке\n",
+    "Заголовок\n26 января\n\nТекст\n- все новости в оперативном режиме!",
+]
+
+
+@pytest.mark.parametrize("text", GOLDEN)
+def test_matches_old_chain_on_golden_texts(text):
+    assert clean_text_pipeline(text) == old_chain(text)
+
+
+def test_matches_old_chain_on_random_texts():
+    atoms = [
+        '', ' ', 'Telegram', 'telegram.', 'и', 'Дзен', '12 января', '01.02.2023', 'Фото: Иван',
+        'Слово', 'Два слова.', '.', ' . ', 'Текст. . конец', 'Поделиться', 'ВКонтакте!',
+        'Экспорт/Импорт', '\r', '\x0c', 'a\tb', '...', 'Найти:', ' Смотрите нас на'
+    ]
+    separators = ['\n', '\n', '\n', '\r\n', '\r', ' ']
+    rnd = random.Random(9)
+    for _ in range(20000):
+        text = ''.join(rnd.choice(atoms) + rnd.choice(separators) for _ in range(rnd.randint(0, 9)))
+        if rnd.random() < 0.5:
+            text = text.rstrip('\n')
+        assert clean_text_pipeline(text) == old_chain(text), repr(text)
+
+
+def test_custom_patterns():
+    pipeline = TextCleaningPipeline(unconditional_patterns=[r'(?i)^\s*реклама\s*$'], conditional_patterns=[])
+    assert pipeline("Текст новости\nРЕКЛАМА\nещё текст") == "Текст новости\nещё текст"
@@ -0,0 +1,72 @@
+# test_truncate.py
+
+import html
+import random
+import re
+
+from config import TELEGRAM_MESSAGE_LIMIT
+from misc import flexible_truncate_text_by_delimiters, render_news, utf16_len, utf16_prefix_end
+
+# Буквы, разделители, пробелы, символы вне BMP (две единицы UTF-16) и спецсимволы HTML
+ALPHABET = list("abc абв ") + ['.', '?', '!', ';', '\n', '😀', '𝔸', '<', '&', '>', '"', ' ', ' ']
+
+LINK_RE = re.compile(r'<a href="[^"<>]*">')
+
+
+def random_text(rnd: random.Random, length: int) -> str:
+    return ''.join(rnd.choice(ALPHABET) for _ in range(length))
+
+
+def test_truncate_properties():
+    rnd = random.Random(25)
+    for _ in range(20000):
+        text = random_text(rnd, rnd.randint(0, 300))
+        max_len = rnd.randint(1, 120)
+        flex_margin = rnd.randint(0, 50)
+        hard_limit = rnd.choice([None, max_len + rnd.randint(0, 20)])
+
+        result = flexible_truncate_text_by_delimiters(text, max_len, flex_margin, hard_limit)
+
+        assert isinstance(result, str)
+        bound = max_len + flex_margin if hard_limit is None else max(max_len, min(max_len + flex_margin, hard_limit))
+        assert utf16_len(result) <= bound, (text, max_len, result)
+        stripped = text.strip()
+        # Результат — начало текста (возможно, с «…»), суррогатные пары не разрезаны
+        assert stripped.startswith(result) or (result.endswith('…') and stripped.startswith(result[:-1])), (text, result)
+        result.encode('utf-16-le')
+        if utf16_len(stripped) <= max_len:
+            assert result == stripped
+
+
+def test_truncate_without_delimiters_never_returns_none():
+    assert flexible_truncate_text_by_delimiters('x' * 10000, 100) == 'x' * 99 + '…'
+    assert flexible_truncate_text_by_delimiters('слово ' * 100, 20) == 'слово слово слово…'
+    assert flexible_truncate_text_by_delimiters('😀' * 100, 5) == '😀😀…'
+
+
+def test_utf16_prefix_end():
+    rnd = random.Random(16)
+    for _ in range(20000):
+        text = random_text(rnd, rnd.randint(0, 100))
+        limit = rnd.randint(0, 120)
+        end = utf16_prefix_end(text, limit)
+        assert utf16_len(text[:end]) <= limit
+        assert end == len(text) or utf16_len(text[:end + 1]) > limit
+
+
+def test_render_news_is_escaped_and_fits_telegram_limit():
+    rnd = random.Random(4096)
+    for _ in range(300):
+        body = random_text(rnd, rnd.randint(0, 9000))
+        news = {
+            "text": "<div>" + html.escape(body) + "</div>",
+            "url": rnd.choice([None, 'http://example.com/?a=1&b="2"'])
+        }
+        out = render_news(news, rnd.choice([100, 1000, 4096, 5000]))
+
+        # Кроме одной ссылки на источник, разметки нет, а все & — сущности
+        visible = LINK_RE.sub('', out, count=1).replace('</a>', '', 1)
+        assert '<' not in visible and '>' not in visible, out[:200]
+        assert not re.search(r'&(?!amp;|lt;|gt;|quot;|#x27;)', visible)
+        # Длина так, как её считает Telegram после разбора сущностей
+        assert utf16_len(html.unescape(visible)) <= TELEGRAM_MESSAGE_LIMIT
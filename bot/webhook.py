@@ -0,0 +1,119 @@
+# webhook.py
+
+import asyncio
+import secrets
+import signal
+
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+from config import (
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_URL,
+    WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONCURRENCY,
+    WEBHOOK_DRAIN_TIMEOUT,
+    logger
+)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик вебхука aiogram с ограничением параллельности.
+
+    Telegram получает ответ сразу (обработка в фоне), но одновременно обрабатывается
+    не больше max_concurrency апдейтов: если все места заняты, ответ задерживается, и
+    Telegram сам притормаживает отправку. Фоновые задачи учитываются, чтобы при остановке
+    дождаться их (drain), а новые апдейты после начала остановки отклоняются с 503 —
+    Telegram пришлёт их повторно уже запущенному боту.
+    """
+
+    def __init__(self, dispatcher, bot, max_concurrency: int = WEBHOOK_MAX_CONCURRENCY, **kwargs):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+        self._closing = False
+
+    async def _handle_request_background(self, bot, request):
+        if self._closing:
+            return web.Response(status=503)
+
+        update = await request.json(loads=bot.session.json_loads)
+        await self._semaphore.acquire()
+        if self._closing:
+            # Остановка началась, пока ждали свободного места
+            self._semaphore.release()
+            return web.Response(status=503)
+        task = asyncio.create_task(self._process(bot, update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _process(self, bot, update):
+        try:
+            await self._background_feed_update(bot=bot, update=update)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке апдейта из вебхука: {e}")
+        finally:
+            self._semaphore.release()
+
+    async def drain(self, timeout: float = WEBHOOK_DRAIN_TIMEOUT):
+        """
+        Перестаёт принимать апдейты и ждёт уже принятые (не дольше timeout секунд).
+        """
+        self._closing = True
+        if not self._tasks:
+            return
+        logger.info(f"Ждём завершения обработки апдейтов: {len(self._tasks)}")
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"Не дождались обработки {len(pending)} апдейтов, отменяем.")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def close(self):
+        # Сессию бота закрывает bot.py вместе с остальными ресурсами
+        pass
+
+
+async def run_webhook(dp, bot):
+    """
+    Принимает апдейты через вебхук вместо long polling, пока процесс не получит SIGINT/SIGTERM.
+    """
+    secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    handler = BoundedRequestHandler(dp, bot, secret_token=secret)
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handler.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await dp.emit_startup(bot=bot)
+    await bot.set_webhook(
+        url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=secret,
+        max_connections=WEBHOOK_MAX_CONCURRENCY,
+        allowed_updates=dp.resolve_used_update_types()
+    )
+    logger.info(f"Вебхук слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Останавливаем вебхук.")
+        # Вебхук в Telegram не удаляем: пока бот перезапускается, апдейты копятся на стороне Telegram
+        await handler.drain()
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
@@ -0,0 +1,26 @@
+import logging
+
+MONGODB_HOST = "194.87.186.63"
+MONGODB_USER = "Admin"
+MONGODB_PASS = "PasswordForMongo63"
+MONGODB_AUTH_DB = "admin"
+
+DATABASE_NAME = "news_db"
+COLLECTION_NAME = "articles"
+
+# Как часто обходить активные источники (секунды)
+PARSE_INTERVAL = 600
+
+# Загрузка источников (fetcher.py)
+FETCH_MAX_CONNECTIONS = 20   # соединений на весь пул aiohttp
+FETCH_PER_HOST_LIMIT = 2     # одновременных запросов к одному сайту
+FETCH_TIMEOUT = 30           # секунд на один источник
+FETCH_MAX_BYTES = 5 * 1024 * 1024
+FETCH_USER_AGENT = "harvest-parser/1.0"
+
+# Сколько статей записывать в БД одним bulk_write
+WRITE_BATCH_SIZE = 500
+
+# Логирование
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
@@ -0,0 +1,86 @@
+# database.py
+
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from config import (
+    MONGODB_HOST,
+    MONGODB_USER,
+    MONGODB_PASS,
+    MONGODB_AUTH_DB,
+    DATABASE_NAME,
+    COLLECTION_NAME,
+    WRITE_BATCH_SIZE,
+    logger
+)
+
+mongo_client = AsyncIOMotorClient(
+    MONGODB_HOST,
+    username=MONGODB_USER,
+    password=MONGODB_PASS,
+    authSource=MONGODB_AUTH_DB,
+    authMechanism='SCRAM-SHA-256'
+)
+
+db = mongo_client[DATABASE_NAME]
+
+# Те же коллекции, что у бота: статьи он публикует, источники ведут админы через /manage_sources
+articles_collection = db[COLLECTION_NAME]
+sources_collection = db["sources"]
+
+
+async def init_database():
+    # По url статья добавляется один раз, сколько бы раз она ни встретилась в ленте
+    try:
+        await articles_collection.create_indexes([
+            IndexModel(
+                [("url", ASCENDING)],
+                name="url_unique",
+                unique=True,
+                partialFilterExpression={"url": {"$type": "string"}}
+            ),
+        ])
+    except OperationFailure as e:
+        # Например, в старых данных уже есть дубли url: upsert всё равно не создаст новых
+        logger.error(f"Не удалось создать уникальный индекс по url: {e}")
+    logger.info("База данных инициализирована.")
+
+
+async def active_sources() -> list:
+    return await sources_collection.find({"active": True}).to_list(length=None)
+
+
+async def save_articles(articles: list) -> int:
+    """
+    Массово добавляет статьи (upsert по url, $setOnInsert — уже известные не трогаем).
+    Возвращает число новых статей.
+    """
+    inserted = 0
+    for i in range(0, len(articles), WRITE_BATCH_SIZE):
+        requests = [
+            UpdateOne({"url": article["url"]}, {"$setOnInsert": article}, upsert=True)
+            for article in articles[i:i + WRITE_BATCH_SIZE]
+        ]
+        try:
+            result = await articles_collection.bulk_write(requests, ordered=False)
+            inserted += result.upserted_count
+        except BulkWriteError as e:
+            # Ту же статью успели добавить параллельно (сработал уникальный индекс)
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+            inserted += e.details.get("nUpserted", 0)
+    return inserted
+
+
+async def save_source_states(states: dict):
+    """
+    Сохраняет у источников ETag/Last-Modified и итог последнего обхода одним bulk_write.
+    states — {_id источника: поля для $set}.
+    """
+    if not states:
+        return
+    await sources_collection.bulk_write(
+        [UpdateOne({"_id": source_id}, {"$set": fields}) for source_id, fields in states.items()],
+        ordered=False
+    )
@@ -0,0 +1,93 @@
+# feeds.py
+
+import re
+import xml.etree.ElementTree as ET
+
+# Пространства имён, которые встречаются в RSS/Atom лентах
+NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "content": "http://purl.org/rss/1.0/modules/content/",
+    "media": "http://search.yahoo.com/mrss/",
+    "yandex": "http://news.yandex.ru",
+}
+
+IMG_SRC_RE = re.compile(r"""<img[^>]+src=["']([^"']+)["']""", re.IGNORECASE)
+
+
+def _text(element, path: str) -> str:
+    found = element.find(path, NS)
+    if found is None or found.text is None:
+        return ""
+    return found.text.strip()
+
+
+def _image(item, html_text: str):
+    """
+    Картинка статьи: enclosure/media-теги ленты, иначе первый <img> из текста.
+    """
+    for enclosure in item.findall("enclosure"):
+        if enclosure.get("type", "").startswith("image/") and enclosure.get("url"):
+            return enclosure.get("url")
+    for path in ("media:content", "media:thumbnail"):
+        media = item.find(path, NS)
+        if media is not None and media.get("url"):
+            return media.get("url")
+    match = IMG_SRC_RE.search(html_text)
+    return match.group(1) if match else None
+
+
+def _rss_items(channel) -> list:
+    items = []
+    for item in channel.findall("item"):
+        # Полный текст (content:encoded, yandex:full-text) предпочтительнее анонса
+        text = (
+            _text(item, "content:encoded")
+            or _text(item, "yandex:full-text")
+            or _text(item, "description")
+        )
+        items.append({
+            "link": _text(item, "link") or _text(item, "guid"),
+            "title": _text(item, "title"),
+            "text": text,
+            "image": _image(item, text),
+        })
+    return items
+
+
+def _atom_items(feed) -> list:
+    items = []
+    for entry in feed.findall("atom:entry", NS):
+        link = ""
+        for link_element in entry.findall("atom:link", NS):
+            if link_element.get("rel", "alternate") == "alternate":
+                link = link_element.get("href", "")
+                break
+        text = _text(entry, "atom:content") or _text(entry, "atom:summary")
+        items.append({
+            "link": link,
+            "title": _text(entry, "atom:title"),
+            "text": text,
+            "image": _image(entry, text),
+        })
+    return items
+
+
+def parse_feed(body: bytes) -> list:
+    """
+    Разбирает RSS 2.0 или Atom. Возвращает [{link, title, text, image}];
+    записи без ссылки пропускаются. ValueError — если это не лента.
+    """
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError as e:
+        raise ValueError(f"не удалось разобрать XML: {e}")
+
+    if root.tag == "rss":
+        channel = root.find("channel")
+        items = _rss_items(channel) if channel is not None else []
+    elif root.tag == f"{{{NS['atom']}}}feed":
+        items = _atom_items(root)
+    else:
+        raise ValueError(f"неизвестный формат ленты: {root.tag}")
+
+    return [item for item in items if item["link"]]
@@ -0,0 +1,107 @@
+# fetcher.py
+
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from config import (
+    FETCH_MAX_CONNECTIONS,
+    FETCH_PER_HOST_LIMIT,
+    FETCH_TIMEOUT,
+    FETCH_MAX_BYTES,
+    FETCH_USER_AGENT
+)
+
+
+class FetchResult:
+    def __init__(self, status: int, body: bytes = None, etag: str = None, last_modified: str = None):
+        self.status = status
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+
+class Fetcher:
+    """
+    Загрузка источников через один общий пул соединений aiohttp.
+
+    Всего не больше max_connections соединений, к одному сайту — не больше per_host
+    одновременных запросов (многие источники живут на одном домене, и сайт не должен
+    получать от нас пачку запросов разом). Запрос условный: если у источника сохранены
+    ETag/Last-Modified, сервер может ответить 304 без тела.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = FETCH_MAX_CONNECTIONS,
+            per_host: int = FETCH_PER_HOST_LIMIT,
+            timeout: float = FETCH_TIMEOUT,
+            max_bytes: int = FETCH_MAX_BYTES
+    ):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._session = None
+        self._host_limits = {}
+
+    async def start(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.per_host,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": FETCH_USER_AGENT}
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ""
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def fetch(self, url: str, etag: str = None, last_modified: str = None) -> FetchResult:
+        """
+        GET с If-None-Match/If-Modified-Since. Ошибки сети и HTTP >= 400 пробрасываются
+        (aiohttp.ClientError, asyncio.TimeoutError), слишком большой ответ — ValueError.
+        """
+        await self.start()
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        # Лимит на хост держим на весь запрос, включая чтение тела
+        async with self._host_limit(url):
+            async with self._session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return FetchResult(304, etag=etag, last_modified=last_modified)
+                response.raise_for_status()
+
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > self.max_bytes:
+                        raise ValueError(f"ответ больше {self.max_bytes} байт")
+
+                return FetchResult(
+                    response.status,
+                    bytes(body),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified")
+                )
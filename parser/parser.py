@@ -0,0 +1,114 @@
+# parser.py
+
+import asyncio
+from datetime import datetime
+
+import aiohttp
+
+from config import PARSE_INTERVAL, logger
+from database import mongo_client, init_database, active_sources, save_articles, save_source_states
+from feeds import parse_feed
+from fetcher import Fetcher
+
+
+def build_article(source: dict, item: dict, now: datetime) -> dict:
+    """
+    Документ статьи в том виде, в каком его ждёт бот (news_db.articles).
+    """
+    return {
+        "title": item["title"] or source.get("name", ""),
+        "text": item["text"],
+        "url": item["link"],
+        "image": item["image"],
+        "found_keywords": [],
+        "published": False,
+        "source": source.get("name"),
+        "source_id": source["_id"],
+        "created_at": now,
+    }
+
+
+async def parse_source(fetcher: Fetcher, source: dict):
+    """
+    Загружает и разбирает один источник. Возвращает (статьи, поля состояния источника);
+    исключения не пробрасывает — ошибка одного источника не мешает остальным.
+    """
+    now = datetime.utcnow()
+    state = {"last_fetched_at": now}
+    try:
+        result = await fetcher.fetch(source["url"], source.get("etag"), source.get("last_modified"))
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        # У asyncio.TimeoutError пустой текст, поэтому подставляем имя исключения
+        error = str(e) or type(e).__name__
+        logger.error(f"Источник {source['url']}: ошибка загрузки: {error}")
+        state.update(last_status="error", last_error=error)
+        return [], state
+
+    if result.not_modified:
+        state.update(last_status="not_modified", last_error=None)
+        return [], state
+
+    try:
+        items = parse_feed(result.body)
+    except ValueError as e:
+        logger.error(f"Источник {source['url']}: {e}")
+        state.update(last_status="error", last_error=str(e))
+        return [], state
+
+    # Валидаторы сохраняем только после успешного разбора, иначе битая лента закэшируется
+    state.update(
+        last_status="ok",
+        last_error=None,
+        etag=result.etag,
+        last_modified=result.last_modified,
+        last_items=len(items)
+    )
+    return [build_article(source, item, now) for item in items], state
+
+
+async def parse_all(fetcher: Fetcher) -> int:
+    """
+    Один обход всех активных источников: загрузка параллельно, запись в БД пачками.
+    Возвращает число новых статей.
+    """
+    sources = await active_sources()
+    results = await asyncio.gather(*(parse_source(fetcher, source) for source in sources))
+
+    articles = {}
+    states = {}
+    for source, (source_articles, state) in zip(sources, results):
+        states[source["_id"]] = state
+        for article in source_articles:
+            # Одна и та же статья может быть в нескольких лентах
+            articles.setdefault(article["url"], article)
+
+    inserted = await save_articles(list(articles.values())) if articles else 0
+    await save_source_states(states)
+    logger.info(f"Обход источников: {len(sources)} источников, новых статей {inserted}.")
+    return inserted
+
+
+async def main():
+    await init_database()
+    fetcher = Fetcher()
+    try:
+        while True:
+            started = asyncio.get_running_loop().time()
+            try:
+                await parse_all(fetcher)
+            except Exception as e:
+                logger.error(f"Ошибка при обходе источников: {e}")
+
+            # Интервал отсчитываем от начала обхода, чтобы долгий обход не сдвигал расписание
+            elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(max(0.0, PARSE_INTERVAL - elapsed))
+    finally:
+        await fetcher.close()
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Парсер остановлен.")
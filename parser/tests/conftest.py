@@ -0,0 +1,7 @@
+# conftest.py
+
+import os
+import sys
+
+# Модули парсера импортируются плоско (from config import ...), как при запуске parser.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
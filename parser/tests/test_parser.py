@@ -0,0 +1,151 @@
+# test_parser.py
+#
+# Обход источников против локального HTTP-сервера с лентами (aiohttp), без Mongo:
+# функции database подменены на запись в память.
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+import parser as parser_service
+from fetcher import Fetcher
+
+RSS = b'''<?xml version="1.0"?>
+<rss xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel>
+<item><title>A</title><link>http://example.com/a</link><description>short</description>
+<content:encoded><![CDATA[<p>full <img src="http://example.com/1.jpg"></p>]]></content:encoded></item>
+<item><title>B</title><link>http://example.com/b</link>
+<enclosure url="http://example.com/2.jpg" type="image/jpeg"/><description>b</description></item>
+</channel></rss>'''
+
+ATOM = b'''<feed xmlns="http://www.w3.org/2005/Atom">
+<entry><title>C</title><link href="http://example.com/c"/><summary>c</summary></entry>
+</feed>'''
+
+
+class FeedServer:
+    """
+    Ленты на 127.0.0.1: /rss/<n> (с ETag и задержкой), /atom и /broken (HTTP 500).
+    Считает, сколько запросов обрабатывалось одновременно.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.runner = None
+        self.base_url = None
+
+    async def rss(self, request):
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.05)
+        finally:
+            self.active -= 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=RSS, headers={"ETag": '"v1"'})
+
+    async def atom(self, request):
+        return web.Response(body=ATOM, headers={"Last-Modified": "Mon, 15 Jan 2024 10:00:00 GMT"})
+
+    async def broken(self, request):
+        return web.Response(status=500)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/rss/{n}", self.rss)
+        app.router.add_get("/atom", self.atom)
+        app.router.add_get("/broken", self.broken)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.base_url = f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+
+    async def close(self):
+        await self.runner.cleanup()
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    saved = {"sources": [], "articles": [], "states": {}}
+
+    async def active_sources():
+        return saved["sources"]
+
+    async def save_articles(articles):
+        saved["articles"].extend(articles)
+        return len(articles)
+
+    async def save_source_states(states):
+        saved["states"].update(states)
+
+    monkeypatch.setattr(parser_service, "active_sources", active_sources)
+    monkeypatch.setattr(parser_service, "save_articles", save_articles)
+    monkeypatch.setattr(parser_service, "save_source_states", save_source_states)
+    return saved
+
+
+def test_parse_all_against_fixture_server(storage):
+    async def run():
+        server = FeedServer()
+        await server.start()
+        fetcher = Fetcher(per_host=2)
+        try:
+            storage["sources"] = [
+                {"_id": i, "name": f"rss{i}", "url": f"{server.base_url}/rss/{i}"} for i in range(6)
+            ] + [
+                {"_id": "atom", "name": "atom", "url": f"{server.base_url}/atom"},
+                {"_id": "broken", "name": "broken", "url": f"{server.base_url}/broken"},
+            ]
+            inserted = await parser_service.parse_all(fetcher)
+            first = dict(storage["states"])
+
+            # Второй обход с сохранёнными валидаторами: RSS отвечает 304
+            for source in storage["sources"]:
+                state = storage["states"][source["_id"]]
+                source.update({key: state[key] for key in ("etag", "last_modified") if key in state})
+            storage["articles"].clear()
+            await parser_service.parse_all(fetcher)
+            return inserted, first, server.peak, server.requests
+        finally:
+            await fetcher.close()
+            await server.close()
+
+    inserted, first, peak, requests = asyncio.run(run())
+
+    # Одинаковые статьи из шести RSS-лент записываются один раз
+    assert inserted == 3
+    assert first[0]["last_status"] == "ok" and first[0]["etag"] == '"v1"'
+    assert first["atom"]["last_modified"] == "Mon, 15 Jan 2024 10:00:00 GMT"
+    assert first["broken"]["last_status"] == "error"
+    # Все источники на одном хосте: не больше per_host запросов одновременно
+    assert peak == 2
+    assert requests == 12
+
+    assert storage["states"][0]["last_status"] == "not_modified"
+    assert [article["url"] for article in storage["articles"]] == ["http://example.com/c"]
+
+
+def test_build_article_fields():
+    async def run():
+        server = FeedServer()
+        await server.start()
+        fetcher = Fetcher()
+        try:
+            return await parser_service.parse_source(fetcher, {"_id": 1, "name": "rss", "url": f"{server.base_url}/rss/1"})
+        finally:
+            await fetcher.close()
+            await server.close()
+
+    articles, state = asyncio.run(run())
+    assert state["last_items"] == 2
+    assert [(article["url"], article["image"]) for article in articles] == [
+        ("http://example.com/a", "http://example.com/1.jpg"),
+        ("http://example.com/b", "http://example.com/2.jpg"),
+    ]
+    assert all(article["published"] is False and article["found_keywords"] == [] for article in articles)